@@ -0,0 +1,378 @@
+# -*- coding: utf-8 -*-
+# Time and measure the memory of the buscoplotpy loaders and plots on synthetic data.
+#
+#     python benchmarks/run_benchmarks.py --scale small medium --output results.json
+#     python benchmarks/run_benchmarks.py --scale large --benchmark chromoplot karyoplot
+#
+# Every benchmark runs in a fresh interpreter, so that the peak memory of one does not hide the next
+# one. The inputs are generated once per scale (see synthetic.py) and kept in the data directory.
+# The results are written as JSON, one record per benchmark and scale, to be compared across releases.
+
+#Importing libraries
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+import tracemalloc
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Benchmark the buscoplotpy of this checkout
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# The benchmarks that run once per process and do not depend on the scale
+COLD_BENCHMARKS = ['import_buscoplotpy', 'cli_help']
+
+# The benchmarks that run on the synthetic data of each scale
+DATA_BENCHMARKS = ['load_busco_fulltable', 'load_metaeuk_coordinates', 'karyoplot', 'chromoplot',
+                   'vertical_synteny_plot', 'horizontal_synteny_plot', 'organism_busco_barplot']
+
+def max_rss() -> int:
+
+    """
+    Get the peak resident memory of this process.
+
+    Returns:
+        - int: The peak resident set size in bytes, or None where it is not available.
+    """
+
+    # Linux keeps the peak of the parent process in ru_maxrss after fork and exec, not in VmHWM
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+
+    if resource is None:
+        return None
+
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # Linux reports kilobytes, macOS bytes
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+def cold_call(name: str):
+
+    """
+    Build the call of a cold benchmark.
+
+    Parameters:
+        - name (str): The benchmark name.
+
+    Returns:
+        - callable: The call to time.
+    """
+
+    if name == 'import_buscoplotpy':
+        return lambda: __import__('buscoplotpy')
+
+    def cli_help():
+
+        from buscoplotpy.cli import main
+
+        # Keep the help out of the results
+        stdout, sys.stdout = sys.stdout, open(os.devnull, 'w')
+
+        try:
+            main(['--help'])
+        except SystemExit:
+            pass
+        finally:
+            sys.stdout.close()
+            sys.stdout = stdout
+
+    return cli_help
+
+def data_call(name: str, paths: dict, output_dir: str, dpi: int):
+
+    """
+    Load the inputs of a data benchmark and build its call. The loading is not timed, except for the loaders.
+
+    Parameters:
+        - name (str): The benchmark name.
+        - paths (dict): The synthetic files (see synthetic.generate_dataset).
+        - output_dir (str): The directory of the plot outputs.
+        - dpi (int): The resolution of the plots.
+
+    Returns:
+        - callable: The call to time.
+    """
+
+    import pandas as pd
+
+    from buscoplotpy.graphics.chromoplot import chromoplot
+    from buscoplotpy.graphics.karyoplot import karyoplot
+    from buscoplotpy.graphics.organism_busco_barplot import organism_busco_barplot
+    from buscoplotpy.graphics.synteny import horizontal_synteny_plot, vertical_synteny_plot
+    from buscoplotpy.utils.load_busco_fulltable import load_busco_fulltable
+    from buscoplotpy.utils.load_busco_runs import load_busco_runs
+    from buscoplotpy.utils.load_metaeuk_coordinates import load_metaeuk_coordinates
+
+    if name == 'load_busco_fulltable':
+        return lambda: load_busco_fulltable(paths['fulltable_1'], group='synthetic', organism='genome_1', genome_version='v1')
+
+    if name == 'load_metaeuk_coordinates':
+        return lambda: load_metaeuk_coordinates(paths['gff'])
+
+    if name == 'organism_busco_barplot':
+        summaries = load_busco_runs(os.path.join(os.path.dirname(paths['gff']), 'runs'))[1]
+
+        return lambda: organism_busco_barplot(summaries, out_path=os.path.join(output_dir, ''), filename='barplot', dpi=dpi)
+
+    karyotype_1 = pd.read_csv(paths['karyotype_1'], sep='\t').assign(organism='Genome 1', color='#5795ad')
+    karyotype_2 = pd.read_csv(paths['karyotype_2'], sep='\t').assign(organism='Genome 2', color='#cc6535')
+
+    if name == 'chromoplot':
+        genes = load_metaeuk_coordinates(paths['gff'])
+
+        return lambda: chromoplot(karyotype_1, genes, dpi=dpi, output_path=os.path.join(output_dir, 'chromoplot.png'))
+
+    ft_1 = load_busco_fulltable(paths['fulltable_1'], organism='Genome 1')
+
+    if name == 'karyoplot':
+        return lambda: karyoplot(karyotype_1, output_file=os.path.join(output_dir, 'karyoplot.png'), fulltable=ft_1,
+                                 dpi=dpi, chrs_limit=len(karyotype_1))
+
+    ft_2 = load_busco_fulltable(paths['fulltable_2'], organism='Genome 2')
+
+    plot = vertical_synteny_plot if name == 'vertical_synteny_plot' else horizontal_synteny_plot
+
+    return lambda: plot(ft_1, ft_2, karyotype_1, karyotype_2, dpi=dpi, output_path=os.path.join(output_dir, name + '.png'))
+
+def run_worker(args: argparse.Namespace) -> dict:
+
+    """
+    Run one benchmark in this process.
+
+    The call is timed args.repeat times, then run once more under tracemalloc for its peak allocation.
+
+    Parameters:
+        - args (argparse.Namespace): The worker arguments.
+
+    Returns:
+        - dict: The 'seconds' of each run, the 'peak_traced_bytes' and the 'max_rss_bytes' of the process.
+    """
+
+    output_dir = tempfile.mkdtemp(prefix='buscoplotpy-bench-')
+
+    try:
+        if args.worker in COLD_BENCHMARKS:
+            call = cold_call(args.worker)
+        else:
+            with open(os.path.join(args.data_dir, args.scale[0], 'dataset.json')) as f:
+                paths = json.load(f)['paths']
+
+            call = data_call(args.worker, paths, output_dir, args.dpi)
+
+        seconds = []
+
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            call()
+            seconds.append(time.perf_counter() - start)
+
+        # A cold benchmark is only cold once
+        peak = None
+
+        if args.worker not in COLD_BENCHMARKS:
+            tracemalloc.start()
+            call()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+        return {'seconds': seconds, 'peak_traced_bytes': peak, 'max_rss_bytes': max_rss(), 'error': None}
+
+    except Exception:
+        return {'seconds': [], 'peak_traced_bytes': None, 'max_rss_bytes': max_rss(), 'error': traceback.format_exc()}
+
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+def spawn_worker(name: str, scale: str, args: argparse.Namespace, repeat: int) -> dict:
+
+    """
+    Run one benchmark in a fresh interpreter.
+
+    Parameters:
+        - name (str): The benchmark name.
+        - scale (str): The scale name, or None for the cold benchmarks.
+        - args (argparse.Namespace): The benchmark arguments.
+        - repeat (int): The number of timed runs.
+
+    Returns:
+        - dict: The result of the worker (see run_worker), with the wall clock 'process_seconds' of the interpreter.
+    """
+
+    command = [sys.executable, os.path.abspath(__file__), '--worker', name, '--repeat', str(repeat),
+               '--data-dir', args.data_dir, '--dpi', str(args.dpi)] + (['--scale', scale] if scale else [])
+
+    start   = time.perf_counter()
+    process = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+    elapsed = time.perf_counter() - start
+
+    try:
+        result = json.loads(process.stdout.strip().splitlines()[-1])
+    except (IndexError, ValueError):
+        result = {'seconds': [], 'peak_traced_bytes': None, 'max_rss_bytes': None, 'error': process.stderr}
+
+    result['process_seconds'] = elapsed
+
+    return result
+
+def interpreter_seconds(repeat: int) -> float:
+
+    """
+    Time the start of a bare interpreter, the floor of the cold benchmarks.
+
+    Parameters:
+        - repeat (int): The number of runs.
+
+    Returns:
+        - float: The fastest start, in seconds.
+    """
+
+    seconds = []
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', 'pass'], check=True)
+        seconds.append(time.perf_counter() - start)
+
+    return min(seconds)
+
+def summarize(name: str, scale: str, sizes: dict, runs: list) -> dict:
+
+    """
+    Build the record of a benchmark.
+
+    Parameters:
+        - name (str): The benchmark name.
+        - scale (str): The scale name, or None.
+        - sizes (dict): The sizes of the scale, or None.
+        - runs (list): The worker results.
+
+    Returns:
+        - dict: The timings (first, min, median, all), the memory peaks and the first error.
+    """
+
+    seconds  = [s for run in runs for s in run['seconds']]
+    errors   = [run['error'] for run in runs if run['error']]
+    rss      = [run['max_rss_bytes'] for run in runs if run['max_rss_bytes'] is not None]
+    traced   = [run['peak_traced_bytes'] for run in runs if run['peak_traced_bytes'] is not None]
+
+    return {'benchmark': name, 'scale': scale, 'sizes': sizes,
+            'seconds': seconds,
+            'first': seconds[0] if seconds else None,
+            'min': min(seconds) if seconds else None,
+            'median': statistics.median(seconds) if seconds else None,
+            'process_seconds': [run['process_seconds'] for run in runs],
+            'peak_traced_bytes': max(traced) if traced else None,
+            'max_rss_bytes': max(rss) if rss else None,
+            'error': errors[0] if errors else None}
+
+def git_commit() -> str:
+
+    """
+    Get the commit of the benchmarked checkout.
+
+    Returns:
+        - str: The commit hash, or None outside a git checkout.
+    """
+
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                              universal_newlines=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main(argv: list = None) -> int:
+
+    """
+    Run the benchmarks.
+
+    Parameters:
+        - argv (list, optional): The command line arguments. Defaults to sys.argv[1:].
+
+    Returns:
+        - int: The exit status, 1 if a benchmark failed.
+    """
+
+    parser = argparse.ArgumentParser(description='Benchmark the buscoplotpy loaders and plots on synthetic data.')
+    parser.add_argument('--scale', nargs='+', choices=['small', 'medium', 'large'], default=['small'], help='The data scales (default: small).')
+    parser.add_argument('--benchmark', nargs='+', choices=COLD_BENCHMARKS + DATA_BENCHMARKS, help='The benchmarks to run (default: all).')
+    parser.add_argument('--repeat', type=int, default=3, help='The number of timed runs of each benchmark (default: 3).')
+    parser.add_argument('--dpi', type=int, default=100, help='The resolution of the plots (default: 100).')
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'buscoplotpy-benchmarks'),
+                        help='Where the synthetic inputs are generated and kept.')
+    parser.add_argument('--output', help='The JSON results file (default: print to stdout).')
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        print(json.dumps(run_worker(args)))
+        return 0
+
+    # numpy and pandas are only imported here, so that the cold benchmarks do not pay for them
+    import synthetic
+
+    benchmarks = args.benchmark or COLD_BENCHMARKS + DATA_BENCHMARKS
+
+    from buscoplotpy import __version__
+
+    report = {'buscoplotpy': __version__, 'commit': git_commit(),
+              'date': datetime.datetime.now().isoformat(timespec='seconds'),
+              'python': platform.python_version(), 'platform': platform.platform(), 'cpu_count': os.cpu_count(),
+              'repeat': args.repeat, 'dpi': args.dpi, 'interpreter_seconds': interpreter_seconds(args.repeat),
+              'results': []}
+
+    # The cold benchmarks need a fresh interpreter for every run
+    for name in [b for b in benchmarks if b in COLD_BENCHMARKS]:
+        runs = [spawn_worker(name, None, args, 1) for _ in range(args.repeat)]
+        report['results'].append(summarize(name, None, None, runs))
+
+    for scale in args.scale:
+        data = [b for b in benchmarks if b in DATA_BENCHMARKS]
+
+        if not data:
+            break
+
+        synthetic.generate_dataset(os.path.join(args.data_dir, scale), scale)
+
+        for name in data:
+            report['results'].append(summarize(name, scale, synthetic.SCALES[scale], [spawn_worker(name, scale, args, args.repeat)]))
+
+    print('{:<26} {:<7} {:>10} {:>10} {:>12}'.format('benchmark', 'scale', 'min', 'median', 'max rss'), file=sys.stderr)
+
+    for record in report['results']:
+        print('{:<26} {:<7} {:>10} {:>10} {:>12}{}'.format(
+            record['benchmark'], record['scale'] or '-',
+            '' if record['min'] is None else '{:.3f}s'.format(record['min']),
+            '' if record['median'] is None else '{:.3f}s'.format(record['median']),
+            '' if record['max_rss_bytes'] is None else '{:.0f} MB'.format(record['max_rss_bytes'] / (1 << 20)),
+            '  FAILED' if record['error'] else ''), file=sys.stderr)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    return 1 if any(record['error'] for record in report['results']) else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,262 @@
+# -*- coding: utf-8 -*-
+# Generators of synthetic BUSCO and MetaEuk outputs for the benchmarks.
+#
+# The files have the layout of the real ones (BUSCO 5 full tables and short summaries, MetaEuk gff
+# coordinates, karyotype tsv files), with random but reproducible content.
+
+#Importing libraries
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+# The size of each benchmark scale: scaffolds per genome, BUSCOs shared by the two genomes,
+# gff features and BUSCO short summaries
+SCALES = {
+    'small':  {'scaffolds': 20,  'buscos': 1000,  'features': 10000,   'summaries': 6},
+    'medium': {'scaffolds': 100, 'buscos': 3000,  'features': 100000,  'summaries': 24},
+    'large':  {'scaffolds': 500, 'buscos': 10000, 'features': 1000000, 'summaries': 96},
+}
+
+# The share of each BUSCO status in the full tables
+STATUS_WEIGHTS = {'Complete': 0.85, 'Duplicated': 0.05, 'Fragmented': 0.04, 'Missing': 0.06}
+
+# The gff feature types written by MetaEuk, one gene, mRNA and CDS/exon pairs per prediction
+FEATURE_TYPES = ['gene', 'mRNA', 'exon', 'CDS']
+
+def make_karyotype(scaffolds: int, prefix: str, rng: np.random.Generator) -> pd.DataFrame:
+
+    """
+    Generate a karyotype, with a few long chromosomes and a tail of short scaffolds.
+
+    Parameters:
+        - scaffolds (int): The number of scaffolds.
+        - prefix (str): The prefix of the scaffold names.
+        - rng (np.random.Generator): The random generator.
+
+    Returns:
+        - pd.DataFrame: The 'chr', 'start' and 'end' of each scaffold, longest first.
+    """
+
+    lengths = np.sort(rng.lognormal(mean=13, sigma=1.2, size=scaffolds).astype(np.int64) + 10000)[::-1]
+
+    return pd.DataFrame({'chr': ['{}{}'.format(prefix, i + 1) for i in range(scaffolds)], 'start': 0, 'end': lengths})
+
+def place_on_karyotype(karyotype: pd.DataFrame, n: int, rng: np.random.Generator) -> (np.ndarray, np.ndarray):
+
+    """
+    Draw random positions on a karyotype, uniformly along the genome.
+
+    Parameters:
+        - karyotype (pd.DataFrame): The karyotype.
+        - n (int): The number of positions.
+        - rng (np.random.Generator): The random generator.
+
+    Returns:
+        - np.ndarray: The scaffold name of each position.
+        - np.ndarray: The positions, within each scaffold.
+    """
+
+    lengths = karyotype['end'].to_numpy()
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+
+    genome_positions = rng.integers(0, offsets[-1], size=n)
+    rows = np.searchsorted(offsets, genome_positions, side='right') - 1
+
+    return karyotype['chr'].to_numpy()[rows], genome_positions - offsets[rows]
+
+def make_fulltable(karyotype: pd.DataFrame, busco_ids: np.ndarray, rng: np.random.Generator) -> pd.DataFrame:
+
+    """
+    Generate a BUSCO full table: a row per BUSCO, two rows per duplicated BUSCO and no position for the missing ones.
+
+    Parameters:
+        - karyotype (pd.DataFrame): The karyotype of the genome.
+        - busco_ids (np.ndarray): The BUSCO ids.
+        - rng (np.random.Generator): The random generator.
+
+    Returns:
+        - pd.DataFrame: The full table, with the columns of the BUSCO 5 full_table.tsv.
+    """
+
+    status = rng.choice(list(STATUS_WEIGHTS), size=len(busco_ids), p=list(STATUS_WEIGHTS.values()))
+
+    # Give the duplicated BUSCOs a second hit
+    repeats = np.where(status == 'Duplicated', 2, 1)
+    ids     = np.repeat(busco_ids, repeats)
+    status  = np.repeat(status, repeats)
+    n       = len(ids)
+
+    sequence, start = place_on_karyotype(karyotype, n, rng)
+    length = rng.integers(200, 5000, size=n)
+
+    table = pd.DataFrame({
+        '# Busco id': ids,
+        'Status': status,
+        # MetaEuk writes the sequence with the searched region
+        'Sequence': pd.Series(sequence).astype(str) + ':' + pd.Series(start).astype(str) + '-' + pd.Series(start + length).astype(str),
+        'Gene Start': start,
+        'Gene End': start + length,
+        'Strand': rng.choice(['+', '-'], size=n),
+        'Score': np.round(rng.uniform(100, 3000, size=n), 1),
+        'Length': rng.integers(100, 2000, size=n),
+        'OrthoDB url': ['https://v10-1.orthodb.org/?query={}'.format(i) for i in ids],
+        'Description': 'Synthetic protein',
+    })
+
+    # The missing BUSCOs have no position
+    missing = table['Status'] == 'Missing'
+    table.loc[missing, ['Sequence', 'Gene Start', 'Gene End', 'Strand', 'Score', 'Length', 'OrthoDB url', 'Description']] = None
+
+    return table
+
+def write_fulltable(path: str, table: pd.DataFrame) -> None:
+
+    """
+    Write a full table with the header lines of BUSCO.
+
+    Parameters:
+        - path (str): The output path.
+        - table (pd.DataFrame): The full table (see make_fulltable).
+    """
+
+    with open(path, 'w') as f:
+        f.write('# BUSCO version is: 5.4.7\n# The lineage dataset is: synthetic_odb10 (Creation date: 2020-09-10, number of genomes: 1, number of BUSCOs: {})\n'.format(table['# Busco id'].nunique()))
+        table.to_csv(f, sep='\t', index=False)
+
+def make_gff(karyotype: pd.DataFrame, features: int, rng: np.random.Generator) -> pd.DataFrame:
+
+    """
+    Generate MetaEuk gff coordinates, sorted by sequence and start as MetaEuk writes them.
+
+    Parameters:
+        - karyotype (pd.DataFrame): The karyotype of the genome.
+        - features (int): The number of features.
+        - rng (np.random.Generator): The random generator.
+
+    Returns:
+        - pd.DataFrame: The gff columns (see load_metaeuk_coordinates.GFF_COLUMN_NAMES).
+    """
+
+    sequence, start = place_on_karyotype(karyotype, features, rng)
+
+    # Clip the features to their scaffold
+    lengths = karyotype.set_index('chr')['end'].loc[sequence].to_numpy()
+    end     = np.minimum(start + rng.integers(100, 20000, size=features), lengths)
+
+    gff = pd.DataFrame({
+        'sequence': sequence,
+        'source': 'MetaEuk',
+        'type': rng.choice(FEATURE_TYPES, size=features),
+        'start': start + 1,
+        'end': end,
+        'score': rng.integers(50, 1500, size=features),
+        'strand': rng.choice(['+', '-'], size=features),
+        'phase': '.',
+        'attributes': ['Target_ID=synthetic_{};TCS_ID=synthetic_{}'.format(i, i) for i in range(features)],
+    })
+
+    return gff.sort_values(['sequence', 'start'], kind='stable')
+
+def make_summary(complete: float, buscos: int, scaffolds: int, rng: np.random.Generator) -> dict:
+
+    """
+    Generate a BUSCO short summary.
+
+    Parameters:
+        - complete (float): The percentage of complete BUSCOs.
+        - buscos (int): The number of BUSCOs of the lineage.
+        - scaffolds (int): The number of scaffolds of the assembly.
+        - rng (np.random.Generator): The random generator.
+
+    Returns:
+        - dict: The content of the short_summary.json file.
+    """
+
+    duplicated = round(float(rng.uniform(0, min(5, complete))), 1)
+    fragmented = round(float(rng.uniform(0, (100 - complete) / 2)), 1)
+    missing    = round(100 - complete - fragmented, 1)
+
+    return {
+        'parameters': {'max_intron': '130000', 'max_seq_len': '36000', 'metaeuk_parameters': '--max-intron=130000',
+                       'metaeuk_rerun_parameters': '--max-intron=130000', 'contig_break': '10',
+                       'scaffold_composition': False, 'gene_predictor': 'metaeuk'},
+        'lineage_dataset': {'name': 'synthetic_odb10', 'creation_date': '2020-09-10', 'number_of_buscos': str(buscos),
+                            'number_of_species': '16'},
+        'versions': {'hmmsearch': 3.1, 'bbtools': '39.01', 'metaeuk': '6.a5d39d9', 'busco': '5.4.7'},
+        'results': {'one_line_summary': 'C:{:.1f}%[S:{:.1f}%,D:{:.1f}%],F:{:.1f}%,M:{:.1f}%,n:{}'.format(
+                        complete, complete - duplicated, duplicated, fragmented, missing, buscos),
+                    'Complete': complete, 'Single copy': round(complete - duplicated, 1), 'Multi copy': duplicated,
+                    'Fragmented': fragmented, 'Missing': missing, 'n_markers': buscos, 'domain': 'eukaryota',
+                    'Number of scaffolds': scaffolds, 'Number of contigs': scaffolds * 3,
+                    'Total length': scaffolds * 500000, 'Percent gaps': '0.100%',
+                    'Scaffold N50': 1000000, 'Contigs N50': 200000},
+    }
+
+def generate_dataset(directory: str, scale: str, seed: int = 0) -> dict:
+
+    """
+    Write the synthetic inputs of a benchmark scale, unless they are already there.
+
+    Two genomes share the BUSCOs of the scale, so that they can be compared in the synteny plots.
+    The summaries are written in the group/organism/genome_version tree read by load_busco_runs.
+
+    Parameters:
+        - directory (str): The output directory.
+        - scale (str): The scale name (see SCALES).
+        - seed (int, optional): The random seed. Defaults to 0.
+
+    Returns:
+        - dict: The paths of the generated files ('karyotype_1', 'karyotype_2', 'fulltable_1', 'fulltable_2',
+                'gff' and the list of 'summaries').
+    """
+
+    sizes    = SCALES[scale]
+    manifest = os.path.join(directory, 'dataset.json')
+
+    if os.path.exists(manifest):
+        with open(manifest) as f:
+            dataset = json.load(f)
+
+        if dataset['sizes'] == sizes and dataset['seed'] == seed:
+            return dataset['paths']
+
+    os.makedirs(directory, exist_ok=True)
+
+    rng   = np.random.default_rng(seed)
+    paths = {}
+
+    busco_ids = np.array(['{}at2759'.format(100000 + i) for i in range(sizes['buscos'])])
+
+    for genome, prefix in [(1, 'scaffold_'), (2, 'contig_')]:
+        karyotype = make_karyotype(sizes['scaffolds'], prefix, rng)
+
+        paths['karyotype_{}'.format(genome)] = os.path.join(directory, 'karyotype_{}.tsv'.format(genome))
+        karyotype.to_csv(paths['karyotype_{}'.format(genome)], sep='\t', index=False)
+
+        paths['fulltable_{}'.format(genome)] = os.path.join(directory, 'full_table_{}.tsv'.format(genome))
+        write_fulltable(paths['fulltable_{}'.format(genome)], make_fulltable(karyotype, busco_ids, rng))
+
+        if genome == 1:
+            paths['gff'] = os.path.join(directory, 'metaeuk.gff')
+            make_gff(karyotype, sizes['features'], rng).to_csv(paths['gff'], sep='\t', header=False, index=False)
+
+    # Spread the summaries over groups, organisms and genome versions
+    paths['summaries'] = []
+
+    for i in range(sizes['summaries']):
+        run = os.path.join(directory, 'runs', 'group_{}'.format(i % 3), 'organism_{}'.format(i // 3 % 8), 'v{}'.format(i // 24 + 1), 'busco_out')
+        os.makedirs(run, exist_ok=True)
+
+        path = os.path.join(run, 'short_summary.specific.synthetic_odb10.busco_out.json')
+
+        with open(path, 'w') as f:
+            json.dump(make_summary(round(float(rng.uniform(60, 99)), 1), sizes['buscos'], sizes['scaffolds'], rng), f, indent=4)
+
+        paths['summaries'].append(path)
+
+    with open(manifest, 'w') as f:
+        json.dump({'scale': scale, 'sizes': sizes, 'seed': seed, 'paths': paths}, f, indent=2)
+
+    return paths
@@ -0,0 +1,4 @@
+# -*- coding: utf-8 -*-
+
+# The package version, as in pyproject.toml
+__version__ = "0.0.2"
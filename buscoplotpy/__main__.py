@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+# Run the command line interface with python -m buscoplotpy.
+
+import sys
+
+from .cli import main
+
+sys.exit(main())
@@ -0,0 +1,372 @@
+# -*- coding: utf-8 -*-
+# The buscoplotpy command line interface.
+#
+# Only the standard library is imported here: pandas, matplotlib and the plot modules are imported
+# by the subcommands when they run, so --help and the argument checks return immediately.
+
+#Importing libraries
+import argparse
+import os
+import sys
+
+def existing_file(path: str) -> str:
+
+    """
+    Check that a command line path is an existing file.
+
+    Parameters:
+        - path (str): The path.
+
+    Returns:
+        - str: The path.
+    """
+
+    if not os.path.isfile(path):
+        raise argparse.ArgumentTypeError('no such file: {}'.format(path))
+
+    return path
+
+def positive_int(value: str) -> int:
+
+    """
+    Check that a command line value is a positive integer.
+
+    Parameters:
+        - value (str): The value.
+
+    Returns:
+        - int: The value.
+    """
+
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError('not an integer: {}'.format(value))
+
+    if number <= 0:
+        raise argparse.ArgumentTypeError('must be positive: {}'.format(value))
+
+    return number
+
+def link_color(value: str) -> tuple:
+
+    """
+    Parse a SEQUENCE=COLOR link color.
+
+    Parameters:
+        - value (str): The value.
+
+    Returns:
+        - tuple: The sequence name and the color.
+    """
+
+    if '=' not in value:
+        raise argparse.ArgumentTypeError('expected SEQUENCE=COLOR: {}'.format(value))
+
+    return tuple(value.rsplit('=', 1))
+
+def add_common_arguments(parser: argparse.ArgumentParser, output_help: str) -> None:
+
+    """
+    Add the arguments shared by the plot subcommands.
+
+    Parameters:
+        - parser (argparse.ArgumentParser): The subcommand parser.
+        - output_help (str): The help of the output argument.
+    """
+
+    parser.add_argument('-o', '--output', required=True, help=output_help)
+    parser.add_argument('--title', help='The title of the plot.')
+    parser.add_argument('--dpi', type=positive_int, default=300, help='The resolution of the plot (default: 300).')
+    parser.add_argument('--figure-cache', metavar='DIR', help='Skip the rendering when the inputs and the options did not change.')
+    parser.add_argument('--show', action='store_true', help='Show the plot in a window.')
+    parser.add_argument('--no-server', action='store_true', help='Render in this process even if a buscoplotpy server is running.')
+    parser.add_argument('--profile', metavar='FILE', help='Append the time, memory and counts of each plot stage to this JSON-lines file.')
+
+def build_parser() -> argparse.ArgumentParser:
+
+    """
+    Build the command line parser.
+
+    Returns:
+        - argparse.ArgumentParser: The parser of the buscoplotpy command.
+    """
+
+    parser = argparse.ArgumentParser(prog='buscoplotpy', description='Plot the results of BUSCO runs.')
+    parser.add_argument('--version', action='store_true', help='Print the buscoplotpy version and exit.')
+
+    subparsers = parser.add_subparsers(dest='command', metavar='COMMAND')
+
+    # karyoplot
+    karyoplot = subparsers.add_parser('karyoplot', help='Plot the BUSCOs on the chromosomes of a genome.')
+    karyoplot.add_argument('--karyotype', required=True, type=existing_file, help='The karyotype tsv file (chr, start, end).')
+    karyoplot.add_argument('--fulltable', required=True, type=existing_file, help='The BUSCO full_table.tsv file.')
+    karyoplot.add_argument('--organism', default='', help='The name of the genome, written before the title '
+                                                          '(default: the organism column of the karyotype, if any).')
+    add_common_arguments(karyoplot, 'The output image, or the first page with --page-size.')
+    karyoplot.add_argument('--palette', choices=['green', 'azure'], default='green', help='The color palette (default: green).')
+    karyoplot.add_argument('--chrs-limit', type=positive_int, default=30, help='The maximum number of chromosomes (default: 30).')
+    karyoplot.add_argument('--dim', type=float, default=2, help='The dimension of the chromosomes (default: 2).')
+    karyoplot.add_argument('--page-size', type=positive_int, default=0, help='The number of chromosomes per page.')
+    karyoplot.add_argument('--cache', metavar='DIR', help='The full table cache directory.')
+
+    # chromoplot
+    chromoplot = subparsers.add_parser('chromoplot', help='Plot the feature density of each chromosome.')
+    chromoplot.add_argument('--karyotype', required=True, type=existing_file, help='The karyotype tsv file (chr, start, end).')
+    chromoplot.add_argument('--gff', required=True, type=existing_file, help='The MetaEuk gff file (optionally gzip compressed).')
+    add_common_arguments(chromoplot, 'The output image, or the first page with --page-size.')
+    chromoplot.add_argument('--bin-number', type=positive_int, default=100, help='The number of bins per chromosome (default: 100).')
+    chromoplot.add_argument('--targets', nargs='+', default=['gene', 'mRNA', 'CDS', 'exon'], help='The feature types to plot.')
+    chromoplot.add_argument('--adaptive-sampling', action='store_true', help='Evaluate the curves once per pixel.')
+    chromoplot.add_argument('--decimate', action='store_true', help='Keep at most four curve vertices per pixel column.')
+    chromoplot.add_argument('--workers', type=positive_int, default=1, help='The number of rendering processes (default: 1).')
+    chromoplot.add_argument('--page-size', type=positive_int, default=0, help='The number of chromosomes per page.')
+
+    # synteny
+    synteny = subparsers.add_parser('synteny', help='Plot the shared BUSCOs of two genomes.')
+    synteny.add_argument('--fulltable-1', required=True, type=existing_file, help='The full table of the first genome.')
+    synteny.add_argument('--fulltable-2', required=True, type=existing_file, help='The full table of the second genome.')
+    synteny.add_argument('--karyotype-1', required=True, type=existing_file, help='The karyotype of the first genome.')
+    synteny.add_argument('--karyotype-2', required=True, type=existing_file, help='The karyotype of the second genome.')
+    synteny.add_argument('--organism-1', default='Genome 1', help='The name of the first genome.')
+    synteny.add_argument('--organism-2', default='Genome 2', help='The name of the second genome.')
+    synteny.add_argument('--color-1', default='#5795ad', help='The chromosome color of the first genome.')
+    synteny.add_argument('--color-2', default='#cc6535', help='The chromosome color of the second genome.')
+    add_common_arguments(synteny, 'The output image.')
+    synteny.add_argument('--orientation', choices=['vertical', 'horizontal'], default='vertical', help='The layout (default: vertical).')
+    synteny.add_argument('--figsize', nargs=2, type=float, metavar=('WIDTH', 'HEIGHT'), help='The figure size in inches.')
+    synteny.add_argument('--dim', type=float, default=2, help='The dimension of the chromosomes (default: 2).')
+    synteny.add_argument('--round-edges', action='store_true', help='Round the edges of the chromosomes.')
+    synteny.add_argument('--straight-line', action='store_true', help='Draw the links as straight lines.')
+    synteny.add_argument('--blocks', action='store_true', help='Draw the synteny blocks as ribbons instead of one link per BUSCO.')
+    synteny.add_argument('--block-gap', type=int, default=5, help='The maximum number of BUSCOs skipped inside a block (default: 5).')
+    synteny.add_argument('--min-block-size', type=int, default=3, help='The minimum number of BUSCOs of a block (default: 3).')
+    synteny.add_argument('--duplicated', action='store_true', help='Link the Duplicated BUSCOs too, every hit with every hit.')
+    synteny.add_argument('--max-fanout', type=int, default=4, help='The maximum number of Duplicated hits of a BUSCO linked in each genome (default: 4).')
+    synteny.add_argument('--link-color', action='append', type=link_color, default=[], metavar='SEQUENCE=COLOR',
+                         help='The color of the links of a sequence (repeatable).')
+    synteny.add_argument('--cache', metavar='DIR', help='The full table cache directory.')
+
+    # barplot
+    barplot = subparsers.add_parser('barplot', help='Plot the completeness of several BUSCO runs.')
+    barplot.add_argument('summaries', nargs='+', type=existing_file, help='The BUSCO short_summary json files.')
+    barplot.add_argument('--root', help='The root of the BUSCO runs: the group, organism and genome version '
+                                        'are read from the directories below it (group/organism/genome_version/...).')
+    barplot.add_argument('--group', default='', help='The group name (default: from --root).')
+    barplot.add_argument('--organism', default='', help='The organism name (default: from --root).')
+    barplot.add_argument('-o', '--output', required=True, help='The output prefix: the plot is written to PREFIX_completeness.png.')
+    barplot.add_argument('--dpi', type=positive_int, default=300, help='The resolution of the plot (default: 300).')
+    barplot.add_argument('--figure-cache', metavar='DIR', help='Skip the rendering when the inputs and the options did not change.')
+    barplot.add_argument('--show', action='store_true', help='Show the plot in a window.')
+    barplot.add_argument('--no-server', action='store_true', help='Render in this process even if a buscoplotpy server is running.')
+    barplot.add_argument('--profile', metavar='FILE', help='Append the time, memory and counts of each plot stage to this JSON-lines file.')
+
+    # batch
+    batch = subparsers.add_parser('batch', help='Run the plot jobs of a JSON/YAML specification.')
+    batch.add_argument('spec', type=existing_file, help='The job specification (see buscoplotpy.utils.render_jobs).')
+    batch.add_argument('--workers', type=positive_int, help='The number of worker processes (default: from the specification).')
+
+    # cache
+    cache = subparsers.add_parser('cache', help='List or prune a figure cache.')
+    cache.add_argument('action', choices=['list', 'prune'])
+    cache.add_argument('directory', help='The figure cache directory.')
+    cache.add_argument('--max-age-days', type=float, help='Remove the figures not used for this many days.')
+    cache.add_argument('--max-mb', type=float, help='Remove the least recently used figures over this size.')
+
+    # serve
+    serve = subparsers.add_parser('serve', help='Run a render server used by the other commands of this user.')
+    serve.add_argument('--socket', metavar='PATH', help='The Unix socket (default: $BUSCOPLOTPY_SOCKET, or buscoplotpy-UID.sock '
+                                                        'in $XDG_RUNTIME_DIR or the temporary directory).')
+    serve.add_argument('--port', type=int, help='Listen on this localhost port instead of a Unix socket '
+                                                '(the clients need BUSCOPLOTPY_SERVER=127.0.0.1:PORT and read the secret '
+                                                'of its token file, see $BUSCOPLOTPY_TOKEN_FILE).')
+    serve.add_argument('--workers', type=positive_int, default=2, help='The number of plots rendered at the same time (default: 2).')
+    serve.add_argument('--max-queue', type=int, default=64, help='The maximum number of waiting requests (default: 64).')
+    serve.add_argument('--max-tables', type=positive_int, default=32, help='The maximum number of tables kept in memory (default: 32).')
+    serve.add_argument('--status', action='store_true', help='Print the state of the running server and exit.')
+
+    return parser
+
+def plot_job(args: argparse.Namespace) -> dict:
+
+    """
+    Translate the arguments of a plot subcommand into a render job.
+
+    Parameters:
+        - args (argparse.Namespace): The parsed arguments.
+
+    Returns:
+        - dict: The job specification (see render_jobs.load_job_spec).
+    """
+
+    options = {'dpi': args.dpi, 'plt_show': args.show}
+
+    if getattr(args, 'title', None):
+        options['title'] = args.title
+
+    if args.profile:
+        options['profile'] = args.profile
+
+    if args.command == 'karyoplot':
+        options.update(palette=args.palette, chrs_limit=args.chrs_limit, dim=args.dim, page_size=args.page_size)
+
+        # Keep the organism column of the karyotype file, unless --organism is given
+        karyotype = {'path': args.karyotype}
+
+        if args.organism:
+            karyotype['organism'] = args.organism
+
+        return {'plot': 'karyoplot', 'output': args.output, 'options': options,
+                'inputs': {'karyotype': karyotype, 'fulltable': args.fulltable}}
+
+    if args.command == 'chromoplot':
+        options.update(bin_number=args.bin_number, targets=args.targets, adaptive_sampling=args.adaptive_sampling,
+                       decimate=args.decimate, workers=args.workers, page_size=args.page_size)
+
+        # Pass the gff path, so that large files are streamed
+        options['genes_dataframe'] = args.gff
+
+        return {'plot': 'chromoplot', 'output': args.output, 'options': options,
+                'inputs': {'karyotype': args.karyotype}}
+
+    if args.command == 'synteny':
+        options.update(dim=args.dim, round_edges=args.round_edges, straight_line=args.straight_line,
+                       link_colors=dict(args.link_color), blocks=args.blocks, block_gap=args.block_gap,
+                       min_block_size=args.min_block_size, duplicated=args.duplicated, max_fanout=args.max_fanout)
+
+        if args.figsize:
+            options['figsize'] = tuple(args.figsize)
+
+        return {'plot': '{}_synteny'.format(args.orientation), 'output': args.output, 'options': options,
+                'inputs': {'ft_1': args.fulltable_1, 'ft_2': args.fulltable_2,
+                           'karyotype_1': {'path': args.karyotype_1, 'organism': args.organism_1, 'color': args.color_1},
+                           'karyotype_2': {'path': args.karyotype_2, 'organism': args.organism_2, 'color': args.color_2}}}
+
+    # barplot
+    from .utils.run_layout import infer_run_metadata
+
+    summaries = []
+
+    for path in args.summaries:
+        if args.root:
+            info = infer_run_metadata(os.path.abspath(path), os.path.abspath(args.root))
+        else:
+            info = {'group': '', 'organism': '', 'genome_version': os.path.basename(os.path.dirname(os.path.abspath(path)))}
+
+        info.update({key: value for key, value in [('group', args.group), ('organism', args.organism)] if value})
+        summaries.append(dict(info, path=path))
+
+    options.update(out_path=os.path.join(os.path.dirname(args.output), ''), filename=os.path.basename(args.output))
+
+    return {'plot': 'barplot', 'options': options, 'inputs': {'df': summaries}}
+
+def print_failures(report: dict) -> int:
+
+    """
+    Print the failed inputs and jobs of a batch report, with the last line of their error.
+
+    Parameters:
+        - report (dict): The report of run_render_jobs.
+
+    Returns:
+        - int: The exit status, 1 if anything failed and 0 otherwise.
+    """
+
+    failed = [r for r in report['inputs'] + report['jobs'] if r['status'] == 'failed']
+
+    for r in failed:
+        error = r['error'].strip().splitlines()[-1] if r['error'] else ''
+
+        print('buscoplotpy: {} failed: {}'.format(r.get('name', r.get('path')), error), file=sys.stderr)
+
+    return 1 if failed else 0
+
+def main(argv: list = None) -> int:
+
+    """
+    Run the buscoplotpy command.
+
+    Parameters:
+        - argv (list, optional): The command line arguments. Defaults to sys.argv[1:].
+
+    Returns:
+        - int: The exit status.
+    """
+
+    parser = build_parser()
+    args   = parser.parse_args(argv)
+
+    if args.version:
+        from . import __version__
+        print(__version__)
+        return 0
+
+    if args.command is None:
+        parser.print_help()
+        return 2
+
+    # The pages are closed once written, they cannot be shown
+    if getattr(args, 'page_size', 0) and args.show:
+        parser.error('--show cannot be combined with --page-size')
+
+    if args.command == 'cache':
+        from .utils.figure_cache import main as figure_cache_main
+
+        figure_cache_main([args.action, args.directory] +
+                          (['--max-age-days', str(args.max_age_days)] if args.max_age_days is not None else []) +
+                          (['--max-mb', str(args.max_mb)] if args.max_mb is not None else []))
+        return 0
+
+    if args.command == 'serve':
+        from .utils.render_server import serve, server_status
+
+        if args.status:
+            if args.socket:
+                os.environ['BUSCOPLOTPY_SOCKET'] = args.socket
+
+            status = server_status()
+
+            if status is None:
+                print('buscoplotpy: no server is running', file=sys.stderr)
+                return 1
+
+            for key, value in status.items():
+                print('{:<13} {}'.format(key, value))
+
+            return 0
+
+        try:
+            serve(socket_path=args.socket, port=args.port, workers=args.workers, max_queue=args.max_queue, max_tables=args.max_tables)
+        except (RuntimeError, OSError) as e:
+            print('buscoplotpy: {}'.format(e), file=sys.stderr)
+            return 1
+
+        return 0
+
+    if args.command != 'batch':
+        spec = {'jobs': [plot_job(args)], 'figure_cache': args.figure_cache, 'cache': getattr(args, 'cache', None)}
+
+        # Let the running server render the plot, with its warm imports and tables
+        if not args.show and not args.no_server:
+            from .utils.render_server import request_render
+
+            report = request_render(spec)
+
+            if report is not None:
+                return print_failures(report)
+
+    # The plot modules are only imported here
+    from .utils.render_jobs import run_render_jobs
+
+    if args.command == 'batch':
+        report = run_render_jobs(args.spec, workers=args.workers)
+
+        for job in report['jobs']:
+            print('{:<8} {:>8} {}'.format(job['status'], '' if job['seconds'] is None else '{:.2f}s'.format(job['seconds']), job['name']))
+
+        return print_failures(report)
+
+    return print_failures(run_render_jobs(spec))
+
+if __name__ == '__main__':
+    sys.exit(main())
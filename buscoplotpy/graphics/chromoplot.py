@@ -1,47 +1,126 @@
 # -*- coding: utf-8 -*-
 # This file is part of the Busco software suite.
 
+import io
+import os
+
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
+import matplotlib
+import matplotlib.image
 
+from concurrent.futures import ProcessPoolExecutor
+from matplotlib.axes import Axes
+from matplotlib.figure import Figure
 from matplotlib.patches import Rectangle
+from matplotlib.transforms import Bbox
 from scipy.interpolate import splrep, splev
 from scipy import interpolate
 
+from ..graphics.figure import new_figure, show_figure
+from ..graphics.paging import PageWriter, page_slices
+from ..utils.compute_feature_density import compute_feature_density
+from ..utils.figure_cache import InputFile, open_figure_cache
+from ..utils.profiling import open_profiler
+
 AZURE  = '#5795ad'
 GREEN  = '#64ad57'
 ORANGE = '#cc6535'
 BLACK  = '#8a8a8a'
 PURPLE = '#be8adb'
 
-def chromoplot(karyotype: pd.DataFrame, 
-               genes_dataframe: pd.DataFrame,
-               title: str = 'Chromoplot',
-               bin_number: int = 100,
-               dpi: int = 300,
-               plt_show: bool = False,
-               output_path: str = '',
-               targets: list = ['gene', 'mRNA', 'CDS', 'exon']
-    ) -> None:
+# The output formats that can be rendered in parallel
+RASTER_FORMATS = ['.png', '.jpg', '.jpeg', '.tif', '.tiff', '.webp']
+
+def spline_samples(ax: Axes, dpi: int, bin_number: int) -> int:
 
     """
-    Plot the karyotype and gene density of each chromosome on separate subplots.
+    Get the number of spline evaluations needed to draw a curve on the axes at the given resolution.
+
+    Parameters:
+        - ax (Axes): The axes of the curve.
+        - dpi (int): The output resolution.
+        - bin_number (int): The number of bins of the curve.
+
+    Returns:
+        - int: One evaluation per horizontal pixel of the axes, and at least one per bin edge.
     """
 
-    karyotype.columns = karyotype.columns.str.lower()
+    width_px = ax.get_position().width * ax.figure.get_figwidth() * dpi
 
-    assert 'chr' in karyotype.columns, 'The karyotype DataFrame must contain the "chr" column.'
-    assert 'end' in karyotype.columns, 'The karyotype DataFrame must contain the "end" column.'
-    assert 'start' in karyotype.columns, 'The karyotype DataFrame must contain the "start" column.'
+    return max(int(np.ceil(width_px)), bin_number + 1)
+
+def decimate_curve(X: np.ndarray, Y: np.ndarray, columns: int) -> (np.ndarray, np.ndarray):
+
+    """
+    Reduce a curve to at most four vertices per pixel column (the first, the lowest, the highest and the last),
+    which draws the same shape at that resolution.
+
+    Parameters:
+        - X (np.ndarray): The sorted x-coordinates of the curve.
+        - Y (np.ndarray): The y-coordinates of the curve.
+        - columns (int): The number of pixel columns spanned by the curve.
+
+    Returns:
+        - np.ndarray: The x-coordinates of the kept vertices.
+        - np.ndarray: The y-coordinates of the kept vertices.
+    """
+
+    if len(X) <= 4 * columns or X[-1] == X[0]:
+        return X, Y
+
+    # Find the pixel column of each vertex
+    column = np.minimum(((X - X[0]) / (X[-1] - X[0]) * columns).astype(np.int64), columns - 1)
+
+    # Sort each column by Y, so its first and last vertices are the lowest and the highest
+    order  = np.lexsort((Y, column))
+    starts = np.flatnonzero(np.r_[True, column[order][1:] != column[order][:-1]])
+    ends   = np.r_[starts[1:], len(order)] - 1
+
+    # The columns are contiguous in X, so their first and last vertices are the column bounds
+    first = np.flatnonzero(np.r_[True, column[1:] != column[:-1]])
+    last  = np.r_[first[1:], len(X)] - 1
+
+    keep = np.unique(np.concatenate([first, last, order[starts], order[ends]]))
+
+    return X[keep], Y[keep]
+
+def draw_chromoplot(karyotype: pd.DataFrame,
+                    density: dict,
+                    title: str = 'Chromoplot',
+                    bin_number: int = 100,
+                    dpi: int = 300,
+                    targets: list = ['gene', 'mRNA', 'CDS', 'exon'],
+                    adaptive_sampling: bool = False,
+                    decimate: bool = False,
+                    rows: list = None,
+                    fills: bool = True,
+                    fig: Figure = None
+    ) -> Figure:
+
+    """
+    Draw the chromoplot figure from the feature density of each chromosome.
+
+    Parameters:
+        - karyotype (pd.DataFrame): The karyotype DataFrame (lowercase columns, default index).
+        - density (dict): The feature density (see compute_feature_density).
+        - title, bin_number, dpi, targets, adaptive_sampling, decimate: As in chromoplot.
+        - rows (list, optional): The positions of the chromosomes to draw, the others are hidden. Defaults to all.
+        - fills (bool, optional): Whether to draw the density curves. Without them the figure has the same
+                                  layout and extent, which is enough to compute its bounding box. Defaults to True.
+        - fig (Figure, optional): A figure to draw on instead of a new one. Defaults to None.
+
+    Returns:
+        - Figure: The chromoplot figure.
+    """
 
     number_of_graphs = karyotype.shape[0]
 
-    fig, ax = plt.subplots(ncols=1, nrows=number_of_graphs, figsize=(24, number_of_graphs * 2 + 3), squeeze=False)
+    fig = new_figure(figsize=(24, number_of_graphs * 2 + 3), fig=fig)
+    ax  = fig.subplots(ncols=1, nrows=number_of_graphs, squeeze=False)
 
     # set the spacing between subplots
-    plt.subplots_adjust(#left  = 0.125,  # the left side of the subplots of the figure
+    fig.subplots_adjust(#left  = 0.125,  # the left side of the subplots of the figure
     #                    #right = 0.9,    # the right side of the subplots of the figure
     #                    bottom = 0.05,   # the bottom of the subplots of the figure
     #                    #top = 1,      # the top of the subplots of the figure
@@ -51,36 +130,47 @@ def chromoplot(karyotype: pd.DataFrame,
 
     ax[0, 0].set_title(title, color='black', rotation='horizontal', va='center', pad=35, fontsize=20)
 
-    dict={}
-
     for index, row in karyotype.iterrows():
 
+        # Hide the chromosomes that are not drawn
+        if rows is not None and index not in rows:
+            ax[index, 0].set_visible(False)
+            continue
+
         bbox=ax[index, 0].get_position()
 
-        plt.figtext(bbox.p0[0] - len(row['chr']) / 100.0, (bbox.p0[1] + bbox.p1[1]) / 2.0, row['chr'], fontsize=15)
+        fig.text(bbox.p0[0] - len(row['chr']) / 100.0, (bbox.p0[1] + bbox.p1[1]) / 2.0, row['chr'], fontsize=15)
+
+        # Get the number of spline evaluations
+        if adaptive_sampling:
+            samples = spline_samples(ax[index, 0], dpi, bin_number)
+        else:
+            samples = bin_number**2
+
+        # Get the number of pixel columns of the curves
+        columns = max(int(np.ceil(ax[index, 0].get_position().width * fig.get_figwidth() * dpi)), 1)
 
         for target in targets:
         
             size = row['end']
-            bins = np.linspace(0, size, bin_number + 1)
-            counts = []
-
-            for i in range(len(bins) - 1):
-                number_of_matches = len(genes_dataframe[(genes_dataframe['type'] == target) & (genes_dataframe['sequence'] == row['chr'])].loc[
-                                                        ((genes_dataframe['start'] <= bins[i]) & (genes_dataframe['end'] >= bins[i])) | 
-                                                        ((genes_dataframe['start'] <= bins[i+1]) & (genes_dataframe['end'] >= bins[i+1])) |
-                                                        ((genes_dataframe['start'] >= bins[i]) & (genes_dataframe['end'] <= bins[i+1])), :])
-                counts.append(number_of_matches)
+            bins = density[row['chr']]['bins']
+            counts = density[row['chr']]['counts'][target].tolist()
 
             counts.append(counts[-1])
 
+            ax[index, 0].set_xlim([0, size])
+            ax[index, 0].set_ylim([0, max(max(counts), 1)])
+
+            if not fills:
+                continue
+
             bspline = interpolate.make_interp_spline(bins, counts)
         
-            X = np.linspace(0, size, bin_number**2)
+            X = np.linspace(0, size, samples)
             Y = bspline(X)
 
-            ax[index, 0].set_xlim([0, size])
-            ax[index, 0].set_ylim([0, max(max(counts), 1)])
+            if decimate:
+                X, Y = decimate_curve(X, Y, columns)
 
             if target == 'gene':
                 ax[index, 0].fill_between(X, 0, Y, color=GREEN, alpha=0.5)
@@ -106,117 +196,378 @@ def chromoplot(karyotype: pd.DataFrame,
                           bbox_to_anchor=(1.1, 1)
     )
 
-    if output_path:
-        plt.savefig(output_path, dpi=dpi, bbox_inches='tight')
+    return fig
+
+def render_chromoplot_panels(karyotype: pd.DataFrame, density: dict, rows: list, bbox: Bbox, dpi: int, options: dict) -> np.ndarray:
+
+    """
+    Render some chromosomes of the chromoplot into an RGBA raster of the whole output area.
+    This runs in the worker processes of chromoplot(workers=N).
+
+    Parameters:
+        - karyotype (pd.DataFrame): The karyotype DataFrame.
+        - density (dict): The feature density (see compute_feature_density).
+        - rows (list): The positions of the chromosomes to render.
+        - bbox (Bbox): The output area, in inches.
+        - dpi (int): The output resolution.
+        - options (dict): The other draw_chromoplot arguments.
+
+    Returns:
+        - np.ndarray: The (height, width, 4) uint8 raster.
+    """
+
+    fig = draw_chromoplot(karyotype, density, dpi=dpi, rows=rows, **options)
+
+    # Render exactly the output area, as savefig(bbox_inches='tight') does
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='rgba', dpi=dpi, bbox_inches=bbox)
+
+    width = int(bbox.width * dpi)
+
+    return np.frombuffer(buffer.getvalue(), dtype=np.uint8).reshape(-1, width, 4)
+
+def parallel_chromoplot(karyotype: pd.DataFrame, density: dict, output_path: str, dpi: int, workers: int, options: dict) -> None:
+
+    """
+    Render the chromoplot in worker processes and stitch their rasters into the output image.
+
+    Every worker draws the whole figure layout but only its own chromosomes. The main process
+    computes the output area once, from a figure without the density curves, then takes each
+    horizontal band of the image from the worker that drew its chromosome.
+
+    Parameters:
+        - karyotype (pd.DataFrame): The karyotype DataFrame.
+        - density (dict): The feature density (see compute_feature_density).
+        - output_path (str): The path of the raster output image.
+        - dpi (int): The output resolution.
+        - workers (int): The number of worker processes.
+        - options (dict): The other draw_chromoplot arguments.
+    """
+
+    # Compute the output area and the band of each chromosome from the layout only
+    fig = draw_chromoplot(karyotype, density, dpi=dpi, fills=False, **options)
+
+    # Measure the texts at the output resolution, as savefig does
+    fig.set_dpi(dpi)
+
+    renderer = fig.canvas.get_renderer()
+    fig.draw_without_rendering()
+
+    bbox = fig.get_tightbbox(renderer).padded(matplotlib.rcParams['savefig.pad_inches'])
+
+    # A band starts just above the top of its chromosome axes (row 0 of the raster is the top of the area)
+    axes_tops = [a.get_position().y1 * fig.get_figheight() for a in fig.axes]
+    band_starts = [0] + [max(int(np.floor((bbox.y1 - top) * dpi)) - 2, 0) for top in axes_tops[1:]]
+
+    # Split the chromosomes into contiguous chunks, one per task
+    positions = list(range(len(karyotype)))
+    chunks    = [c.tolist() for c in np.array_split(positions, min(workers, len(positions))) if len(c)]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(render_chromoplot_panels, karyotype, density, chunk, bbox, dpi, options) for chunk in chunks]
+        rasters = [f.result() for f in futures]
+
+    # Stitch the bands of each chunk
+    image = rasters[0].copy()
+
+    for chunk, raster in zip(chunks[1:], rasters[1:]):
+        image[band_starts[chunk[0]]:] = raster[band_starts[chunk[0]]:]
+
+    matplotlib.image.imsave(output_path, image, dpi=dpi)
+
+def chromoplot(karyotype: pd.DataFrame, 
+               genes_dataframe,
+               title: str = 'Chromoplot',
+               bin_number: int = 100,
+               dpi: int = 300,
+               plt_show: bool = False,
+               output_path: str = '',
+               targets: list = ['gene', 'mRNA', 'CDS', 'exon'],
+               adaptive_sampling: bool = False,
+               decimate: bool = False,
+               workers: int = 1,
+               page_size: int = 0,
+               fig: Figure = None,
+               cache = None,
+               profile = None
+    ) -> Figure:
+
+    """
+    Plot the karyotype and gene density of each chromosome on separate subplots.
+    The genes_dataframe can also be the path to the gff file: large files are then streamed (see compute_feature_density).
+
+    By default the density splines are evaluated at bin_number**2 points. With adaptive_sampling they are evaluated
+    once per horizontal pixel at the given dpi instead, and with decimate each curve keeps at most four vertices
+    per pixel column, which bounds the size of SVG/PDF outputs without changing the drawing.
+
+    With workers > 1, a raster output (png, jpg, tiff...) is rendered by that many processes, each drawing a
+    chunk of the chromosomes, and stitched together (see parallel_chromoplot). Vector outputs and plt_show
+    always use a single process.
+
+    With page_size > 0, the chromosomes are drawn page_size per page and each page is written and closed before
+    the next one is built (see PageWriter): a '.pdf' output_path gets one multi-page PDF, any other path gets
+    numbered files. The memory is then bounded by one page whatever the number of sequences.
+
+    The figure is drawn on its own Agg canvas (or on fig, when given) and pyplot is only imported for plt_show.
+    The figure is returned, except for the paged and parallel outputs which return None. The pages are closed
+    once written, so plt_show cannot be combined with page_size (ValueError).
+
+    With a cache (a FigureCache or its directory, see figure_cache), an output_path whose inputs and parameters
+    did not change since an earlier call is copied from the cache instead of being rendered, and None is returned.
+
+    With a profile (a Profiler, a callback or a JSON-lines path, see profiling.open_profiler), the time, the memory
+    and the counts of each stage are recorded: the density binning, the drawing, the saving and the cache.
+    """
+
+    karyotype.columns = karyotype.columns.str.lower()
+
+    assert 'chr' in karyotype.columns, 'The karyotype DataFrame must contain the "chr" column.'
+    assert 'end' in karyotype.columns, 'The karyotype DataFrame must contain the "end" column.'
+    assert 'start' in karyotype.columns, 'The karyotype DataFrame must contain the "start" column.'
+
+    if plt_show and page_size > 0 and output_path:
+        raise ValueError('plt_show cannot be combined with page_size: the pages are closed once written.')
+
+    profiler = open_profiler(profile)
+
+    with profiler.function('chromoplot', output=output_path, chromosomes=len(karyotype)) as total:
+
+        # Reuse the cached figure when the inputs and the parameters are unchanged
+        cache = open_figure_cache(cache)
+
+        if cache is not None and output_path:
+            with profiler.stage('cache_restore') as stage:
+                # A gff path is fingerprinted by the content of the file
+                genes_input = InputFile(genes_dataframe) if isinstance(genes_dataframe, (str, os.PathLike)) else genes_dataframe
+
+                key = cache.key('chromoplot', {'karyotype': karyotype, 'genes_dataframe': genes_input, 'title': title,
+                                               'bin_number': bin_number, 'dpi': dpi, 'targets': targets,
+                                               'adaptive_sampling': adaptive_sampling, 'decimate': decimate, 'page_size': page_size,
+                                               'format': os.path.splitext(output_path)[1].lower()})
+
+                stage['hit'] = not plt_show and cache.restore(key, output_path) is not None
+
+            if stage.get('hit'):
+                return None
+
+        # Count the features of each type in each bin of each chromosome
+        with profiler.stage('density', bins=len(karyotype) * bin_number) as stage:
+            density = compute_feature_density(karyotype, genes_dataframe, bin_number=bin_number, targets=targets)
+
+            if isinstance(genes_dataframe, pd.DataFrame):
+                stage['rows'] = len(genes_dataframe)
+
+        options = {'title': title, 'bin_number': bin_number, 'targets': targets,
+                   'adaptive_sampling': adaptive_sampling, 'decimate': decimate}
+
+        # Write the pages one at a time
+        if page_size > 0 and output_path:
+            pages = page_slices(len(karyotype), page_size)
+
+            with PageWriter(output_path, dpi=dpi) as writer:
+                for number, (start, stop) in enumerate(pages, start=1):
+                    page_options = dict(options, title='{} ({}/{})'.format(title, number, len(pages)))
+
+                    with profiler.stage('draw', page=number) as stage:
+                        page_fig = draw_chromoplot(karyotype.iloc[start:stop].reset_index(drop=True), density, dpi=dpi, **page_options)
+                        profiler.count_figure(stage, page_fig)
+
+                    with profiler.stage('savefig', page=number):
+                        writer.save(page_fig)
+
+            if cache is not None:
+                with profiler.stage('cache_store'):
+                    cache.store(key, 'chromoplot', output_path, writer.paths)
+
+            total['pages'] = len(pages)
+
+            return
+
+        # Render the raster outputs in parallel
+        if workers > 1 and len(karyotype) > 1 and output_path and not plt_show and \
+           os.path.splitext(output_path)[1].lower() in RASTER_FORMATS:
+
+            with profiler.stage('parallel_render', workers=workers):
+                parallel_chromoplot(karyotype, density, output_path, dpi, workers, options)
+
+            if cache is not None:
+                with profiler.stage('cache_store'):
+                    cache.store(key, 'chromoplot', output_path, [output_path])
+
+            return
+
+        with profiler.stage('draw') as stage:
+            fig = draw_chromoplot(karyotype, density, dpi=dpi, fig=fig, **options)
+            profiler.count_figure(stage, fig)
+
+        if output_path:
+            with profiler.stage('savefig'):
+                fig.savefig(output_path, dpi=dpi, bbox_inches='tight')
+
+            if cache is not None:
+                with profiler.stage('cache_store'):
+                    cache.store(key, 'chromoplot', output_path, [output_path])
 
     if plt_show:
-        plt.show()
+        show_figure(fig)
 
-    plt.close()
+    return fig
 
 def chromoplot_details(genes_dataframe: pd.DataFrame,
                        title: str = 'Chromoplot',
                        dpi: int = 300,
                        plt_show: bool = False,
                        output_path: str = '',
-    ) -> None:
+                       fig: Figure = None,
+                       cache = None,
+                       profile = None
+    ) -> Figure:
 
-    fig, axd = plt.subplot_mosaic(
-        "AB;CC",
-        figsize=(18, 10),
-    )
-    colors = [ORANGE, BLACK, GREEN, AZURE]
+    """
+    Plot the feature counts of a gff: the counts of each feature type, the features per chromosome and the
+    counts of each type along the chromosomes.
+
+    Parameters:
+        - genes_dataframe (pd.DataFrame): The gff features, with the 'sequence' and 'type' columns.
+        - title (str, optional): The title of the feature type counts. Defaults to 'Chromoplot'.
+        - dpi (int, optional): The resolution of the saved figure. Defaults to 300.
+        - plt_show (bool, optional): Whether to show the figure. Defaults to False.
+        - output_path (str, optional): The path where the figure is saved. Defaults to '' (not saved).
+        - fig (Figure, optional): A figure to draw on instead of a new one. Defaults to None.
+        - cache (str or FigureCache, optional): A figure cache directory. When the features and the parameters of an
+                                                earlier call are unchanged, its output is copied to output_path
+                                                instead of rendering the plot (unless plt_show). Defaults to None.
+        - profile (Profiler, callable or str, optional): Record the time, memory and counts of each stage of the plot
+                                                         (see profiling.open_profiler). Defaults to None.
+
+    Returns:
+        - Figure: The figure it drew (None when it is taken from the cache). It is not registered with pyplot.
+    """
 
-    ########################## First plot ##########################
+    profiler = open_profiler(profile)
 
-    x_axis = genes_dataframe['type'].unique()
-    y_axis = genes_dataframe['type'].value_counts().values
+    with profiler.function('chromoplot_details', output=output_path, rows=len(genes_dataframe)):
 
-    axd['A'].set_title(title, color='black', rotation='horizontal', va='center', ha='center', pad=35, fontsize=16)
+        # Reuse the cached figure when the features and the parameters are unchanged
+        cache = open_figure_cache(cache)
 
-    # Add grid
-    axd['A'].grid(True)
-    axd['A'].set_xlabel('Feature type', fontsize=14)
-    axd['A'].set_ylabel('Counts', fontsize=14)
+        if cache is not None and output_path:
+            with profiler.stage('cache_restore') as stage:
+                key = cache.key('chromoplot_details', {'genes_dataframe': genes_dataframe, 'title': title, 'dpi': dpi,
+                                                       'format': os.path.splitext(output_path)[1].lower()})
 
-    vc = genes_dataframe['type'].value_counts()
+                stage['hit'] = not plt_show and cache.restore(key, output_path) is not None
 
-    axd['A'].set_ylim(0, vc.max() + 15)
+            if stage.get('hit'):
+                return None
 
-    x_axis = vc.index
-    y_axis = vc.values
+        with profiler.stage('draw') as stage:
 
-    axd['A'].bar(x=x_axis, height=y_axis, color=colors, alpha=0.8, width=0.4)
+            fig = new_figure(figsize=(18, 10), fig=fig)
+            axd = fig.subplot_mosaic(
+                "AB;CC",
+            )
+            colors = [ORANGE, BLACK, GREEN, AZURE]
 
-    for i in range(len(x_axis)):
-        axd['A'].annotate(y_axis[i], xy=(x_axis[i], y_axis[i]), ha='center', va='bottom', fontsize=12)
+            ########################## First plot ##########################
 
-    ########################## Second plot ##########################
+            x_axis = genes_dataframe['type'].unique()
+            y_axis = genes_dataframe['type'].value_counts().values
 
-    N = 18
-    ind = np.arange(N) 
-    width = 0.25
+            axd['A'].set_title(title, color='black', rotation='horizontal', va='center', ha='center', pad=35, fontsize=16)
 
-    # Add grid
-    axd['C'].grid(True)
-    axd['C'].set_xlabel('Chromosome', fontsize=14)
-    axd['C'].set_ylabel('Counts', fontsize=14)
+            # Add grid
+            axd['A'].grid(True)
+            axd['A'].set_xlabel('Feature type', fontsize=14)
+            axd['A'].set_ylabel('Counts', fontsize=14)
 
-    gb = genes_dataframe.groupby(['sequence', 'type']).size()
+            vc = genes_dataframe['type'].value_counts()
 
-    x_axis = gb.index.get_level_values(0).unique()
+            axd['A'].set_ylim(0, vc.max() + 15)
 
-    for target, color, idx in zip(['gene', 'mRNA', 'CDS', 'exon'], colors, range(4)):
+            x_axis = vc.index
+            y_axis = vc.values
 
-        y_axis = gb.xs(target, level=1).values
+            axd['A'].bar(x=x_axis, height=y_axis, color=colors, alpha=0.8, width=0.4)
 
-        axd['C'].plot(ind, y_axis, width, color=colors[idx], alpha=0.8)
-    
-    axd['C'].set_xticks(ind, labels=x_axis, rotation=45)
+            for i in range(len(x_axis)):
+                axd['A'].annotate(y_axis[i], xy=(x_axis[i], y_axis[i]), ha='center', va='bottom', fontsize=12)
 
-    # Write the legend
-    axd['C'].legend(handles=[Rectangle((0,0),1,1, color=GREEN), 
-                             Rectangle((0,0),1,1, color=AZURE), 
-                             Rectangle((0,0),1,1, color=BLACK),
-                             Rectangle((0,0),1,1, color=ORANGE),],
-                             labels=['Gene', 'mRNA', 'CDS', 'exon'], 
-                             bbox_to_anchor=(1, 1)
-    )
+            ########################## Second plot ##########################
 
-    ########################## Third plot ##########################
+            N = 18
+            ind = np.arange(N) 
+            width = 0.25
 
-    # Create the plot of distribution gene length
+            # Add grid
+            axd['C'].grid(True)
+            axd['C'].set_xlabel('Chromosome', fontsize=14)
+            axd['C'].set_ylabel('Counts', fontsize=14)
 
-    axd['B'].set_title('Gene length distribution', color='black', rotation='horizontal', va='center', ha='center', pad=35, fontsize=16)
+            gb = genes_dataframe.groupby(['sequence', 'type']).size()
 
-    # Add grid
-    axd['B'].grid(True)
+            x_axis = gb.index.get_level_values(0).unique()
 
-    gb = genes_dataframe.groupby('sequence').size()
+            for target, color, idx in zip(['gene', 'mRNA', 'CDS', 'exon'], colors, range(4)):
 
-    x_axis = gb.index
+                y_axis = gb.xs(target, level=1).values
 
-    y_axis = gb.values
+                axd['C'].plot(ind, y_axis, width, color=colors[idx], alpha=0.8)
 
-    axd['B'].set_xlabel('Chromosome', fontsize=14)
+            axd['C'].set_xticks(ind, labels=x_axis, rotation=45)
 
-    axd['B'].set_ylabel('Counts', fontsize=14)
+            # Write the legend
+            axd['C'].legend(handles=[Rectangle((0,0),1,1, color=GREEN), 
+                                     Rectangle((0,0),1,1, color=AZURE), 
+                                     Rectangle((0,0),1,1, color=BLACK),
+                                     Rectangle((0,0),1,1, color=ORANGE),],
+                                     labels=['Gene', 'mRNA', 'CDS', 'exon'], 
+                                     bbox_to_anchor=(1, 1)
+            )
 
-    # Create the dotplot
+            ########################## Third plot ##########################
 
-    axd['B'].plot(x_axis, y_axis, 'o', color=ORANGE, alpha=0.8)
+            # Create the plot of distribution gene length
 
-    # Write the legend
-    #ax.legend(handles=[Rectangle((0,0),1,1, color=GREEN), 
-    #                   Rectangle((0,0),1,1, color=AZURE), 
-    #                   Rectangle((0,0),1,1, color=BLACK),
-    #                   Rectangle((0,0),1,1, color=ORANGE),],
-    #                   labels=['Gene', 'mRNA', 'CDS', 'exon', 'Gene + mRNA'], 
-    #                   bbox_to_anchor=(1, 1)
-    #)
+            axd['B'].set_title('Gene length distribution', color='black', rotation='horizontal', va='center', ha='center', pad=35, fontsize=16)
+
+            # Add grid
+            axd['B'].grid(True)
+
+            gb = genes_dataframe.groupby('sequence').size()
+
+            x_axis = gb.index
+
+            y_axis = gb.values
 
-    if output_path:
-        plt.savefig(output_path, dpi=dpi, bbox_inches='tight')
+            axd['B'].set_xlabel('Chromosome', fontsize=14)
+
+            axd['B'].set_ylabel('Counts', fontsize=14)
+
+            # Create the dotplot
+
+            axd['B'].plot(x_axis, y_axis, 'o', color=ORANGE, alpha=0.8)
+
+            # Write the legend
+            #ax.legend(handles=[Rectangle((0,0),1,1, color=GREEN), 
+            #                   Rectangle((0,0),1,1, color=AZURE), 
+            #                   Rectangle((0,0),1,1, color=BLACK),
+            #                   Rectangle((0,0),1,1, color=ORANGE),],
+            #                   labels=['Gene', 'mRNA', 'CDS', 'exon', 'Gene + mRNA'], 
+            #                   bbox_to_anchor=(1, 1)
+            #)
+
+            profiler.count_figure(stage, fig)
+
+        if output_path:
+            with profiler.stage('savefig'):
+                fig.savefig(output_path, dpi=dpi, bbox_inches='tight')
+
+            if cache is not None:
+                with profiler.stage('cache_store'):
+                    cache.store(key, 'chromoplot_details', output_path, [output_path])
 
     if plt_show:
-        plt.show()
\ No newline at end of file
+        show_figure(fig)
+
+    return fig
@@ -214,3 +214,37 @@ class Chromosome:
             return (position * (self.x_end - self.x_start) / self.size + self.x_start, self.y_end)            
         else:
             return (self.x_end, position * (self.y_end - self.y_start) / self.size + self.y_start)
+
+def chromosome_transforms(chromosomes: dict) -> pd.DataFrame:
+
+    """
+    Collect the affine transforms that map a position to the plot coordinates of each chromosome.
+
+    A position p is drawn at (offset + p * scale, fixed) on horizontal chromosomes
+    and at (fixed, offset + p * scale) on vertical ones, as in Chromosome.get_relative_position.
+
+    Parameters:
+        - chromosomes (dict): Dictionary mapping sequence names to Chromosome objects.
+
+    Returns:
+        - pd.DataFrame: A DataFrame indexed by sequence name with the "offset", "scale", "fixed",
+                        "horizontal", "y_start" and "y_end" columns.
+    """
+
+    c = list(chromosomes.values())
+
+    horizontal = np.array([x.horizontal for x in c], dtype=bool)
+    x_start    = np.array([x.x_start for x in c], dtype=np.float64)
+    x_end      = np.array([x.x_end for x in c], dtype=np.float64)
+    y_start    = np.array([x.y_start for x in c], dtype=np.float64)
+    y_end      = np.array([x.y_end for x in c], dtype=np.float64)
+    size       = np.array([x.size for x in c], dtype=np.float64)
+
+    return pd.DataFrame({
+        'offset': np.where(horizontal, x_start, y_start),
+        'scale': np.where(horizontal, x_end - x_start, y_end - y_start) / size,
+        'fixed': np.where(horizontal, y_end, x_end),
+        'horizontal': horizontal,
+        'y_start': y_start,
+        'y_end': y_end
+    }, index=pd.Index(list(chromosomes.keys()), name='sequence'))
@@ -0,0 +1,295 @@
+# -*- coding: utf-8 -*-
+
+#Importing libraries
+import os
+
+import numpy as np
+import pandas as pd
+
+from matplotlib.axes import Axes
+from matplotlib.collections import LineCollection, PolyCollection
+from matplotlib.figure import Figure
+from matplotlib.patches import Rectangle
+
+# Import the synteny plot functions
+from ..graphics.figure import new_figure, show_figure
+from ..graphics.link import quadratic_bezier_curves
+from ..graphics.synteny import MAX_FANOUT, sequence_link_colors, shared_buscos
+from ..utils.figure_cache import open_figure_cache
+from ..utils.profiling import open_profiler
+
+# Set the radius of the inner edge of the chromosome arcs
+RADIUS = 1.0
+
+# Set the number of points of each chord and of each chromosome arc
+CHORD_POINTS = 50
+ARC_POINTS   = 64
+
+def circular_transforms(karyotype: pd.DataFrame, start: float, span: float, chr_gap: float) -> pd.DataFrame:
+
+    """
+    Compute the angular position of the chromosomes of a karyotype, laid out clockwise on an arc of the circle.
+
+    A position p of a chromosome is drawn at the angle offset + p * scale, in radians clockwise from the top.
+
+    Parameters:
+        - karyotype (pd.DataFrame): The karyotype, with its 'chr' and 'end' columns.
+        - start (float): The angle of the start of the first chromosome.
+        - span (float): The angle covered by the karyotype, gaps included.
+        - chr_gap (float): The angle between two chromosomes.
+
+    Returns:
+        - pd.DataFrame: A DataFrame indexed by sequence name with the "offset", "scale" and "end" angles of each chromosome.
+    """
+
+    lengths = karyotype['end'].to_numpy(dtype=np.float64)
+
+    # Share the arc between the chromosomes, in proportion to their lengths
+    scale  = (span - chr_gap * (len(lengths) - 1)) / lengths.sum()
+    widths = lengths * scale
+
+    offset = start + np.concatenate([[0], np.cumsum(widths + chr_gap)[:-1]])
+
+    return pd.DataFrame({'offset': offset, 'scale': scale, 'end': offset + widths}, index=karyotype['chr'].to_numpy())
+
+def polar_to_cartesian(theta: np.ndarray, r) -> np.ndarray:
+
+    """
+    Convert angles (clockwise from the top) and radii into plot coordinates.
+
+    Parameters:
+        - theta (np.ndarray): The angles in radians.
+        - r (float or np.ndarray): The radii.
+
+    Returns:
+        - np.ndarray: The x and y coordinates, stacked on the last axis.
+    """
+
+    return np.stack([r * np.sin(theta), r * np.cos(theta)], axis=-1)
+
+def chromosome_arcs(transforms: pd.DataFrame, width: float, n_points: int = ARC_POINTS) -> np.ndarray:
+
+    """
+    Build the outline of every chromosome, a ring sector between RADIUS and RADIUS + width.
+
+    Parameters:
+        - transforms (pd.DataFrame): The chromosome angles (see circular_transforms).
+        - width (float): The width of the ring.
+        - n_points (int, optional): The number of points of each edge. Defaults to 64.
+
+    Returns:
+        - np.ndarray: A (n_chromosomes, 2 * n_points, 2) array, the outer edge then the inner edge backwards.
+    """
+
+    t = np.linspace(0, 1, n_points)
+
+    theta = transforms['offset'].to_numpy()[:, None] + (transforms['end'] - transforms['offset']).to_numpy()[:, None] * t
+
+    return np.concatenate([polar_to_cartesian(theta, RADIUS + width), polar_to_cartesian(theta[:, ::-1], RADIUS)], axis=1)
+
+def chord_curves(theta_1: np.ndarray, theta_2: np.ndarray, n_points: int = CHORD_POINTS) -> np.ndarray:
+
+    """
+    Build the chords between angles of the inner circle, as quadratic Bezier curves.
+
+    The control point of each chord is on the bisector of its two angles, closer to the center the farther
+    apart the angles are, so that opposite chromosomes are joined by nearly straight lines and close ones by
+    shallow curves.
+
+    Parameters:
+        - theta_1 (np.ndarray): The start angle of each chord.
+        - theta_2 (np.ndarray): The end angle of each chord.
+        - n_points (int, optional): The number of points of each chord. Defaults to 50.
+
+    Returns:
+        - np.ndarray: A (n_chords, n_points, 2) array with the points of each chord.
+    """
+
+    # The signed angle between the two ends, along the shorter arc
+    delta = np.angle(np.exp(1j * (theta_2 - theta_1)))
+
+    control_points = np.stack([polar_to_cartesian(theta_1, RADIUS),
+                               polar_to_cartesian(theta_1 + delta / 2, RADIUS * (1 - np.abs(delta) / np.pi)),
+                               polar_to_cartesian(theta_2, RADIUS)], axis=1)
+
+    return quadratic_bezier_curves(control_points, n_points)
+
+def plot_chromosome_arcs(transforms: pd.DataFrame, color: str, width: float, ax: Axes) -> None:
+
+    """
+    Plots the chromosomes of a karyotype as ring sectors, with their names outside the ring.
+
+    Parameters:
+        - transforms (pd.DataFrame): The chromosome angles (see circular_transforms).
+        - color (str): The chromosome color.
+        - width (float): The width of the ring.
+        - ax (Axes): Matplotlib axes object to plot the chromosomes on.
+
+    Returns:
+        - None
+    """
+
+    ax.add_collection(PolyCollection(chromosome_arcs(transforms, width), facecolors=color, edgecolors='black', linewidths=0.6), autolim=False)
+
+    # Write the names along the radius, upright on both sides of the circle
+    middle = ((transforms['offset'] + transforms['end']) / 2).to_numpy()
+    points = polar_to_cartesian(middle, RADIUS + width * 1.5)
+
+    for name, theta, (x, y) in zip(transforms.index, middle, points):
+        right    = np.sin(theta) >= 0
+        rotation = 90 - np.degrees(theta) if right else 270 - np.degrees(theta)
+
+        ax.text(x, y, name, rotation=rotation, rotation_mode='anchor', ha='left' if right else 'right', va='center', fontsize=6)
+
+def circular_synteny_plot(ft_1: pd.DataFrame,
+                          ft_2: pd.DataFrame,
+                          karyotype_1: pd.DataFrame,
+                          karyotype_2: pd.DataFrame,
+                          title: str = 'Synteny plot',
+                          dim: float = 0.05,
+                          figsize=(12, 12),
+                          dpi: int = 300,
+                          chr_gap: float = 0.5,
+                          genome_gap: float = 10,
+                          link_colors: dict = {},
+                          duplicated: bool = False,
+                          max_fanout: int = MAX_FANOUT,
+                          output_path: str = None,
+                          bbox_inches: str = 'tight',
+                          plt_show: bool = False,
+                          fig: Figure = None,
+                          cache = None,
+                          profile = None
+) -> Figure:
+    """
+    Generate a circular synteny plot: the chromosomes of the two genomes around a circle, each genome on
+    one half, and a chord for each shared BUSCO.
+
+    Parameters:
+        - ft_1 (pd.DataFrame): Full table for the first karyotype.
+        - ft_2 (pd.DataFrame): Full table for the second karyotype.
+        - karyotype_1 (pd.DataFrame): Karyotype dataframe for the first karyotype (right half).
+        - karyotype_2 (pd.DataFrame): Karyotype dataframe for the second karyotype (left half).
+        - title (str, optional): The title of the plot. Defaults to 'Synteny plot'.
+        - dim (float, optional): The width of the chromosome ring, the circle radius being 1. Defaults to 0.05.
+        - figsize (tuple, optional): The size of the plot figure. Defaults to (12, 12).
+        - dpi (int, optional): The resolution of the plot figure. Defaults to 300.
+        - chr_gap (float, optional): The gap between two chromosomes, in degrees. Defaults to 0.5.
+        - genome_gap (float, optional): The gap between the two genomes, in degrees. Defaults to 10.
+        - link_colors (dict, optional): A dictionary mapping link colors to sequence names. Defaults to {}.
+        - duplicated (bool, optional): Whether to link the Duplicated BUSCOs too, every hit in the first genome with
+                                       every hit in the second one. Defaults to False (Complete BUSCOs only).
+        - max_fanout (int, optional): The maximum number of Duplicated hits of a BUSCO linked in each genome. Defaults to 4.
+        - output_path (str, optional): The path to save the plot to. Defaults to None.
+        - plt_show (bool, optional): Whether to show the plot. Defaults to False.
+        - fig (Figure, optional): A figure to draw on instead of a new one. Defaults to None.
+        - cache (str or FigureCache, optional): A figure cache directory. When the inputs and the parameters of an
+                                                earlier call are unchanged, its output is copied to output_path
+                                                instead of rendering the plot (unless plt_show). Defaults to None.
+        - profile (Profiler, callable or str, optional): Record the time, memory and counts of each stage of the plot
+                                                         (see profiling.open_profiler). Defaults to None.
+
+    Returns:
+        - Figure: The synteny plot figure (None when it is taken from the cache). It is not registered with pyplot.
+    """
+
+    # Lowercase the column names, on copies so that the input frames can be shared between threads
+    karyotype_1 = karyotype_1.rename(columns=str.lower)
+    karyotype_2 = karyotype_2.rename(columns=str.lower)
+
+    profiler = open_profiler(profile)
+
+    with profiler.function('circular_synteny_plot', output=output_path):
+
+        # Reuse the cached figure when the inputs and the parameters are unchanged
+        cache = open_figure_cache(cache)
+
+        if cache is not None and output_path:
+            with profiler.stage('cache_restore') as stage:
+                key = cache.key('circular_synteny_plot', {'ft_1': ft_1, 'ft_2': ft_2, 'karyotype_1': karyotype_1, 'karyotype_2': karyotype_2,
+                                                          'title': title, 'dim': dim, 'figsize': figsize, 'dpi': dpi, 'chr_gap': chr_gap,
+                                                          'genome_gap': genome_gap, 'link_colors': link_colors, 'bbox_inches': bbox_inches,
+                                                          'duplicated': duplicated, 'max_fanout': max_fanout,
+                                                          'format': os.path.splitext(output_path)[1].lower()})
+
+                stage['hit'] = not plt_show and cache.restore(key, output_path) is not None
+
+            if stage.get('hit'):
+                return None
+
+        # Create a new figure and axis
+        fig = new_figure(figsize=figsize, dpi=dpi, fig=fig)
+        ax  = fig.subplots()
+
+        # Turn off the axis and keep the circle round
+        ax.axis('off')
+        ax.set_aspect('equal')
+
+        # Set the x and y limits of the plot
+        limit = RADIUS + dim + 0.25
+
+        ax.set_xlim([-limit, limit])
+        ax.set_ylim([-limit, limit])
+
+        # Insert the plot title
+        ax.text(0, limit, karyotype_1['organism'][0] + ' - ' + karyotype_2['organism'][0] + ' ' + title, fontsize=20, ha='center')
+
+        # Give each genome a half of the circle
+        with profiler.stage('karyotypes') as stage:
+            gap = np.radians(genome_gap)
+
+            transforms_1 = circular_transforms(karyotype_1, gap / 2, np.pi - gap, np.radians(chr_gap))
+            transforms_2 = circular_transforms(karyotype_2, np.pi + gap / 2, np.pi - gap, np.radians(chr_gap))
+
+            stage['chromosomes'] = len(transforms_1) + len(transforms_2)
+
+        # Generate the chords of the shared BUSCOs
+        with profiler.stage('links', rows=len(ft_1) + len(ft_2)) as stage:
+            df = shared_buscos(ft_1, ft_2, dict.fromkeys(transforms_2.index), dict.fromkeys(transforms_1.index), duplicated, max_fanout)
+
+            idx_1 = transforms_1.index.get_indexer(df['sequence_x'])
+            idx_2 = transforms_2.index.get_indexer(df['sequence_y'])
+
+            # Map the positions to angles
+            theta_1 = transforms_1['offset'].to_numpy()[idx_1] + df['gene_start_x'].to_numpy(dtype=np.float64) * transforms_1['scale'].to_numpy()[idx_1]
+            theta_2 = transforms_2['offset'].to_numpy()[idx_2] + df['gene_start_y'].to_numpy(dtype=np.float64) * transforms_2['scale'].to_numpy()[idx_2]
+
+            chords = chord_curves(theta_1, theta_2)
+
+            color_index, colors = sequence_link_colors(df['sequence_x'], df['sequence_y'], link_colors)
+
+            stage['links'] = len(chords)
+
+        with profiler.stage('draw') as stage:
+
+            # Plot the chords
+            if len(chords) > 0:
+                ax.add_collection(LineCollection(chords, colors=[colors[i] for i in color_index], linestyles='-', linewidths=0.5), autolim=False)
+
+            # Plot the chromosomes
+            plot_chromosome_arcs(transforms_1, karyotype_1['color'][0], dim, ax)
+            plot_chromosome_arcs(transforms_2, karyotype_2['color'][0], dim, ax)
+
+            # Write the legend
+            ax.legend(handles=[Rectangle((0,0),1,1, color=karyotype_1['color'][0]),
+                               Rectangle((0,0),1,1, color=karyotype_2['color'][0])],
+                               labels=[karyotype_1['organism'][0], karyotype_2['organism'][0]],
+                               loc='upper right'
+            )
+
+            profiler.count_figure(stage, fig)
+
+        # Save the plot if output path is provided
+        if output_path is not None:
+            with profiler.stage('savefig'):
+                fig.savefig(output_path, dpi=dpi, bbox_inches=bbox_inches)
+
+            if cache is not None:
+                with profiler.stage('cache_store'):
+                    cache.store(key, 'circular_synteny_plot', output_path, [output_path])
+
+    # Show the plot
+    if plt_show:
+        show_figure(fig)
+
+    return fig
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+# Helpers to create and show figures without the pyplot global state.
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+def new_figure(figsize: (float, float), dpi: float = None, fig: Figure = None) -> Figure:
+
+    """
+    Create a figure attached to its own Agg canvas, or reset the given one.
+    The figure is not registered with pyplot, so it can be drawn and saved from any thread.
+
+    Parameters:
+        - figsize (tuple): The size of the figure in inches.
+        - dpi (float, optional): The resolution of the figure. Defaults to the matplotlib default.
+        - fig (Figure, optional): A figure to reuse instead of creating a new one. Defaults to None.
+
+    Returns:
+        - Figure: The empty figure.
+    """
+
+    if fig is None:
+        fig = Figure(figsize=figsize, dpi=dpi)
+        FigureCanvasAgg(fig)
+    else:
+        fig.clear()
+        fig.set_size_inches(figsize)
+
+        if dpi is not None:
+            fig.set_dpi(dpi)
+
+    return fig
+
+def show_figure(fig: Figure) -> None:
+
+    """
+    Show a figure through pyplot. This is the only place where pyplot is imported.
+
+    Parameters:
+        - fig (Figure): The figure to show.
+    """
+
+    import matplotlib.pyplot as plt
+
+    # Hand the figure to a new pyplot manager
+    manager = plt.figure(figsize=fig.get_size_inches(), dpi=fig.dpi).canvas.manager
+    manager.canvas.figure = fig
+    fig.set_canvas(manager.canvas)
+
+    plt.show()
+
+    plt.close(manager.num)
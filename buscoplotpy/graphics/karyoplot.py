@@ -1,10 +1,18 @@
 # -*- coding: utf-8 -*-
 
 #Importing libraries
-import matplotlib.pyplot as plt
+import os
+
+import numpy as np
 import pandas as pd
 
 from ..graphics.chromosome import Chromosome
+from ..graphics.figure import new_figure, show_figure
+from ..graphics.paging import PageWriter, page_slices
+from ..utils.figure_cache import open_figure_cache
+from ..utils.profiling import open_profiler
+from matplotlib.collections import PolyCollection
+from matplotlib.figure import Figure
 from matplotlib.patches import Rectangle
 
 # Define the colors
@@ -14,78 +22,101 @@ AZURE = {'Complete':'#50c7fa', 'Duplicated':'gray', 'Fragmented':'black'}
 # Define constants
 CHR_FACTOR = 9.0 / 10.0
 
-def karyoplot(karyotype: pd.DataFrame, 
-              output_file: str = '', 
-              title: str = 'Karyoplot', 
-              fulltable: pd.DataFrame = None, 
-              selected_sequences: list = [],
-              dpi: int = 300, 
-              chrs_limit: int = 30, 
-              plt_show: bool = False,
-              palette: str in ['green', 'azure'] = 'green',
-              bbox_inches: str = 'tight',
-              dim: int = 2
-) -> None:
+def region_collection(x: np.ndarray, y: np.ndarray, width: np.ndarray, height: np.ndarray, color: str, linewidth: int = 1) -> PolyCollection:
 
     """
-    Plot a karyotype based on the karyotype file and the BUSCO fulltable.
+    Build a single collection drawing many rectangular regions of the same color.
+
+    Parameters:
+        - x (np.ndarray): The x-coordinates of the anchor points of the regions.
+        - y (np.ndarray): The y-coordinates of the anchor points of the regions.
+        - width (np.ndarray): The widths of the regions.
+        - height (np.ndarray): The heights of the regions.
+        - color (str): The color of the regions.
+        - linewidth (int, optional): The linewidth of the regions. Defaults to 1.
+
+    Returns:
+        - PolyCollection: The collection of the regions, drawn like Rectangle patches with the same color.
+    """
+
+    x0 = np.asarray(x, dtype=np.float64)
+    y0 = np.asarray(y, dtype=np.float64)
+    x1 = x0 + np.asarray(width, dtype=np.float64)
+    y1 = y0 + np.asarray(height, dtype=np.float64)
+
+    #:                +------------------+
+    #:                |                  |
+    #:              height               |
+    #:                |                  |
+    #:               (xy)---- width -----+
+
+    verts = np.stack([np.column_stack([x0, y0]),
+                      np.column_stack([x1, y0]),
+                      np.column_stack([x1, y1]),
+                      np.column_stack([x0, y1])], axis=1)
+
+    return PolyCollection(verts, facecolors=color, edgecolors=color, linewidths=linewidth)
+
+def partition_by_sequence(fulltable: pd.DataFrame) -> (pd.DataFrame, dict):
+
+    """
+    Sort the full table by sequence once, so that the hits of each sequence are a contiguous slice.
 
     Parameters:
-        - karyotype (pd.DataFrame): The karyotype DataFrame.
-        - output_file (str, optional): The path to save the output plot.
-        - title (str, optional): The title of the plot.
         - fulltable (pd.DataFrame): The BUSCO's full table DataFrame.
-        - dpi (int, optional): The DPI (dots per inch) of the output plot. Default is 300.
-        - chrs_limit (int, optional): The maximum number of chromosomes to plot. Default is 30.
-        - plt_show (bool, optional): Whether to show the plot. Default is False.
-        - palette (str, optional): The color palette to use. Default is 'green'.
-        - bbox_inches (str, optional): The bbox_inches parameter of the plt.savefig() function. Default is 'tight'.
-        - dim (int, optional): The dimension of the chromosomes. Defaults to 2.
 
-    Output:
-        - The karyotype plot in png format.
+    Returns:
+        - pd.DataFrame: The full table sorted by sequence (the order of the hits within a sequence is kept).
+        - dict: A dictionary mapping each sequence name to the (start, end) row bounds of its slice.
+    """
+
+    # Sort the hits by sequence, keeping their order within each sequence
+    partition = fulltable.dropna(subset=['sequence']).sort_values('sequence', kind='stable')
+
+    # The groups are contiguous, so their sizes give the slice bounds
+    sizes = partition.groupby('sequence', sort=False, observed=True).size()
+
+    ends   = np.cumsum(sizes.to_numpy())
+    starts = ends - sizes.to_numpy()
+
+    return partition, dict(zip(sizes.index, zip(starts, ends)))
+
+def draw_karyoplot(karyotype: pd.DataFrame,
+                   hits: tuple,
+                   title: str,
+                   selected: dict,
+                   dpi: int,
+                   dim: int,
+                   chr_max_len: int,
+                   chr_max_dim: float,
+                   fig: Figure = None
+) -> Figure:
+
+    """
+    Draw the karyoplot figure of the given chromosomes.
+
+    Parameters:
+        - karyotype (pd.DataFrame): The karyotype DataFrame of the chromosomes to draw (default index).
+        - hits (tuple): The slice bounds of each sequence, and the gene starts, gene ends and colors of the partitioned full table.
+        - title (str): The title of the plot.
+        - selected (dict): The color of each status.
+        - dpi (int): The DPI (dots per inch) of the figure.
+        - dim (int): The dimension of the chromosomes.
+        - chr_max_len (int): The maximum length of the chromosome names.
+        - chr_max_dim (float): The length of the longest chromosome, which sets the horizontal scale.
+        - fig (Figure, optional): A figure to draw on instead of a new one. Defaults to None.
 
     Returns:
-        - None
+        - Figure: The karyoplot figure.
     """
-    
-    # Selecting the right palette
-    if palette == 'green':
-        selected = GREEN
-    elif palette == 'azure':
-        selected = AZURE
-
-    # Lowercase the column names
-    karyotype.columns = karyotype.columns.str.lower()
-
-    # Remove rows where status is 'Missing'
-    fulltable = fulltable[fulltable['status'] != 'Missing']
-
-    # If the number of chromosomes is greater than chr_limit,
-    #   then select the most significant chromosomes
-    if len(karyotype) > chrs_limit:
-            
-        if selected_sequences:
-            karyotype = karyotype[karyotype['sequence'].isin(selected_sequences)]
-
-        elif len(fulltable) == 0:
-            karyotype = karyotype.iloc[:chrs_limit, :]
-        else:
-            karyotype.set_index('chr', inplace=True)
-
-            # Select the most significant chromosomes (the chromosomes with more hits)
-            first_chrs = fulltable['sequence'].value_counts().index.to_list()[:chrs_limit]
-            karyotype = karyotype.loc[first_chrs].sort_values(by='end', ascending=False)
-            karyotype = karyotype.reset_index()
 
     # Calculate the limits of the plot
     X_lim = 100
     Y_lim = dim * len(karyotype) + 5 + dim
 
-    print("X_lim: " + str(X_lim), "Y_lim: " + str(Y_lim), "dim: " + str(20*Y_lim/X_lim))
-
     # Create a new figure and axis
-    fig, ax   = plt.subplots(figsize=(20, 20*Y_lim/X_lim), dpi=dpi)
+    fig = new_figure(figsize=(20, 20*Y_lim/X_lim), dpi=dpi, fig=fig)
+    ax  = fig.subplots()
 
     # Turn off the axis
     ax.axis('off')
@@ -94,14 +125,17 @@ def karyoplot(karyotype: pd.DataFrame,
     ax.set_xlim([0, X_lim])
     ax.set_ylim([0, Y_lim])
 
-    # Insert the plot title
-    ax.text(X_lim / 2, Y_lim - 1, karyotype['organism'][0] + ' ' + title, fontsize=20, ha='center')
+    # Insert the plot title, after the organism name of the karyotype (if any)
+    organism = karyotype['organism'][0] if 'organism' in karyotype.columns else ''
+
+    ax.text(X_lim / 2, Y_lim - 1, organism + ' ' + title, fontsize=20, ha='center')
 
-    # Calculate the maximum length of the chromosome name
-    chr_max_len = len(max(karyotype['chr'], key=len))
+    # Get the hits of the full table
+    bounds, gene_start, gene_end, region_color = hits
 
-    # Get the maximum length of the chromosome
-    chr_max_dim = karyotype['end'].max()
+    # Regions of each color, drawn as one collection per color
+    colors  = list(dict.fromkeys(selected.values()))
+    regions = {color: [] for color in colors}
 
     # Plot the karyotypes
     for index, row in karyotype.iterrows():
@@ -121,29 +155,35 @@ def karyoplot(karyotype: pd.DataFrame,
         # Add the name of the chromosome
         C.add_label(x=0.0, y=(y_start + y_end) / 2, text=row['chr'], ha='center', va='center')   
 
-        # Create all chromosome region
-        for i, item in fulltable[fulltable['sequence'] == row.chr].iterrows():
+        # Get the slice of the chromosome hits
+        lo, hi = bounds.get(row['chr'], (0, 0))
 
-            # Define the coordinates for the region
-            converted_start_pos = item['gene_start'] * (x_end - x_start) / chr_dim
-            converted_end_pos   = item['gene_end']   * (x_end - x_start) / chr_dim
+        # Define the coordinates for all the chromosome regions
+        scale = (x_end - x_start) / chr_dim
 
-            anchor_point = (x_start + converted_start_pos, y_start)
-            width        = converted_end_pos - converted_start_pos
-            height       = y_end - y_start
+        x     = x_start + gene_start[lo:hi] * scale
+        width = (gene_end[lo:hi] - gene_start[lo:hi]) * scale
 
-            #:                +------------------+
-            #:                |                  |
-            #:              height               |
-            #:                |                  |
-            #:               (xy)---- width -----+
+        # Add the regions to the regions of their color
+        for color in colors:
+            mask = region_color[lo:hi] == color
 
-            # Add the seleted region to the chromosome
-            C.add_region(anchor_point=anchor_point, width=width, height=height, color=selected[item['status']], linewidth=1)
+            if mask.any():
+                regions[color].append((x[mask], width[mask], y_start, y_end - y_start))
         
         # Plot the chromosome
         C.plot(fig, ax)
 
+    # Plot the regions
+    for color, chunks in regions.items():
+        if chunks:
+            x      = np.concatenate([c[0] for c in chunks])
+            width  = np.concatenate([c[1] for c in chunks])
+            y      = np.concatenate([np.full(len(c[0]), c[2]) for c in chunks])
+            height = np.concatenate([np.full(len(c[0]), c[3]) for c in chunks])
+
+            ax.add_collection(region_collection(x, y, width, height, color=color, linewidth=1), autolim=False)
+
     # Write the legend
     ax.legend(handles=[Rectangle((0,0),1,1, color=selected['Complete']), 
                         Rectangle((0,0),1,1, color=selected['Duplicated']), 
@@ -152,11 +192,168 @@ def karyoplot(karyotype: pd.DataFrame,
                         loc='upper right',
     )
 
-    # Save and show the plot
-    if output_file:
-        plt.savefig(output_file, dpi=dpi, bbox_inches=bbox_inches)
+    return fig
+
+def karyoplot(karyotype: pd.DataFrame, 
+              output_file: str = '', 
+              title: str = 'Karyoplot', 
+              fulltable: pd.DataFrame = None, 
+              selected_sequences: list = [],
+              dpi: int = 300, 
+              chrs_limit: int = 30, 
+              plt_show: bool = False,
+              palette: str in ['green', 'azure'] = 'green',
+              bbox_inches: str = 'tight',
+              dim: int = 2,
+              page_size: int = 0,
+              fig: Figure = None,
+              cache = None,
+              profile = None
+) -> Figure:
+
+    """
+    Plot a karyotype based on the karyotype file and the BUSCO fulltable.
+
+    Parameters:
+        - karyotype (pd.DataFrame): The karyotype DataFrame.
+        - output_file (str, optional): The path to save the output plot.
+        - title (str, optional): The title of the plot.
+        - fulltable (pd.DataFrame): The BUSCO's full table DataFrame.
+        - dpi (int, optional): The DPI (dots per inch) of the output plot. Default is 300.
+        - chrs_limit (int, optional): The maximum number of chromosomes to plot. Default is 30.
+        - plt_show (bool, optional): Whether to show the plot. Default is False.
+        - palette (str, optional): The color palette to use. Default is 'green'.
+        - bbox_inches (str, optional): The bbox_inches parameter of the savefig() function. Default is 'tight'.
+        - dim (int, optional): The dimension of the chromosomes. Defaults to 2.
+        - page_size (int, optional): The number of chromosomes per page. With page_size > 0 each page is written and closed
+                                     before the next one is built: a '.pdf' output_file gets one multi-page PDF, any other
+                                     path gets numbered files. The pages are closed once written, so page_size cannot be
+                                     combined with plt_show (ValueError). Defaults to 0 (a single figure).
+        - fig (Figure, optional): A figure to draw on instead of a new one. Defaults to None.
+        - cache (str or FigureCache, optional): A figure cache directory. When the inputs and the parameters of an
+                                                earlier call are unchanged, its output is copied to output_file
+                                                instead of rendering the plot (unless plt_show). Defaults to None.
+        - profile (Profiler, callable or str, optional): Record the time, memory and counts of each stage of the plot
+                                                         (see profiling.open_profiler). Defaults to None.
+
+    Output:
+        - The karyotype plot in png format.
+
+    Returns:
+        - Figure: The karyoplot figure (None in paged mode or when the figure is taken from the cache).
+                  It is not registered with pyplot.
+    """
+    
+    if plt_show and page_size > 0 and output_file:
+        raise ValueError('plt_show cannot be combined with page_size: the pages are closed once written.')
+
+    profiler = open_profiler(profile)
+
+    with profiler.function('karyoplot', output=output_file) as total:
+
+        # Selecting the right palette
+        if palette == 'green':
+            selected = GREEN
+        elif palette == 'azure':
+            selected = AZURE
+
+        # Lowercase the column names
+        karyotype.columns = karyotype.columns.str.lower()
+
+        # Reuse the cached figure when the inputs and the parameters are unchanged
+        cache = open_figure_cache(cache)
+
+        if cache is not None and output_file:
+            with profiler.stage('cache_restore') as stage:
+                key = cache.key('karyoplot', {'karyotype': karyotype, 'fulltable': fulltable, 'title': title,
+                                              'selected_sequences': selected_sequences, 'dpi': dpi, 'chrs_limit': chrs_limit,
+                                              'palette': palette, 'bbox_inches': bbox_inches, 'dim': dim, 'page_size': page_size,
+                                              'format': os.path.splitext(output_file)[1].lower()})
+
+                stage['hit'] = not plt_show and cache.restore(key, output_file) is not None
+
+            if stage.get('hit'):
+                return None
+
+        with profiler.stage('select', rows=len(fulltable)) as stage:
+
+            # Remove rows where status is 'Missing'
+            fulltable = fulltable[fulltable['status'] != 'Missing']
+
+            # If the number of chromosomes is greater than chr_limit,
+            #   then select the most significant chromosomes
+            if len(karyotype) > chrs_limit:
+                    
+                if selected_sequences:
+                    karyotype = karyotype[karyotype['sequence'].isin(selected_sequences)]
+
+                elif len(fulltable) == 0:
+                    karyotype = karyotype.iloc[:chrs_limit, :]
+                else:
+                    karyotype.set_index('chr', inplace=True)
+
+                    # Select the most significant chromosomes (the chromosomes with more hits)
+                    #   (categorical sequences also count the unobserved categories, so drop the empty ones)
+                    hits = fulltable['sequence'].value_counts()
+                    first_chrs = hits[hits > 0].index.to_list()[:chrs_limit]
+                    karyotype = karyotype.loc[first_chrs].sort_values(by='end', ascending=False)
+                    karyotype = karyotype.reset_index()
+
+            stage['chromosomes'] = len(karyotype)
+
+        # Calculate the maximum length of the chromosome name
+        chr_max_len = len(max(karyotype['chr'], key=len))
+
+        # Get the maximum length of the chromosome
+        chr_max_dim = karyotype['end'].max()
+
+        # Partition the full table by sequence once
+        with profiler.stage('partition', rows=len(fulltable)):
+            partition, bounds = partition_by_sequence(fulltable)
+
+            hits = (bounds,
+                    partition['gene_start'].to_numpy(dtype=np.float64),
+                    partition['gene_end'].to_numpy(dtype=np.float64),
+                    partition['status'].map(selected).to_numpy())
+
+        # Write the pages one at a time, with the same scale on every page
+        if page_size > 0 and output_file:
+            pages = page_slices(len(karyotype), page_size)
+
+            with PageWriter(output_file, dpi=dpi, bbox_inches=bbox_inches) as writer:
+                for number, (start, stop) in enumerate(pages, start=1):
+                    page = karyotype.iloc[start:stop].reset_index(drop=True)
+                    page_title = '{} ({}/{})'.format(title, number, len(pages))
+
+                    with profiler.stage('draw', page=number) as stage:
+                        page_fig = draw_karyoplot(page, hits, page_title, selected, dpi, dim, chr_max_len, chr_max_dim)
+                        profiler.count_figure(stage, page_fig)
+
+                    with profiler.stage('savefig', page=number):
+                        writer.save(page_fig)
+
+            if cache is not None:
+                with profiler.stage('cache_store'):
+                    cache.store(key, 'karyoplot', output_file, writer.paths)
+
+            total['pages'] = len(pages)
+
+            return
+
+        with profiler.stage('draw') as stage:
+            fig = draw_karyoplot(karyotype, hits, title, selected, dpi, dim, chr_max_len, chr_max_dim, fig=fig)
+            profiler.count_figure(stage, fig)
+
+        # Save and show the plot
+        if output_file:
+            with profiler.stage('savefig'):
+                fig.savefig(output_file, dpi=dpi, bbox_inches=bbox_inches)
+
+            if cache is not None:
+                with profiler.stage('cache_store'):
+                    cache.store(key, 'karyoplot', output_file, [output_file])
 
     if plt_show:
-        plt.show()
+        show_figure(fig)
     
-    plt.close()
+    return fig
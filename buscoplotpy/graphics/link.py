@@ -2,8 +2,82 @@
 # This class represents a link between two chromosomes.
 
 from ..graphics.chromosome import Chromosome
+from functools import lru_cache
 import numpy as np
 
+# Number of points used to draw a curved link
+CURVE_POINTS = 100
+
+@lru_cache(maxsize=None)
+def bernstein_basis(n_points: int = CURVE_POINTS) -> np.ndarray:
+
+    """
+    Compute the cubic Bernstein basis on n_points values of t between 0 and 1.
+
+    Parameters:
+        - n_points (int, optional): The number of values of t. Defaults to 100.
+
+    Returns:
+        - np.ndarray: A read-only (n_points, 4) array, one row of weights for each value of t.
+    """
+
+    t = np.linspace(0, 1, n_points)[:, None]
+
+    basis = np.hstack([(1 - t)**3, 3 * (1 - t)**2 * t, 3 * (1 - t) * t**2, t**3])
+    basis.setflags(write=False)
+
+    return basis
+
+def bezier_curves(control_points: np.ndarray, n_points: int = CURVE_POINTS) -> np.ndarray:
+
+    """
+    Evaluate many cubic Bezier curves at once.
+
+    Parameters:
+        - control_points (np.ndarray): A (n_links, 4, 2) array with the four control points of each curve.
+        - n_points (int, optional): The number of points of each curve. Defaults to 100.
+
+    Returns:
+        - np.ndarray: A (n_links, n_points, 2) array with the points of each curve.
+    """
+
+    return np.einsum('tk,nkd->ntd', bernstein_basis(n_points), np.asarray(control_points, dtype=np.float64))
+
+@lru_cache(maxsize=None)
+def quadratic_basis(n_points: int = CURVE_POINTS) -> np.ndarray:
+
+    """
+    Compute the quadratic Bernstein basis on n_points values of t between 0 and 1.
+
+    Parameters:
+        - n_points (int, optional): The number of values of t. Defaults to 100.
+
+    Returns:
+        - np.ndarray: A read-only (n_points, 3) array, one row of weights for each value of t.
+    """
+
+    t = np.linspace(0, 1, n_points)[:, None]
+
+    basis = np.hstack([(1 - t)**2, 2 * (1 - t) * t, t**2])
+    basis.setflags(write=False)
+
+    return basis
+
+def quadratic_bezier_curves(control_points: np.ndarray, n_points: int = CURVE_POINTS) -> np.ndarray:
+
+    """
+    Evaluate many quadratic Bezier curves at once.
+
+    Parameters:
+        - control_points (np.ndarray): A (n_links, 3, 2) array with the three control points of each curve.
+        - n_points (int, optional): The number of points of each curve. Defaults to 100.
+
+    Returns:
+        - np.ndarray: A (n_links, n_points, 2) array with the points of each curve.
+    """
+
+    return np.einsum('tk,nkd->ntd', quadratic_basis(n_points), np.asarray(control_points, dtype=np.float64))
+
 class Link:
 
     def __init__(self, C1: Chromosome, C2: Chromosome, p_1: int, p_2: int, color: str = '#d1d1d1', 
@@ -49,6 +123,32 @@ class Link:
 
         return (1 - t)**3 * p0 + 3 * (1 - t)**2 * t * p1 + 3 * (1 - t) * t**2 * p2 + t**3 * p3
 
+    def control_points(self) -> np.ndarray:
+
+        """
+        Get the four control points of the link curve.
+
+        Returns:
+            - np.ndarray: A (4, 2) array with the control points of the Bezier curve.
+        """
+
+        if self.horizontal:
+            # Get middle of C1 and C2
+            y_middle_c1_c2 = (self.start_point[1] + self.end_point[1]) / 2.0
+
+            return np.array([self.start_point,
+                             (self.start_point[0], y_middle_c1_c2),
+                             (self.end_point[0], y_middle_c1_c2),
+                             self.end_point], dtype=np.float64)
+        else:
+            # Get middle of C1 and C2
+            x_middle_c1_c2 = (self.start_point[0] + self.end_point[0]) / 2.0
+
+            return np.array([self.start_point,
+                             (x_middle_c1_c2, self.C1.y_end),
+                             (x_middle_c1_c2, self.C2.y_start),
+                             self.end_point], dtype=np.float64)
+
     def plot(self, ax):
 
         """
@@ -60,30 +160,158 @@ class Link:
         
         # If not straight line then calculate the Bezier curve
         if not self.straight_line:
+            points = bezier_curves(self.control_points()[None])[0]
 
-            # Create a range of 100 values between 0 and 1
-            t_values = np.linspace(0, 1, 100)
+        # Else if straight line  
+        else:
+            # Calculate the x and y coordinates of the straight line
+            points = np.array([self.start_point, self.end_point])
 
-            if self.horizontal:
-                # Get middle of C1 and C2
-                y_middle_c1_c2 = (self.start_point[1] + self.end_point[1]) / 2.0
+        # Then plot the line
+        ax.plot(points[:, 0], points[:, 1], ls='-', color=self.color, linewidth=1)
 
-                # Calculate the x and y coordinates of the Bezier curve
-                x_values = [self.bezier_curve(t, self.start_point[0], self.start_point[0], self.end_point[0], self.end_point[0]) for t in t_values]
-                y_values = [self.bezier_curve(t, self.start_point[1], y_middle_c1_c2, y_middle_c1_c2, self.end_point[1]) for t in t_values]
-            else:
-                # Get middle of C1 and C2
-                x_middle_c1_c2 = (self.start_point[0] + self.end_point[0]) / 2.0
+class LinkTable:
 
-                # Calculate the x and y coordinates of the Bezier curve
-                x_values = [self.bezier_curve(t, self.start_point[0], x_middle_c1_c2, x_middle_c1_c2, self.end_point[0]) for t in t_values]
-                y_values = [self.bezier_curve(t, self.start_point[1], self.C1.y_end, self.C2.y_start, self.end_point[1]) for t in t_values]
+    def __init__(self, x1: np.ndarray, y1: np.ndarray, x2: np.ndarray, y2: np.ndarray,
+                 color_index: np.ndarray, colors: list, c1_y_end: np.ndarray = None, c2_y_start: np.ndarray = None,
+                 straight_line: bool = False, horizontal: bool = False):
+        """
+        Initialize the LinkTable class, a struct of arrays holding many links.
 
-        # Else if straight line  
+        Parameters:
+            - x1, y1 (np.ndarray): The start points of the links.
+            - x2, y2 (np.ndarray): The end points of the links.
+            - color_index (np.ndarray): The index in colors of the color of each link.
+            - colors (list): The distinct link colors.
+            - c1_y_end (np.ndarray, optional): The y_end of the first chromosome of each link (vertical links only).
+            - c2_y_start (np.ndarray, optional): The y_start of the second chromosome of each link (vertical links only).
+            - straight_line (bool, optional): Whether the links should be straight. Defaults to False.
+            - horizontal (bool, optional): Whether the links should be horizontal. Defaults to False.
+        """
+
+        # Set the link coordinates
+        self.x1 = np.asarray(x1, dtype=np.float64)
+        self.y1 = np.asarray(y1, dtype=np.float64)
+        self.x2 = np.asarray(x2, dtype=np.float64)
+        self.y2 = np.asarray(y2, dtype=np.float64)
+
+        # Set the link colors
+        self.color_index = np.asarray(color_index, dtype=np.intp)
+        self.colors      = list(colors)
+
+        # Set the control coordinates of the vertical links
+        self.c1_y_end   = self.y1 if c1_y_end is None else np.asarray(c1_y_end, dtype=np.float64)
+        self.c2_y_start = self.y2 if c2_y_start is None else np.asarray(c2_y_start, dtype=np.float64)
+
+        # Set the link properties
+        self.straight_line = straight_line
+        self.horizontal    = horizontal
+
+    def __len__(self):
+
+        return len(self.x1)
+
+    def __str__(self):
+
+        return 'LinkTable({} links, {} colors)'.format(len(self), len(self.colors))
+
+    def control_points(self) -> np.ndarray:
+
+        """
+        Get the four control points of every link curve.
+
+        Returns:
+            - np.ndarray: A (n_links, 4, 2) array with the control points of the Bezier curves.
+        """
+
+        points = np.empty((len(self), 4, 2), dtype=np.float64)
+
+        points[:, 0, 0], points[:, 0, 1] = self.x1, self.y1
+        points[:, 3, 0], points[:, 3, 1] = self.x2, self.y2
+
+        if self.horizontal:
+            # Get middle of C1 and C2
+            y_middle_c1_c2 = (self.y1 + self.y2) / 2.0
+
+            points[:, 1, 0], points[:, 1, 1] = self.x1, y_middle_c1_c2
+            points[:, 2, 0], points[:, 2, 1] = self.x2, y_middle_c1_c2
         else:
-            # Calculate the x and y coordinates of the straight line
-            x_values = [self.start_point[0], self.end_point[0]]
-            y_values = [self.start_point[1], self.end_point[1]]
+            # Get middle of C1 and C2
+            x_middle_c1_c2 = (self.x1 + self.x2) / 2.0
 
-        # Then plot the line
-        ax.plot(x_values, y_values, ls='-', color=self.color, linewidth=1)
+            points[:, 1, 0], points[:, 1, 1] = x_middle_c1_c2, self.c1_y_end
+            points[:, 2, 0], points[:, 2, 1] = x_middle_c1_c2, self.c2_y_start
+
+        return points
+
+    def segments(self) -> np.ndarray:
+
+        """
+        Get the points of every link.
+
+        Returns:
+            - np.ndarray: A (n_links, n_points, 2) array, with 2 points per link for straight lines.
+        """
+
+        if self.straight_line:
+            return np.stack([np.column_stack([self.x1, self.y1]), np.column_stack([self.x2, self.y2])], axis=1)
+
+        return bezier_curves(self.control_points())
+
+    def link_colors(self) -> list:
+
+        """
+        Get the color of every link.
+
+        Returns:
+            - list: The color of each link.
+        """
+
+        return [self.colors[i] for i in self.color_index]
+
+class RibbonTable:
+
+    def __init__(self, start_edges: LinkTable, end_edges: LinkTable):
+        """
+        Initialize the RibbonTable class, holding the filled ribbons of many synteny blocks.
+
+        Each ribbon is bounded by two links, between the first positions of the block on the two
+        chromosomes and between the last ones (crossed for the reversed blocks), and by the chromosomes.
+
+        Parameters:
+            - start_edges (LinkTable): The link of the start of each block, with the ribbon colors.
+            - end_edges (LinkTable): The link of the end of each block.
+        """
+
+        self.start_edges = start_edges
+        self.end_edges   = end_edges
+
+    def __len__(self):
+
+        return len(self.start_edges)
+
+    def __str__(self):
+
+        return 'RibbonTable({} ribbons, {} colors)'.format(len(self), len(self.start_edges.colors))
+
+    def polygons(self) -> np.ndarray:
+
+        """
+        Get the outline of every ribbon.
+
+        Returns:
+            - np.ndarray: A (n_ribbons, 2 * n_points, 2) array: the start edge, then the end edge backwards.
+        """
+
+        return np.concatenate([self.start_edges.segments(), self.end_edges.segments()[:, ::-1]], axis=1)
+
+    def ribbon_colors(self) -> list:
+
+        """
+        Get the color of every ribbon.
+
+        Returns:
+            - list: The color of each ribbon.
+        """
+
+        return self.start_edges.link_colors()
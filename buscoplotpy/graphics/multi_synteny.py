@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+
+#Importing libraries
+import os
+
+import pandas as pd
+
+from matplotlib.figure import Figure
+from matplotlib.patches import Rectangle
+
+# Import the synteny plot functions
+from ..graphics.figure import new_figure, show_figure
+from ..graphics.synteny import generate_bottom_karyotype, generate_up_karyotype, link_table, plot_chromosomes, plot_links
+from ..graphics.synteny_layout import SyntenyLayout
+from ..utils.figure_cache import open_figure_cache
+from ..utils.ortholog_matrix import OrthologMatrix
+from ..utils.profiling import open_profiler
+
+# Set the figure height of each genome track
+TRACK_HEIGHT = 5
+
+def generate_tracks(karyotypes: list, dim: int, round_edges: bool, layout: SyntenyLayout) -> (list, list):
+
+    """
+    Place the karyotypes on horizontal tracks, the first one at the top of the plot and the last one at the bottom.
+
+    Parameters:
+        - karyotypes (list): The karyotype dataframe of each genome.
+        - dim (int): Dimension of the chromosomes.
+        - round_edges (bool): Whether to round the edges of the chromosomes.
+        - layout (SyntenyLayout): The plot coordinates.
+
+    Returns:
+        - list: The chromosomes of each track facing the track above (None for the first track), by sequence name.
+        - list: The chromosomes of each track facing the track below (None for the last track), by sequence name.
+    """
+
+    # Leave room for the longest label at the top and at the bottom
+    max_chr_name_length = max(len(max(k['chr'], key=len)) for k in karyotypes)
+
+    top    = layout.y_lim - max_chr_name_length - 15
+    bottom = max_chr_name_length + 10
+
+    step = (top - bottom) / (len(karyotypes) - 1)
+
+    upper, lower = [], []
+
+    for t, karyotype in enumerate(karyotypes):
+        y_start = top - t * step
+
+        # The links to the track above start from the top edge, the links to the track below from the bottom edge
+        upper.append(generate_bottom_karyotype(karyotype, dim, round_edges, layout, y_start=y_start) if t > 0 else None)
+        lower.append(generate_up_karyotype(karyotype, dim, round_edges, layout, y_start=y_start) if t < len(karyotypes) - 1 else None)
+
+    return upper, lower
+
+def multi_synteny_plot(fulltables: list,
+                       karyotypes: list,
+                       title: str = 'Synteny plot',
+                       dim: int = 2,
+                       figsize: (int, int) = None,
+                       dpi: int = 300,
+                       round_edges: bool = False,
+                       link_colors: dict = {},
+                       straight_line: bool = False,
+                       output_path: str = None,
+                       bbox_inches: str = 'tight',
+                       plt_show: bool = False,
+                       fig: Figure = None,
+                       cache = None,
+                       profile = None
+) -> Figure:
+    """
+    Generate a synteny plot of many genomes, one horizontal track per genome, with the links of the
+    Complete BUSCOs shared by each genome and the next one (genome 1 - genome 2 - genome 3 ...).
+
+    The positions of all the genomes are gathered once in an OrthologMatrix, and the links of every
+    pair of adjacent tracks are slices of it.
+
+    Parameters:
+        - fulltables (list): The full table of each genome, in track order.
+        - karyotypes (list): The karyotype dataframe of each genome, in track order.
+        - title (str, optional): The title of the plot. Defaults to 'Synteny plot'.
+        - dim (int, optional): The dimension of the chromosomes. Defaults to 2.
+        - figsize (tuple, optional): The size of the plot figure. Defaults to 30 inches wide and 5 inches per genome.
+        - dpi (int, optional): The resolution of the plot figure. Defaults to 300.
+        - round_edges (bool, optional): Whether to round the edges of the karyotype blocks. Defaults to False.
+        - link_colors (dict, optional): A dictionary mapping link colors to sequence names. Defaults to {}.
+        - straight_line (bool, optional): Whether to use straight lines for links. Defaults to False.
+        - output_path (str, optional): The path to save the plot to. Defaults to None.
+        - plt_show (bool, optional): Whether to show the plot. Defaults to False.
+        - fig (Figure, optional): A figure to draw on instead of a new one. Defaults to None.
+        - cache (str or FigureCache, optional): A figure cache directory. When the inputs and the parameters of an
+                                                earlier call are unchanged, its output is copied to output_path
+                                                instead of rendering the plot (unless plt_show). Defaults to None.
+        - profile (Profiler, callable or str, optional): Record the time, memory and counts of each stage of the plot
+                                                         (see profiling.open_profiler). Defaults to None.
+
+    Returns:
+        - Figure: The synteny plot figure (None when it is taken from the cache). It is not registered with pyplot.
+    """
+
+    if len(karyotypes) < 2 or len(fulltables) != len(karyotypes):
+        raise ValueError('The multi synteny plot needs one full table per karyotype, for at least two genomes.')
+
+    # Lowercase the column names, on copies so that the input frames can be shared between threads
+    karyotypes = [k.rename(columns=str.lower) for k in karyotypes]
+
+    if figsize is None:
+        figsize = (30, TRACK_HEIGHT * len(karyotypes))
+
+    profiler = open_profiler(profile)
+
+    with profiler.function('multi_synteny_plot', output=output_path):
+
+        # Reuse the cached figure when the inputs and the parameters are unchanged
+        cache = open_figure_cache(cache)
+
+        if cache is not None and output_path:
+            with profiler.stage('cache_restore') as stage:
+                key = cache.key('multi_synteny_plot', {'fulltables': fulltables, 'karyotypes': karyotypes,
+                                                       'title': title, 'dim': dim, 'figsize': figsize, 'dpi': dpi, 'round_edges': round_edges,
+                                                       'link_colors': link_colors, 'straight_line': straight_line, 'bbox_inches': bbox_inches,
+                                                       'format': os.path.splitext(output_path)[1].lower()})
+
+                stage['hit'] = not plt_show and cache.restore(key, output_path) is not None
+
+            if stage.get('hit'):
+                return None
+
+        # Create a new figure and axis
+        fig = new_figure(figsize=figsize, dpi=dpi, fig=fig)
+        ax  = fig.subplots()
+
+        # Turn off the axis
+        ax.axis('off')
+
+        # Set the x and y limits
+        layout = SyntenyLayout(figsize)
+
+        # Set the x and y limits of the plot
+        ax.set_xlim([0, layout.x_lim])
+        ax.set_ylim([0, layout.y_lim])
+
+        # Insert the plot title
+        ax.text(layout.x_lim / 2, layout.y_lim - 3, ' - '.join(k['organism'][0] for k in karyotypes) + ' ' + title, fontsize=20, ha='center')
+
+        # Place the karyotypes on their tracks
+        with profiler.stage('karyotypes') as stage:
+            upper, lower = generate_tracks(karyotypes, dim, round_edges, layout)
+
+            stage['chromosomes'] = sum(len(c) for c in lower if c is not None) + len(upper[-1])
+
+        # Gather the BUSCO positions of all the genomes
+        with profiler.stage('matrix', rows=sum(len(ft) for ft in fulltables)) as stage:
+            matrix = OrthologMatrix(fulltables)
+
+            stage['buscos'] = len(matrix)
+
+        # Generate the links of each pair of adjacent tracks
+        with profiler.stage('links') as stage:
+            links = []
+
+            for t in range(len(karyotypes) - 1):
+                df = matrix.pair(t, t + 1, lower[t].keys(), upper[t + 1].keys())
+
+                links.append(link_table(df['sequence_x'], df['gene_start_x'], df['sequence_y'], df['gene_start_y'],
+                                        upper[t + 1], lower[t], link_colors, straight_line, horizontal=True))
+
+            stage['links'] = sum(len(l) for l in links)
+
+        with profiler.stage('draw') as stage:
+
+            # Plot the links
+            for l in links:
+                plot_links(l, ax)
+
+            # Plot the chromosomes, with their labels above the first track and below the others
+            plot_chromosomes(lower[0], fig, ax)
+
+            for chromosomes in upper[1:]:
+                plot_chromosomes(chromosomes, fig, ax)
+
+            # Write the legend
+            ax.legend(handles=[Rectangle((0,0),1,1, color=k['color'][0]) for k in karyotypes],
+                      labels=[k['organism'][0] for k in karyotypes],
+                      loc='upper right'
+            )
+
+            profiler.count_figure(stage, fig)
+
+        # Save the plot if output path is provided
+        if output_path is not None:
+            with profiler.stage('savefig'):
+                fig.savefig(output_path, dpi=dpi, bbox_inches=bbox_inches)
+
+            if cache is not None:
+                with profiler.stage('cache_store'):
+                    cache.store(key, 'multi_synteny_plot', output_path, [output_path])
+
+    # Show the plot
+    if plt_show:
+        show_figure(fig)
+
+    return fig
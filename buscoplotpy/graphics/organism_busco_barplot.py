@@ -1,22 +1,52 @@
 # -*- coding: utf-8 -*-
 
 #Importing libraries
-import seaborn as sns
-import matplotlib.pyplot as plt
+import colorsys
+
 import matplotlib.ticker as ticker
 import pandas as pd
 
+from matplotlib.colors import to_rgb
+from matplotlib.figure import Figure
 from matplotlib.patches import Patch
 from matplotlib.font_manager import FontProperties
 
+from ..graphics.figure import new_figure, show_figure
+from ..utils.figure_cache import open_figure_cache
+from ..utils.profiling import open_profiler
+
+# The light grey of the grid and the dark grey of the texts (the seaborn "whitegrid" style)
+GRID_COLOR = '.8'
+TEXT_COLOR = '.15'
+
+def desaturate(color, prop: float) -> tuple:
+
+    """
+    Decrease the saturation of a color, as seaborn does for the bars of its barplots.
+
+    Parameters:
+        - color: A matplotlib color.
+        - prop (float): The factor of the saturation, between 0 and 1.
+
+    Returns:
+        - tuple: The desaturated RGB color.
+    """
+
+    h, l, s = colorsys.rgb_to_hls(*to_rgb(color))
+
+    return colorsys.hls_to_rgb(h, l, s * prop)
+
 def organism_busco_barplot(df: pd.DataFrame,
                            group_name: str = '',
                            organism_name: str = '',
                            out_path: str = './', 
                            filename: str = 'busco_barplot',
                            dpi: int = 300,
-                           plt_show: bool = False
-                        ) -> None:
+                           plt_show: bool = False,
+                           fig: Figure = None,
+                           cache = None,
+                           profile = None
+                        ) -> Figure:
     
     """
     Generate a barplot to visualize the completeness of assembly for different organisms on the same BUSCO dataset.
@@ -27,116 +57,160 @@ def organism_busco_barplot(df: pd.DataFrame,
         - organism_name (str): The name of the organism to be plotted.
         - out_path (str): The path where the plot image will be saved.
         - filename (str): The name of the plot image file.
+        - fig (Figure, optional): A figure to draw on instead of a new one. Defaults to None.
+        - cache (str or FigureCache, optional): A figure cache directory. When the data and the parameters of an
+                                                earlier call are unchanged, its image is copied to the output path
+                                                instead of rendering the plot (unless plt_show). Defaults to None.
+        - profile (Profiler, callable or str, optional): Record the time, memory and counts of each stage of the plot
+                                                         (see profiling.open_profiler). Defaults to None.
 
     Output:
         - A barplot image with the completeness of assembly for different organisms on the same BUSCO dataset in .png format.
 
     Returns:
-        - None
+        - Figure: The barplot figure (None when it is taken from the cache). It is not registered with pyplot.
     """
 
     if len(df) == 0:
         return None
 
-    if group_name == '':
-        group_name = df['group'].iloc[0]
-
+    output_path = out_path + filename + '_completeness.png'
 
-    # Create a list of species names
-    species_names = []
+    profiler = open_profiler(profile)
 
-    # If the organism name is not provided, get the unique species names from the dataframe    
-    if organism_name == '':
-        organisms = df['organism'].unique()
+    with profiler.function('organism_busco_barplot', output=output_path, runs=len(df)):
 
-        for organism in list(organisms):
-            species_names = species_names + [organism + '_' + i for i in df[df['organism'] == organism]['version']]
-    
-    # Else if the organism name is provided, set the list of species names to the provided name
-    else:
-        species_names = [organism_name]
-    
-    # Get the group and dataset name from the dataframe
-    dataset_name = df['dataset_name'].iloc[0]
+        # Reuse the cached figure when the data and the parameters are unchanged
+        cache = open_figure_cache(cache)
 
-    # Create a matrix of completeness values
-    matrix = df[['single copy', 'multi copy', 'fragmented', 'missing']].to_numpy()
+        if cache is not None:
+            with profiler.stage('cache_restore') as stage:
+                key = cache.key('organism_busco_barplot', {'df': df, 'group_name': group_name, 'organism_name': organism_name, 'dpi': dpi})
 
-    # Get the one-line summary
-    one_line_summary = df['one_line_summary'].to_list()
+                stage['hit'] = not plt_show and cache.restore(key, output_path) is not None
 
-    # Set the style of Seaborn
-    sns.set(style="whitegrid")
+            if stage.get('hit'):
+                return None
 
-    # Define the colors and labels for the plot
-    colors = ['#49a34b', '#636633', '#664f33', '#4b5669']
-    labels = ['Complete - single', 'Complete - multi', 'Fragmented', 'Missing']
-    busco_labels = ['Single copy', 'Multi copy', 'Fragmented', 'Missing']
+        if group_name == '':
+            group_name = df['group'].iloc[0]
 
-    # Generate the values matrix
-    values_matrix = matrix.copy()
 
-    # Calculate the cumulative sum of the matrix
-    for row in range(len(values_matrix)):
-        for col in range(len(values_matrix[row])):
-            if col != 0:
-                values_matrix[row][col] = values_matrix[row][col-1] + values_matrix[row][col]
+        # Create a list of species names
+        species_names = []
 
-    # Transpose the matrix
-    values_matrix = values_matrix.T
+        # If the organism name is not provided, get the unique species names from the dataframe    
+        if organism_name == '':
+            organisms = df['organism'].unique()
 
-    # Create the plot
-    fig, axs = plt.subplots(figsize=(20, len(species_names)+5), ncols=1, nrows=1)
-    
-    # Create the individual bars with different colors
-    for idx, label in enumerate(labels):
-        sns.barplot(x=values_matrix[-idx-1], color=colors[-idx-1], y=species_names, ax=axs, errorbar=None, alpha=0.99)
-    
-    # Add a text string to each bar
-    for i in range(len(one_line_summary)):
-        axs.text(0.9, i+0.1, str(one_line_summary[i]), color='white', fontsize=25)
+            for organism in list(organisms):
+                species_names = species_names + [organism + '_' + i for i in df[df['organism'] == organism]['version']]
     
-    # Set the locator of the major ticker
-    axs.xaxis.set_major_locator(ticker.MultipleLocator(5))
+        # Else if the organism name is provided, set the list of species names to the provided name
+        else:
+            species_names = [organism_name]
     
-    # Customize the x and y axes and tick labels
-    axs.set_xlabel('Percentage', fontsize=28)
-    axs.set_ylabel('Organism', fontsize=28)
-    axs.set_title(dataset_name + ' ' + group_name + ' - Barplot of completeness of assembly', fontsize=30, weight='bold', pad=30)
-    axs.tick_params(labelsize=26)
+        # Get the group and dataset name from the dataframe
+        dataset_name = df['dataset_name'].iloc[0]
 
-    # Set the x-axis limits
-    axs.set_xlim(0, 100)
+        # Create a matrix of completeness values
+        matrix = df[['single copy', 'multi copy', 'fragmented', 'missing']].to_numpy()
+
+        # Get the one-line summary
+        one_line_summary = df['one_line_summary'].to_list()
+
+        # Define the colors and labels for the plot
+        colors = ['#49a34b', '#636633', '#664f33', '#4b5669']
+        labels = ['Complete - single', 'Complete - multi', 'Fragmented', 'Missing']
+        busco_labels = ['Single copy', 'Multi copy', 'Fragmented', 'Missing']
+
+        # Generate the values matrix
+        values_matrix = matrix.copy()
+
+        # Calculate the cumulative sum of the matrix
+        for row in range(len(values_matrix)):
+            for col in range(len(values_matrix[row])):
+                if col != 0:
+                    values_matrix[row][col] = values_matrix[row][col-1] + values_matrix[row][col]
+
+        # Transpose the matrix
+        values_matrix = values_matrix.T
+
+        # One bar per species, the rows of a species repeated in the list are averaged
+        species = pd.Index(species_names).unique()
+
+        with profiler.stage('draw') as stage:
+
+            # Create the plot
+            fig = new_figure(figsize=(20, len(species_names)+5), fig=fig)
+            axs = fig.subplots(ncols=1, nrows=1)
+
+            # Draw the grid of the x axis below the bars (the "whitegrid" style, set on the axes only)
+            axs.set_axisbelow(True)
+            axs.grid(True, axis='x', color=GRID_COLOR, linewidth=1)
+
+            # Create the individual bars with different colors, from the whole bar to the first part
+            for idx, label in enumerate(labels):
+                widths = pd.Series(values_matrix[-idx-1]).groupby(species_names, sort=False).mean().reindex(species)
+                axs.barh(range(len(species)), widths.to_numpy(), height=0.8, color=desaturate(colors[-idx-1], 0.75),
+                         edgecolor='white', linewidth=1, alpha=0.99)
+
+            # Add a text string to each bar
+            for i in range(len(one_line_summary)):
+                axs.text(0.9, i+0.1, str(one_line_summary[i]), color='white', fontsize=25)
+
+            # Set the locator of the major ticker
+            axs.xaxis.set_major_locator(ticker.MultipleLocator(5))
+
+            # List the species from top to bottom
+            axs.set_yticks(range(len(species)), species)
+            axs.set_ylim(len(species) - 0.5, -0.5)
+
+            # Customize the x and y axes and tick labels
+            axs.set_xlabel('Percentage', fontsize=28, color=TEXT_COLOR)
+            axs.set_ylabel('Organism', fontsize=28, color=TEXT_COLOR)
+            axs.set_title(dataset_name + ' ' + group_name + ' - Barplot of completeness of assembly', fontsize=30, weight='bold', pad=30, color=TEXT_COLOR)
+            axs.tick_params(labelsize=26, colors=TEXT_COLOR, length=6, bottom=False, left=False)
+
+            # Set the x-axis limits
+            axs.set_xlim(0, 100)
+
+            # Remove the borders of the plot
+            for spine in axs.spines.values():
+                spine.set_visible(False)
+
+            # Remove the y-axis ticks
+            axs.tick_params(axis='y', length=0)
+
+            # Create the legend
+            patches_list = [Patch(color=colors[i], label=labels[i], alpha=0.75) for i in range(len(labels))]
+            axs.legend(handles=patches_list, bbox_to_anchor=(-0.5, 1), fontsize=24, labelcolor=TEXT_COLOR)
+
+            profiler.count_figure(stage, fig)
+
+        # Create the values table
+        #table_data = [["Species"] + busco_labels]
+        #for row, species in zip(matrix, species_names):
+        #    table_data.append([species] + [str(i) + '%' for i in row])
+        #table = axs[1].table(cellText=table_data, loc='center')
+        #table.set_fontsize(34)
+        #table.scale(1, 2)
+        #table.auto_set_column_width(col=range(len(table_data)))
+        #axs[1].set_title("Percentage table", weight='bold', size=15)
+        #for (row, col), cell in table.get_celld().items():
+        #    if (row == 0) or (col == -1):
+        #        cell.set_text_props(fontproperties=FontProperties(weight='bold'))  
+        #axs[1].axis('off')
+
+        # Save and show the plot
+        with profiler.stage('savefig'):
+            fig.savefig(output_path, bbox_inches='tight', dpi=dpi)
+
+        if cache is not None:
+            with profiler.stage('cache_store'):
+                cache.store(key, 'organism_busco_barplot', output_path, [output_path])
+
+        if plt_show:
+            show_figure(fig)
 
-    # Remove the borders of the plot
-    sns.despine(top=True, right=True, left=True, bottom=True)
-
-    # Remove the y-axis ticks
-    axs.tick_params(axis='y', length=0)
-
-    # Create the legend
-    patches_list = [Patch(color=colors[i], label=labels[i], alpha=0.75) for i in range(len(labels))]
-    axs.legend(handles=patches_list, bbox_to_anchor=(-0.5, 1), fontsize=24)
-
-    
-    # Create the values table
-    #table_data = [["Species"] + busco_labels]
-    #for row, species in zip(matrix, species_names):
-    #    table_data.append([species] + [str(i) + '%' for i in row])
-    #table = axs[1].table(cellText=table_data, loc='center')
-    #table.set_fontsize(34)
-    #table.scale(1, 2)
-    #table.auto_set_column_width(col=range(len(table_data)))
-    #axs[1].set_title("Percentage table", weight='bold', size=15)
-    #for (row, col), cell in table.get_celld().items():
-    #    if (row == 0) or (col == -1):
-    #        cell.set_text_props(fontproperties=FontProperties(weight='bold'))  
-    #axs[1].axis('off')
-
-    # Save and show the plot
-    plt.savefig(out_path + filename + '_completeness.png', bbox_inches='tight', dpi=dpi)
-
-    if plt_show:
-        plt.show()
-    
-    plt.close()
\ No newline at end of file
+    return fig
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+# This class writes the pages of a paged plot.
+
+import os
+
+from matplotlib.backends.backend_pdf import PdfPages
+from matplotlib.figure import Figure
+
+class PageWriter:
+
+    def __init__(self, output_path: str, dpi: int = 300, bbox_inches: str = 'tight'):
+
+        """
+        Initialize the PageWriter class.
+
+        A '.pdf' output path is written as a single multi-page PDF, any other path as numbered
+        files (e.g. plot.png becomes plot_001.png, plot_002.png, ...).
+
+        Parameters:
+            - output_path (str): The path of the output.
+            - dpi (int, optional): The resolution of the pages. Defaults to 300.
+            - bbox_inches (str, optional): The bbox_inches parameter of savefig. Defaults to 'tight'.
+        """
+
+        self.output_path = output_path
+        self.dpi         = dpi
+        self.bbox_inches = bbox_inches
+
+        # Written pages
+        self.pages = 0
+        self.paths = []
+
+        self.pdf = None
+
+    def __enter__(self):
+
+        if os.path.splitext(self.output_path)[1].lower() == '.pdf':
+            self.pdf = PdfPages(self.output_path)
+            self.paths.append(self.output_path)
+
+        return self
+
+    def __exit__(self, *exc):
+
+        if self.pdf is not None:
+            self.pdf.close()
+
+    def page_path(self, page: int) -> str:
+
+        """
+        Get the path of a numbered page.
+
+        Parameters:
+            - page (int): The page number, starting from 1.
+
+        Returns:
+            - str: The output path with the page number before the extension.
+        """
+
+        root, extension = os.path.splitext(self.output_path)
+
+        return '{}_{:03d}{}'.format(root, page, extension)
+
+    def save(self, fig: Figure) -> None:
+
+        """
+        Write a page and release its figure, so that only one page is in memory at a time.
+
+        Parameters:
+            - fig (Figure): The figure of the page.
+        """
+
+        self.pages += 1
+
+        if self.pdf is not None:
+            self.pdf.savefig(fig, dpi=self.dpi, bbox_inches=self.bbox_inches)
+        else:
+            path = self.page_path(self.pages)
+            fig.savefig(path, dpi=self.dpi, bbox_inches=self.bbox_inches)
+            self.paths.append(path)
+
+        fig.clear()
+
+def page_slices(n: int, page_size: int) -> list:
+
+    """
+    Split n rows into pages.
+
+    Parameters:
+        - n (int): The number of rows.
+        - page_size (int): The number of rows per page.
+
+    Returns:
+        - list: The (start, stop) bounds of each page.
+    """
+
+    return [(start, min(start + page_size, n)) for start in range(0, n, page_size)]
@@ -1,25 +1,42 @@
 # -*- coding: utf-8 -*-
 
 #Importing libraries
+import os
+
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
+
+from concurrent.futures import ThreadPoolExecutor
+from matplotlib.axes import Axes
+from matplotlib.collections import LineCollection, PolyCollection
+from matplotlib.figure import Figure
 from matplotlib.patches import Rectangle
 
 # Import the chromosome and link classes
-from ..graphics.chromosome import Chromosome
-from ..graphics.link import Link
+from ..graphics.chromosome import Chromosome, chromosome_transforms
+from ..graphics.figure import new_figure, show_figure
+from ..graphics.link import Link, LinkTable, RibbonTable, bezier_curves
+from ..graphics.synteny_layout import SyntenyLayout
+from ..utils.busco_join import join_busco_hits
+from ..utils.figure_cache import open_figure_cache
+from ..utils.profiling import open_profiler
+from ..utils.synteny_blocks import detect_synteny_blocks
 
 # Set the constants
 CHR_DISTANCE = 2
 CHR_FACTOR   = 0.99
 
-# Set the x and y limits
-VERTICAL_X_LIM   = 0
-VERTICAL_Y_LIM   = 0
-HORIZONTAL_X_LIM = 0
-HORIZONTAL_Y_LIM = 0
+# Set the default figure sizes
+VERTICAL_FIGSIZE   = (18, 10)
+HORIZONTAL_FIGSIZE = (30, 10)
+
+# Set the default number of Duplicated hits of a BUSCO linked in each genome
+MAX_FANOUT = 4
 
-def generate_left_karyotype(karyotype: pd.DataFrame, dim: int, round_edges: bool) -> dict:
+# Set the opacity of the synteny block ribbons
+RIBBON_ALPHA = 0.6
+
+def generate_left_karyotype(karyotype: pd.DataFrame, dim: int, round_edges: bool, layout: SyntenyLayout = None) -> dict:
 
     """
     Plot the left karyotype chromosomes.
@@ -28,11 +45,16 @@ def generate_left_karyotype(karyotype: pd.DataFrame, dim: int, round_edges: bool
         - karyotype: pandas DataFrame containing information about the chromosomes
         - dim: dimension of the chromosomes
         - round_edges: flag indicating whether to round the edges of the chromosomes
+        - layout: the plot coordinates (defaults to the layout of an 18x10 figure)
 
     Returns:
         - C: A dictionary mapping chromosome names to their corresponding Chromosome objects.
     """
 
+    # Use the default layout
+    if layout is None:
+        layout = SyntenyLayout(VERTICAL_FIGSIZE)
+
     # Initialize the step
     step = 0
 
@@ -59,7 +81,7 @@ def generate_left_karyotype(karyotype: pd.DataFrame, dim: int, round_edges: bool
         x_end   = x_start + dim
 
         y_start = CHR_DISTANCE + step
-        y_end   = y_start + chr_dim * (VERTICAL_Y_LIM * 0.9 - CHR_DISTANCE * len(karyotype)) / chr_len_sum
+        y_end   = y_start + chr_dim * (layout.y_lim * 0.9 - CHR_DISTANCE * len(karyotype)) / chr_len_sum
 
         step = y_end
 
@@ -83,7 +105,7 @@ def generate_left_karyotype(karyotype: pd.DataFrame, dim: int, round_edges: bool
     
     return C
 
-def generate_right_karyotype(karyotype: pd.DataFrame, dim: int, round_edges: bool) -> dict:
+def generate_right_karyotype(karyotype: pd.DataFrame, dim: int, round_edges: bool, layout: SyntenyLayout = None) -> dict:
 
     """
     Plot the left karyotype chromosomes.
@@ -92,11 +114,16 @@ def generate_right_karyotype(karyotype: pd.DataFrame, dim: int, round_edges: boo
         - karyotype: pandas DataFrame containing information about the chromosomes
         - dim: dimension of the chromosomes
         - round_edges: flag indicating whether to round the edges of the chromosomes
+        - layout: the plot coordinates (defaults to the layout of an 18x10 figure)
 
     Returns:
         - C: A dictionary mapping chromosome names to their corresponding Chromosome objects.
     """
 
+    # Use the default layout
+    if layout is None:
+        layout = SyntenyLayout(VERTICAL_FIGSIZE)
+
     # Initialize the step
     step = 0
 
@@ -119,11 +146,11 @@ def generate_right_karyotype(karyotype: pd.DataFrame, dim: int, round_edges: boo
         chr_dim = row['end']
 
         # Define the coordinates for the rectangle
-        x_start = VERTICAL_X_LIM - len(max(karyotype['chr'], key=len)) - dim
+        x_start = layout.x_lim - len(max(karyotype['chr'], key=len)) - dim
         x_end   = x_start + dim
 
         y_start = CHR_DISTANCE + step
-        y_end   = y_start + chr_dim * (VERTICAL_Y_LIM * 0.9 - CHR_DISTANCE * len(karyotype)) / chr_len_sum
+        y_end   = y_start + chr_dim * (layout.y_lim * 0.9 - CHR_DISTANCE * len(karyotype)) / chr_len_sum
 
         step = y_end
 
@@ -139,14 +166,14 @@ def generate_right_karyotype(karyotype: pd.DataFrame, dim: int, round_edges: boo
         )
         
         # Add the chromosome label
-        c.add_label(x=VERTICAL_X_LIM - 3, y=(y_start + y_end) / 2, text=row['chr'], ha='center', va='center')
+        c.add_label(x=layout.x_lim - 3, y=(y_start + y_end) / 2, text=row['chr'], ha='center', va='center')
         
         # Add the chromosome to the dictionary
         C[row['chr']] = c
 
     return C
 
-def generate_bottom_karyotype(karyotype: pd.DataFrame, dim: int, round_edges: bool) -> dict:
+def generate_bottom_karyotype(karyotype: pd.DataFrame, dim: int, round_edges: bool, layout: SyntenyLayout = None, y_start: float = None) -> dict:
 
     """
     Generate a bottom karyotype plot.
@@ -155,11 +182,23 @@ def generate_bottom_karyotype(karyotype: pd.DataFrame, dim: int, round_edges: bo
         - karyotype (pd.DataFrame): DataFrame containing karyotype information.
         - dim (int): Dimension of the karyotype plot.
         - round_edges (bool): Whether to round the edges of the chromosomes.
+        - layout (SyntenyLayout, optional): The plot coordinates. Defaults to the layout of a 30x10 figure.
+        - y_start (float, optional): The bottom of the chromosomes. Defaults to just above their labels, at the bottom of the plot.
 
     Returns:
         - dict: Dictionary containing the generated chromosomes.
     """
 
+    # Use the default layout
+    if layout is None:
+        layout = SyntenyLayout(HORIZONTAL_FIGSIZE)
+
+    # Place the track above the labels by default
+    if y_start is None:
+        y_start = len(max(karyotype['chr'], key=lambda x: len(x))) + 10
+
+    track_y = y_start
+
     # Initialize the step
     step = 0
 
@@ -186,9 +225,9 @@ def generate_bottom_karyotype(karyotype: pd.DataFrame, dim: int, round_edges: bo
 
         # Define the coordinates for the rectangle
         x_start = CHR_DISTANCE + step
-        x_end   = x_start + chr_dim * (HORIZONTAL_X_LIM * CHR_FACTOR - CHR_DISTANCE * len(karyotype)) / chr_len_sum
+        x_end   = x_start + chr_dim * (layout.x_lim * CHR_FACTOR - CHR_DISTANCE * len(karyotype)) / chr_len_sum
 
-        y_start = max_chr_name_length + 10
+        y_start = track_y
         y_end   = y_start + dim
 
         step = x_end
@@ -205,14 +244,14 @@ def generate_bottom_karyotype(karyotype: pd.DataFrame, dim: int, round_edges: bo
         )
 
         # Add the chromosome label
-        c.add_label(x=(x_start + x_end) / 2.0, y=max_chr_name_length, text=row['chr'], rotation=90, ha='center', va='center')
+        c.add_label(x=(x_start + x_end) / 2.0, y=y_start - 10, text=row['chr'], rotation=90, ha='center', va='center')
         
         # Add the chromosome to the dictionary
         C[row['chr']] = c
 
     return C
 
-def generate_up_karyotype(karyotype: pd.DataFrame, dim: int, round_edges: bool) -> dict:
+def generate_up_karyotype(karyotype: pd.DataFrame, dim: int, round_edges: bool, layout: SyntenyLayout = None, y_start: float = None) -> dict:
 
     """
     Generate an upward karyotype plot based on the given karyotype data.
@@ -221,11 +260,17 @@ def generate_up_karyotype(karyotype: pd.DataFrame, dim: int, round_edges: bool)
         - karyotype (pd.DataFrame): DataFrame containing karyotype information.
         - dim (int): Dimension of the karyotype plot.
         - round_edges (bool): Flag indicating whether to use rounded edges for the chromosomes.
+        - layout (SyntenyLayout, optional): The plot coordinates. Defaults to the layout of a 30x10 figure.
+        - y_start (float, optional): The bottom of the chromosomes. Defaults to just below their labels, at the top of the plot.
 
     Returns:
         - dict: Dictionary containing the generated karyotype plot.
     """
 
+    # Use the default layout
+    if layout is None:
+        layout = SyntenyLayout(HORIZONTAL_FIGSIZE)
+
     # Initialize the step
     step = 0
 
@@ -235,6 +280,12 @@ def generate_up_karyotype(karyotype: pd.DataFrame, dim: int, round_edges: bool)
     # Get the maximum chromosome name length
     max_chr_name_length = len(max(karyotype['chr'], key=lambda x: len(x)))
 
+    # Place the track below the labels by default
+    if y_start is None:
+        y_start = layout.y_lim - max_chr_name_length - 15
+
+    track_y = y_start
+
     # Right chromosomes dict
     C = {}
 
@@ -252,9 +303,9 @@ def generate_up_karyotype(karyotype: pd.DataFrame, dim: int, round_edges: bool)
 
         # Define the coordinates for the rectangle
         x_start = CHR_DISTANCE + step
-        x_end   = x_start + chr_dim * (HORIZONTAL_X_LIM * CHR_FACTOR - CHR_DISTANCE * len(karyotype)) / chr_len_sum
+        x_end   = x_start + chr_dim * (layout.x_lim * CHR_FACTOR - CHR_DISTANCE * len(karyotype)) / chr_len_sum
 
-        y_start = HORIZONTAL_Y_LIM - max_chr_name_length - 15
+        y_start = track_y
         y_end   = y_start + dim
 
         step = x_end
@@ -270,12 +321,153 @@ def generate_up_karyotype(karyotype: pd.DataFrame, dim: int, round_edges: bool)
                        color=color
         )
 
-        c.add_label(x=(x_start + x_end) / 2.0, y=HORIZONTAL_Y_LIM - max_chr_name_length - 5, text=row['chr'], rotation=90, ha='center', va='center')
+        c.add_label(x=(x_start + x_end) / 2.0, y=y_start + 10, text=row['chr'], rotation=90, ha='center', va='center')
 
         C[row['chr']] = c
 
     return C
 
+def map_positions(sequences: pd.Series, positions: pd.Series, transforms: pd.DataFrame) -> tuple:
+
+    """
+    Convert positions on the given sequences into plot coordinates.
+
+    Parameters:
+        - sequences (pd.Series): The sequence of each position.
+        - positions (pd.Series): The positions on the sequences.
+        - transforms (pd.DataFrame): The chromosome transforms (see chromosome_transforms).
+
+    Returns:
+        - tuple: The x and y coordinates and the row of transforms used for each position.
+    """
+
+    # Find the chromosome of each position
+    idx = transforms.index.get_indexer(sequences)
+
+    offset     = transforms['offset'].to_numpy()[idx]
+    scale      = transforms['scale'].to_numpy()[idx]
+    fixed      = transforms['fixed'].to_numpy()[idx]
+    horizontal = transforms['horizontal'].to_numpy()[idx]
+
+    # Apply the affine transform along the chromosome axis
+    along = offset + positions.to_numpy(dtype=np.float64) * scale
+
+    x = np.where(horizontal, along, fixed)
+    y = np.where(horizontal, fixed, along)
+
+    return x, y, idx
+
+def shared_buscos(ft_1: pd.DataFrame,
+                  ft_2: pd.DataFrame,
+                  right_chromosomes: dict,
+                  left_chromosomes: dict,
+                  duplicated: bool = False,
+                  max_fanout: int = MAX_FANOUT,
+) -> pd.DataFrame:
+
+    """
+    Get the BUSCOs shared by two full tables, on the plotted chromosomes.
+
+    Parameters:
+        - ft_1 (pd.DataFrame): First full table data frame.
+        - ft_2 (pd.DataFrame): Second full table data frame.
+        - right_chromosomes (dict): Dictionary mapping sequence names to right chromosomes.
+        - left_chromosomes (dict): Dictionary mapping sequence names to left chromosomes.
+        - duplicated (bool, optional): Whether to pair the Duplicated hits too, every hit of a BUSCO in ft_1 with every hit in ft_2. Defaults to False (Complete only).
+        - max_fanout (int, optional): The maximum number of Duplicated hits of a BUSCO paired in each table (see join_busco_hits). Defaults to 4.
+
+    Returns:
+        - pd.DataFrame: One row per pair of hits, with the 'busco_id' and the 'sequence', 'gene_start' and 'gene_end' of ft_1 (suffix '_x') and of ft_2 (suffix '_y').
+    """
+
+    statuses = ['Complete', 'Duplicated'] if duplicated else ['Complete']
+
+    # Filter ft_1 and ft_2 to keep only the hits on the plotted chromosomes
+    ft_1 = ft_1.loc[ft_1['status'].isin(statuses) & ft_1['sequence'].isin(left_chromosomes.keys()), ['busco_id', 'sequence', 'gene_start', 'gene_end']]
+    ft_2 = ft_2.loc[ft_2['status'].isin(statuses) & ft_2['sequence'].isin(right_chromosomes.keys()), ['busco_id', 'sequence', 'gene_start', 'gene_end']]
+
+    # Pair the hits of each BUSCO
+    rows_1, rows_2 = join_busco_hits(ft_1['busco_id'], ft_2['busco_id'], max_fanout if duplicated else None)
+
+    hits_1 = ft_1.iloc[rows_1].reset_index(drop=True)
+    hits_2 = ft_2.iloc[rows_2].reset_index(drop=True)
+
+    return pd.concat([hits_1[['busco_id']],
+                      hits_1.drop(columns='busco_id').add_suffix('_x'),
+                      hits_2.drop(columns='busco_id').add_suffix('_y')], axis=1)
+
+def sequence_link_colors(sequence_x: pd.Series, sequence_y: pd.Series, link_colors: dict) -> (np.ndarray, list):
+
+    """
+    Resolve the color of each link from its sequences: the color of the first sequence, else the color of the second one, else gray.
+
+    Parameters:
+        - sequence_x (pd.Series): The first sequence of each link.
+        - sequence_y (pd.Series): The second sequence of each link.
+        - link_colors (dict): Dictionary mapping sequence names to link colors.
+
+    Returns:
+        - np.ndarray: The index in the distinct colors of the color of each link.
+        - list: The distinct colors.
+    """
+
+    # Resolve the link colors once per sequence, using gray by default
+    color_x = sequence_x.astype('category').map(link_colors)
+    color_y = sequence_y.astype('category').map(link_colors)
+
+    colors = color_x.astype(object).fillna(color_y.astype(object)).fillna('#d1d1d1')
+
+    color_index, unique_colors = pd.factorize(colors)
+
+    return color_index, list(unique_colors)
+
+def link_table(sequence_x: pd.Series,
+               position_x: pd.Series,
+               sequence_y: pd.Series,
+               position_y: pd.Series,
+               right_chromosomes: dict,
+               left_chromosomes: dict,
+               link_colors: dict,
+               straight_line: bool,
+               horizontal: bool,
+) -> LinkTable:
+
+    """
+    Build the links between positions on the left and on the right chromosomes.
+
+    Parameters:
+        - sequence_x (pd.Series): The left sequence of each link.
+        - position_x (pd.Series): The position of each link on its left sequence.
+        - sequence_y (pd.Series): The right sequence of each link.
+        - position_y (pd.Series): The position of each link on its right sequence.
+        - right_chromosomes (dict): Dictionary mapping sequence names to right chromosomes.
+        - left_chromosomes (dict): Dictionary mapping sequence names to left chromosomes.
+        - link_colors (dict): Dictionary mapping sequence names to link colors.
+        - straight_line (bool): Flag indicating whether to plot links as straight lines.
+        - horizontal (bool): Flag indicating whether the chromosomes are horizontal.
+
+    Returns:
+        - LinkTable: The coordinates and colors of the links.
+    """
+
+    # Map the start and end points of all the links at once
+    left_transforms  = chromosome_transforms(left_chromosomes)
+    right_transforms = chromosome_transforms(right_chromosomes)
+
+    x1, y1, left_idx  = map_positions(sequence_x, position_x, left_transforms)
+    x2, y2, right_idx = map_positions(sequence_y, position_y, right_transforms)
+
+    color_index, unique_colors = sequence_link_colors(sequence_x, sequence_y, link_colors)
+
+    return LinkTable(x1=x1, y1=y1, x2=x2, y2=y2,
+                     color_index=color_index,
+                     colors=unique_colors,
+                     c1_y_end=left_transforms['y_end'].to_numpy()[left_idx],
+                     c2_y_start=right_transforms['y_start'].to_numpy()[right_idx],
+                     straight_line=straight_line,
+                     horizontal=horizontal
+           )
+
 def generate_links(ft_1: pd.DataFrame, 
                    ft_2: pd.DataFrame, 
                    right_chromosomes: dict, 
@@ -283,10 +475,12 @@ def generate_links(ft_1: pd.DataFrame,
                    link_colors: str,
                    straight_line: bool,
                    horizontal: bool,
-) -> list:
+                   duplicated: bool = False,
+                   max_fanout: int = MAX_FANOUT,
+) -> LinkTable:
     
     """
-    Generates and plots links between two data frames.
+    Generates the links between two data frames.
     
     Parameters:
         - ft_1 (pd.DataFrame): First full table data frame.
@@ -295,58 +489,84 @@ def generate_links(ft_1: pd.DataFrame,
         - left_chromosomes (dict): Dictionary mapping sequence names to left chromosomes.
         - link_colors (str): Dictionary mapping sequence names to link colors.
         - straight_line (bool): Flag indicating whether to plot links as straight lines.
+        - duplicated (bool, optional): Whether to link the Duplicated hits too, many to many (see shared_buscos). Defaults to False.
+        - max_fanout (int, optional): The maximum number of Duplicated hits of a BUSCO linked in each genome. Defaults to 4.
 
     Returns:
-        - None
+        - LinkTable: The coordinates and colors of all the links.
     """
-    
-    # Filter ft_1 and ft_2 to keep only complete rows
-    ft_1 = ft_1[ft_1['status'] == 'Complete']
-    ft_2 = ft_2[ft_2['status'] == 'Complete']
 
-    # Merge the two data frames on 'busco_id' column
-    df = pd.merge(ft_1, ft_2, on='busco_id', how='inner')
+    df = shared_buscos(ft_1, ft_2, right_chromosomes, left_chromosomes, duplicated, max_fanout)
 
-    # Filter df to keep only rows with sequence names in left_chromosomes and right_chromosomes
-    df = df.loc[df['sequence_x'].isin(left_chromosomes.keys())]
-    df = df.loc[df['sequence_y'].isin(right_chromosomes.keys())]
+    return link_table(df['sequence_x'], df['gene_start_x'], df['sequence_y'], df['gene_start_y'],
+                      right_chromosomes, left_chromosomes, link_colors, straight_line, horizontal)
 
-    # Initialize the links list
-    links = []
+def generate_blocks(ft_1: pd.DataFrame,
+                    ft_2: pd.DataFrame,
+                    right_chromosomes: dict,
+                    left_chromosomes: dict,
+                    link_colors: dict,
+                    straight_line: bool,
+                    horizontal: bool,
+                    max_gap: int = 5,
+                    min_size: int = 3,
+                    duplicated: bool = False,
+                    max_fanout: int = MAX_FANOUT,
+) -> (RibbonTable, LinkTable):
 
-    # Iterate over the rows of df
-    for index, row in df.iterrows():
+    """
+    Generates the synteny blocks between two data frames, as ribbons, and the links of the BUSCOs outside the blocks.
 
-        # If the link color is not specified, use gray by default
-        if row['sequence_x'] in link_colors.keys():
-            color = link_colors[row['sequence_x']]
-        elif row['sequence_y'] in link_colors.keys():
-            color = link_colors[row['sequence_y']]
-        else:
-            color = '#d1d1d1'
-
-        # Generate the link
-        link = Link(C1=left_chromosomes[row['sequence_x']], 
-                    C2=right_chromosomes[row['sequence_y']], 
-                    p_1=row['gene_start_x'], 
-                    p_2=row['gene_start_y'], 
-                    color=color, 
-                    straight_line=straight_line,
-                    horizontal=horizontal
-               )
-        
-        # Add the link to the links list
-        links.append(link)
-    
-    return links
+    Parameters:
+        - ft_1 (pd.DataFrame): First full table data frame.
+        - ft_2 (pd.DataFrame): Second full table data frame.
+        - right_chromosomes (dict): Dictionary mapping sequence names to right chromosomes.
+        - left_chromosomes (dict): Dictionary mapping sequence names to left chromosomes.
+        - link_colors (dict): Dictionary mapping sequence names to link colors.
+        - straight_line (bool): Flag indicating whether to plot the ribbon edges and the links as straight lines.
+        - horizontal (bool): Flag indicating whether the chromosomes are horizontal.
+        - max_gap (int, optional): The maximum number of BUSCOs skipped between two BUSCOs of a block (see detect_synteny_blocks). Defaults to 5.
+        - min_size (int, optional): The minimum number of BUSCOs of a block. Defaults to 3.
+        - duplicated (bool, optional): Whether to link the Duplicated hits too, many to many (see shared_buscos). Defaults to False.
+        - max_fanout (int, optional): The maximum number of Duplicated hits of a BUSCO linked in each genome. Defaults to 4.
 
-def plot_chromosomes(chromosomes: dict, fig: plt.Figure, ax: plt.Axes) -> None:
+    Returns:
+        - RibbonTable: The ribbons of the blocks.
+        - LinkTable: The links of the remaining BUSCOs.
+    """
+
+    df = shared_buscos(ft_1, ft_2, right_chromosomes, left_chromosomes, duplicated, max_fanout)
+
+    # Chain the collinear BUSCOs
+    block, blocks = detect_synteny_blocks(df, max_gap=max_gap, min_size=min_size)
+
+    # The reversed blocks join the start of one chromosome to the end of the other
+    forward = (blocks['orientation'] == 1).to_numpy()
+
+    start_y = pd.Series(np.where(forward, blocks['start_y'], blocks['end_y']), index=blocks.index)
+    end_y   = pd.Series(np.where(forward, blocks['end_y'], blocks['start_y']), index=blocks.index)
+
+    ribbons = RibbonTable(start_edges=link_table(blocks['sequence_x'], blocks['start_x'], blocks['sequence_y'], start_y,
+                                                 right_chromosomes, left_chromosomes, link_colors, straight_line, horizontal),
+                          end_edges=link_table(blocks['sequence_x'], blocks['end_x'], blocks['sequence_y'], end_y,
+                                               right_chromosomes, left_chromosomes, link_colors, straight_line, horizontal)
+              )
+
+    # Keep a link for each BUSCO outside the blocks
+    df = df.loc[block < 0]
+
+    links = link_table(df['sequence_x'], df['gene_start_x'], df['sequence_y'], df['gene_start_y'],
+                       right_chromosomes, left_chromosomes, link_colors, straight_line, horizontal)
+
+    return ribbons, links
+
+def plot_chromosomes(chromosomes: dict, fig: Figure, ax: Axes) -> None:
     """
     Plots the chromosomes on the given axes.
     
     Parameters:
         - chromosomes (dict): Dictionary mapping sequence names to Chromosome objects.
-        - ax (plt.Axes): Matplotlib axes object to plot the chromosomes on.
+        - ax (Axes): Matplotlib axes object to plot the chromosomes on.
 
     Returns:
         - None
@@ -355,20 +575,54 @@ def plot_chromosomes(chromosomes: dict, fig: plt.Figure, ax: plt.Axes) -> None:
     for c in chromosomes.values():
         c.plot(fig, ax)
 
-def plot_links(links: list, ax: plt.Axes) -> None:
+def plot_links(links, ax: Axes) -> None:
     """
-    Plots the links on the given axes.
+    Plots the links on the given axes as a single line collection.
     
     Parameters:
-        - links (list): List of Link objects.
-        - ax (plt.Axes): Matplotlib axes object to plot the links on.
+        - links (LinkTable or list): The LinkTable, or a list of Link objects.
+        - ax (Axes): Matplotlib axes object to plot the links on.
+
+    Returns:
+        - None
+    """
+
+    if len(links) == 0:
+        return
+
+    # Build all the curves at once
+    if isinstance(links, LinkTable):
+        segments = links.segments()
+        colors   = links.link_colors()
+    else:
+        if links[0].straight_line:
+            segments = np.array([[l.start_point, l.end_point] for l in links], dtype=np.float64)
+        else:
+            segments = bezier_curves(np.stack([l.control_points() for l in links]))
+        colors = [l.color for l in links]
+
+    # Draw the links with their own colors
+    ax.add_collection(LineCollection(segments, colors=colors, linestyles='-', linewidths=1), autolim=False)
+
+def plot_ribbons(ribbons: RibbonTable, ax: Axes) -> None:
+    """
+    Plots the synteny block ribbons on the given axes as a single polygon collection.
+
+    Parameters:
+        - ribbons (RibbonTable): The ribbons.
+        - ax (Axes): Matplotlib axes object to plot the ribbons on.
 
     Returns:
         - None
     """
 
-    for l in links:
-        l.plot(ax)
+    if len(ribbons) == 0:
+        return
+
+    colors = ribbons.ribbon_colors()
+
+    # Draw the ribbons with their own colors, translucent where they overlap
+    ax.add_collection(PolyCollection(ribbons.polygons(), facecolors=colors, edgecolors=colors, linewidths=0.5, alpha=RIBBON_ALPHA), autolim=False)
 
 def vertical_synteny_plot(ft_1: pd.DataFrame, 
                           ft_2: pd.DataFrame,
@@ -381,10 +635,18 @@ def vertical_synteny_plot(ft_1: pd.DataFrame,
                           round_edges: bool = False,
                           link_colors: dict = {},
                           straight_line: bool = False,
+                          blocks: bool = False,
+                          block_gap: int = 5,
+                          min_block_size: int = 3,
+                          duplicated: bool = False,
+                          max_fanout: int = MAX_FANOUT,
                           output_path: str = None,
                           bbox_inches: str = 'tight',
-                          plt_show: bool = False
-):
+                          plt_show: bool = False,
+                          fig: Figure = None,
+                          cache = None,
+                          profile = None
+) -> Figure:
     """
     Generate a vertical synteny plot.
     
@@ -400,71 +662,128 @@ def vertical_synteny_plot(ft_1: pd.DataFrame,
         - round_edges (bool, optional): Whether to round the edges of the karyotype blocks. Defaults to False.
         - link_colors (dict, optional): A dictionary mapping link colors to chromosome pairs. Defaults to {}.
         - straight_line (bool, optional): Whether to use straight lines for links. Defaults to False.
+        - blocks (bool, optional): Whether to chain the collinear BUSCOs into synteny blocks, drawn as one ribbon each
+                                   (see detect_synteny_blocks). The BUSCOs outside the blocks keep their links. Defaults to False.
+        - block_gap (int, optional): The maximum number of BUSCOs skipped between two BUSCOs of a block. Defaults to 5.
+        - min_block_size (int, optional): The minimum number of BUSCOs of a block. Defaults to 3.
+        - duplicated (bool, optional): Whether to link the Duplicated BUSCOs too, every hit in the first genome with
+                                       every hit in the second one. Defaults to False (Complete BUSCOs only).
+        - max_fanout (int, optional): The maximum number of Duplicated hits of a BUSCO linked in each genome,
+                                      to bound the links of highly duplicated BUSCOs. Defaults to 4.
         - output_path (str, optional): The path to save the plot to. Defaults to None.
         - plt_show (bool, optional): Whether to show the plot. Defaults to False.
+        - fig (Figure, optional): A figure to draw on instead of a new one. Defaults to None.
+        - cache (str or FigureCache, optional): A figure cache directory. When the inputs and the parameters of an
+                                                earlier call are unchanged, its output is copied to output_path
+                                                instead of rendering the plot (unless plt_show). Defaults to None.
+        - profile (Profiler, callable or str, optional): Record the time, memory and counts of each stage of the plot
+                                                         (see profiling.open_profiler). Defaults to None.
 
     Returns:
-        - None
+        - Figure: The synteny plot figure (None when it is taken from the cache). It is not registered with pyplot.
     """
 
-    # Global variables
-    global VERTICAL_X_LIM
-    global VERTICAL_Y_LIM
-    
-    # Lowercase the column names
-    karyotype_1.columns = karyotype_1.columns.str.lower()
-    karyotype_2.columns = karyotype_2.columns.str.lower()
+    # Lowercase the column names, on copies so that the input frames can be shared between threads
+    karyotype_1 = karyotype_1.rename(columns=str.lower)
+    karyotype_2 = karyotype_2.rename(columns=str.lower)
+
+    profiler = open_profiler(profile)
+
+    with profiler.function('vertical_synteny_plot', output=output_path):
+
+        # Reuse the cached figure when the inputs and the parameters are unchanged
+        cache = open_figure_cache(cache)
+
+        if cache is not None and output_path:
+            with profiler.stage('cache_restore') as stage:
+                key = cache.key('vertical_synteny_plot', {'ft_1': ft_1, 'ft_2': ft_2, 'karyotype_1': karyotype_1, 'karyotype_2': karyotype_2,
+                                                          'title': title, 'dim': dim, 'figsize': figsize, 'dpi': dpi, 'round_edges': round_edges,
+                                                          'link_colors': link_colors, 'straight_line': straight_line, 'bbox_inches': bbox_inches,
+                                                          'blocks': blocks, 'block_gap': block_gap, 'min_block_size': min_block_size,
+                                                          'duplicated': duplicated, 'max_fanout': max_fanout,
+                                                          'format': os.path.splitext(output_path)[1].lower()})
+
+                stage['hit'] = not plt_show and cache.restore(key, output_path) is not None
+
+            if stage.get('hit'):
+                return None
+
+        # Create a new figure and axis
+        fig = new_figure(figsize=figsize, dpi=dpi, fig=fig)
+        ax  = fig.subplots()
+
+        # Turn off the axis
+        ax.axis('off')
+
+        # Set the x and y limits
+        layout = SyntenyLayout(figsize)
+
+        # Set the x and y limits of the plot
+        ax.set_xlim([0, layout.x_lim])
+        ax.set_ylim([0, layout.y_lim])
+
+        # Insert the plot title
+        ax.text(layout.x_lim / 2, layout.y_lim - 3, karyotype_1['organism'][0] + ' - ' + karyotype_2['organism'][0] + ' ' + title, fontsize=20, ha='center')
+
+        # Plot left and right karyotypes
+        with profiler.stage('karyotypes') as stage:
+            left_chromosomes  = generate_left_karyotype(karyotype_1, dim, round_edges, layout)
+            right_chromosomes = generate_right_karyotype(karyotype_2, dim, round_edges, layout)
+
+            stage['chromosomes'] = len(left_chromosomes) + len(right_chromosomes)
 
-    # Create a new figure and axis
-    fig, ax = plt.subplots(figsize=figsize, dpi=dpi)
+        # Generate and plot links
+        with profiler.stage('links', rows=len(ft_1) + len(ft_2)) as stage:
+            if blocks:
+                ribbons, links = generate_blocks(ft_1, ft_2, right_chromosomes, left_chromosomes, link_colors=link_colors, straight_line=straight_line, horizontal=False,
+                                                 max_gap=block_gap, min_size=min_block_size, duplicated=duplicated, max_fanout=max_fanout)
 
-    # Turn off the axis
-    ax.axis('off')
+                stage['blocks'] = len(ribbons)
+            else:
+                ribbons, links = None, generate_links(ft_1, ft_2, right_chromosomes, left_chromosomes, link_colors=link_colors, straight_line=straight_line, horizontal=False,
+                                                      duplicated=duplicated, max_fanout=max_fanout)
 
-    # Set the x and y limits
-    VERTICAL_X_LIM   = figsize[0] * 10
-    VERTICAL_Y_LIM   = figsize[1] * 10
+            stage['links'] = len(links)
 
-    # Set the x and y limits of the plot
-    ax.set_xlim([0, VERTICAL_X_LIM])
-    ax.set_ylim([0, VERTICAL_Y_LIM])
+        with profiler.stage('draw') as stage:
 
-    # Insert the plot title
-    ax.text(VERTICAL_X_LIM / 2, VERTICAL_Y_LIM - 3, karyotype_1['organism'][0] + ' - ' + karyotype_2['organism'][0] + ' ' + title, fontsize=20, ha='center')
+            # Plot the block ribbons and the links
+            if ribbons is not None:
+                plot_ribbons(ribbons, ax)
 
-    # Plot left and right karyotypes
-    left_chromosomes  = generate_left_karyotype(karyotype_1, dim, round_edges)
-    right_chromosomes = generate_right_karyotype(karyotype_2, dim, round_edges)
+            plot_links(links, ax)
 
-    # Generate and plot links
-    links = generate_links(ft_1, ft_2, right_chromosomes, left_chromosomes, link_colors=link_colors, straight_line=straight_line, horizontal=False)
+            # Plot the chromosomes
+            plot_chromosomes(left_chromosomes, fig, ax)
+            plot_chromosomes(right_chromosomes, fig, ax)
 
-    # Plot the links
-    plot_links(links, ax)
+            # Write the legend
+            ax.legend(handles=[Rectangle((0,0),1,1, color=karyotype_1['color'][0]), 
+                               Rectangle((0,0),1,1, color=karyotype_2['color'][0])],
+                               labels=[karyotype_1['organism'][0], karyotype_2['organism'][0]], 
+                               loc='upper right'
+            )
 
-    # Plot the chromosomes
-    plot_chromosomes(left_chromosomes, fig, ax)
-    plot_chromosomes(right_chromosomes, fig, ax)
+            profiler.count_figure(stage, fig)
 
-    # Write the legend
-    plt.legend(handles=[Rectangle((0,0),1,1, color=karyotype_1['color'][0]), 
-                        Rectangle((0,0),1,1, color=karyotype_2['color'][0])],
-                        labels=[karyotype_1['organism'][0], karyotype_2['organism'][0]], 
-                        loc='upper right'
-    )
+        # Plt tight layout
+        with profiler.stage('tight_layout'):
+            fig.tight_layout()
 
-    # Plt tight layout
-    plt.tight_layout()
+        # Save the plot if output path is provided
+        if output_path is not None:
+            with profiler.stage('savefig'):
+                fig.savefig(output_path, dpi=dpi, bbox_inches=bbox_inches)
 
-    # Save the plot if output path is provided
-    if output_path is not None:
-        plt.savefig(output_path, dpi=dpi, bbox_inches=bbox_inches)
+            if cache is not None:
+                with profiler.stage('cache_store'):
+                    cache.store(key, 'vertical_synteny_plot', output_path, [output_path])
     
     # Show the plot
     if plt_show:
-        plt.show()
+        show_figure(fig)
     
-    plt.close()
+    return fig
 
 def horizontal_synteny_plot(ft_1: pd.DataFrame, 
                             ft_2: pd.DataFrame,
@@ -477,10 +796,18 @@ def horizontal_synteny_plot(ft_1: pd.DataFrame,
                             round_edges: bool = False,
                             link_colors: dict = {},
                             straight_line: bool = False,
+                            blocks: bool = False,
+                            block_gap: int = 5,
+                            min_block_size: int = 3,
+                            duplicated: bool = False,
+                            max_fanout: int = MAX_FANOUT,
                             output_path: str = None,
                             bbox_inches: str = 'tight',
-                            plt_show: bool = False
-):
+                            plt_show: bool = False,
+                            fig: Figure = None,
+                            cache = None,
+                            profile = None
+) -> Figure:
     """
     Generate a horizontal synteny plot.
     
@@ -496,66 +823,184 @@ def horizontal_synteny_plot(ft_1: pd.DataFrame,
         - round_edges (bool, optional): Whether to round the edges of the karyotype blocks. Defaults to False.
         - link_colors (dict, optional): A dictionary mapping link colors to chromosome pairs. Defaults to {}.
         - straight_line (bool, optional): Whether to use straight lines for links. Defaults to False.
+        - blocks (bool, optional): Whether to chain the collinear BUSCOs into synteny blocks, drawn as one ribbon each
+                                   (see detect_synteny_blocks). The BUSCOs outside the blocks keep their links. Defaults to False.
+        - block_gap (int, optional): The maximum number of BUSCOs skipped between two BUSCOs of a block. Defaults to 5.
+        - min_block_size (int, optional): The minimum number of BUSCOs of a block. Defaults to 3.
+        - duplicated (bool, optional): Whether to link the Duplicated BUSCOs too, every hit in the first genome with
+                                       every hit in the second one. Defaults to False (Complete BUSCOs only).
+        - max_fanout (int, optional): The maximum number of Duplicated hits of a BUSCO linked in each genome,
+                                      to bound the links of highly duplicated BUSCOs. Defaults to 4.
         - output_path (str, optional): The path to save the output plot. Defaults to None.
         - plt_show (bool, optional): Whether to show the plot. Defaults to False.
+        - fig (Figure, optional): A figure to draw on instead of a new one. Defaults to None.
+        - cache (str or FigureCache, optional): A figure cache directory. When the inputs and the parameters of an
+                                                earlier call are unchanged, its output is copied to output_path
+                                                instead of rendering the plot (unless plt_show). Defaults to None.
+        - profile (Profiler, callable or str, optional): Record the time, memory and counts of each stage of the plot
+                                                         (see profiling.open_profiler). Defaults to None.
 
     Returns:
-        - None
+        - Figure: The synteny plot figure (None when it is taken from the cache). It is not registered with pyplot.
     """
 
-    # Global variables
-    global HORIZONTAL_X_LIM
-    global HORIZONTAL_Y_LIM
-    
-    # Lowercase the column names
-    karyotype_1.columns = karyotype_1.columns.str.lower()
-    karyotype_2.columns = karyotype_2.columns.str.lower()
+    # Lowercase the column names, on copies so that the input frames can be shared between threads
+    karyotype_1 = karyotype_1.rename(columns=str.lower)
+    karyotype_2 = karyotype_2.rename(columns=str.lower)
+
+    profiler = open_profiler(profile)
+
+    with profiler.function('horizontal_synteny_plot', output=output_path):
+
+        # Reuse the cached figure when the inputs and the parameters are unchanged
+        cache = open_figure_cache(cache)
+
+        if cache is not None and output_path:
+            with profiler.stage('cache_restore') as stage:
+                key = cache.key('horizontal_synteny_plot', {'ft_1': ft_1, 'ft_2': ft_2, 'karyotype_1': karyotype_1, 'karyotype_2': karyotype_2,
+                                                            'title': title, 'dim': dim, 'figsize': figsize, 'dpi': dpi, 'round_edges': round_edges,
+                                                            'link_colors': link_colors, 'straight_line': straight_line, 'bbox_inches': bbox_inches,
+                                                            'blocks': blocks, 'block_gap': block_gap, 'min_block_size': min_block_size,
+                                                            'duplicated': duplicated, 'max_fanout': max_fanout,
+                                                            'format': os.path.splitext(output_path)[1].lower()})
+
+                stage['hit'] = not plt_show and cache.restore(key, output_path) is not None
+
+            if stage.get('hit'):
+                return None
+
+        # Create a new figure and axis
+        fig = new_figure(figsize=figsize, dpi=dpi, fig=fig)
+        ax  = fig.subplots()
+
+        # Turn off the axis
+        ax.axis('off')
 
-    # Create a new figure and axis
-    fig, ax = plt.subplots(figsize=figsize, dpi=dpi)
+        # Set the x and y limits
+        layout = SyntenyLayout(figsize)
 
-    # Turn off the axis
-    ax.axis('off')
+        # Set the x and y limits of the plot
+        ax.set_xlim([0, layout.x_lim])
+        ax.set_ylim([0, layout.y_lim])
 
-    # Set the x and y limits
-    HORIZONTAL_X_LIM   = figsize[0] * 10
-    HORIZONTAL_Y_LIM   = figsize[1] * 10
+        # Insert the plot title
+        ax.text(layout.x_lim / 2, layout.y_lim - 3, karyotype_1['organism'][0] + ' - ' + karyotype_2['organism'][0] + ' ' + title, fontsize=20, ha='center')
 
-    # Set the x and y limits of the plot
-    ax.set_xlim([0, HORIZONTAL_X_LIM])
-    ax.set_ylim([0, HORIZONTAL_Y_LIM])
+        # Plot left and right karyotypes
+        with profiler.stage('karyotypes') as stage:
+            bottom_chromosomes = generate_bottom_karyotype(karyotype_1, dim, round_edges, layout)
+            top_chromosomes    = generate_up_karyotype(karyotype_2, dim, round_edges, layout)
 
-    # Insert the plot title
-    ax.text(HORIZONTAL_X_LIM / 2, HORIZONTAL_Y_LIM - 3, karyotype_1['organism'][0] + ' - ' + karyotype_2['organism'][0] + ' ' + title, fontsize=20, ha='center')
+            stage['chromosomes'] = len(bottom_chromosomes) + len(top_chromosomes)
 
-    # Plot left and right karyotypes
-    bottom_chromosomes = generate_bottom_karyotype(karyotype_1, dim, round_edges)
-    top_chromosomes    = generate_up_karyotype(karyotype_2, dim, round_edges)
+        # Generate and plot links
+        with profiler.stage('links', rows=len(ft_1) + len(ft_2)) as stage:
+            if blocks:
+                ribbons, links = generate_blocks(ft_1, ft_2, top_chromosomes, bottom_chromosomes, link_colors=link_colors, straight_line=straight_line, horizontal=True,
+                                                 max_gap=block_gap, min_size=min_block_size, duplicated=duplicated, max_fanout=max_fanout)
 
-    # Generate and plot links
-    links = generate_links(ft_1, ft_2, top_chromosomes, bottom_chromosomes, link_colors=link_colors, straight_line=straight_line, horizontal=True)
+                stage['blocks'] = len(ribbons)
+            else:
+                ribbons, links = None, generate_links(ft_1, ft_2, top_chromosomes, bottom_chromosomes, link_colors=link_colors, straight_line=straight_line, horizontal=True,
+                                                      duplicated=duplicated, max_fanout=max_fanout)
 
-    # Plot the links
-    plot_links(links, ax)
+            stage['links'] = len(links)
 
-    # Plot the chromosomes
-    plot_chromosomes(bottom_chromosomes, fig, ax)
-    plot_chromosomes(top_chromosomes, fig, ax)
+        with profiler.stage('draw') as stage:
 
-    # Write the legend
-    plt.legend(handles=[Rectangle((0,0),1,1, color=karyotype_1['color'][0]), 
-                        Rectangle((0,0),1,1, color=karyotype_2['color'][0])],
-                        labels=[karyotype_1['organism'][0], karyotype_2['organism'][0]], 
-                        loc='upper right'
-    )
+            # Plot the block ribbons and the links
+            if ribbons is not None:
+                plot_ribbons(ribbons, ax)
 
-    # Save the plot if output path is provided
-    if output_path is not None:
-        plt.savefig(output_path, dpi=dpi, bbox_inches=bbox_inches)
+            plot_links(links, ax)
+
+            # Plot the chromosomes
+            plot_chromosomes(bottom_chromosomes, fig, ax)
+            plot_chromosomes(top_chromosomes, fig, ax)
+
+            # Write the legend
+            ax.legend(handles=[Rectangle((0,0),1,1, color=karyotype_1['color'][0]), 
+                               Rectangle((0,0),1,1, color=karyotype_2['color'][0])],
+                               labels=[karyotype_1['organism'][0], karyotype_2['organism'][0]], 
+                               loc='upper right'
+            )
+
+            profiler.count_figure(stage, fig)
+
+        # Save the plot if output path is provided
+        if output_path is not None:
+            with profiler.stage('savefig'):
+                fig.savefig(output_path, dpi=dpi, bbox_inches=bbox_inches)
+
+            if cache is not None:
+                with profiler.stage('cache_store'):
+                    cache.store(key, 'horizontal_synteny_plot', output_path, [output_path])
     
     # Show the plot if plt_show is True
     if plt_show:
-        plt.show()
+        show_figure(fig)
     
-    plt.close()
+    return fig
+
+
+def render_synteny_pair(pair: dict, keep_figure: bool = False):
+    """
+    Render a single synteny plot of render_synteny_batch.
+
+    Parameters:
+        - pair (dict): The keyword arguments of the plot, with an optional 'orientation' key.
+        - keep_figure (bool, optional): Whether to return the figure instead of its output path. The figure is None
+                                        when the plot is taken from its figure cache. Defaults to False.
+
+    Returns:
+        - Figure or str: The figure (None on a cache hit), or the output path of the plot.
+    """
+
+    pair = dict(pair)
+
+    # Choose the plot function
+    orientation = pair.pop('orientation', 'vertical')
+
+    if orientation == 'vertical':
+        plot = vertical_synteny_plot
+    elif orientation == 'horizontal':
+        plot = horizontal_synteny_plot
+    else:
+        raise ValueError('Unknown synteny plot orientation: {}'.format(orientation))
+
+    fig = plot(**pair)
+
+    if keep_figure:
+        return fig
+
+    # Release the figure, only its file is needed (there is none on a cache hit)
+    if fig is not None:
+        fig.clear()
+
+    return pair.get('output_path')
+
+def render_synteny_batch(pairs: list, workers: int = 1, keep_figures: bool = False) -> list:
+    """
+    Render many synteny plots at once, in a thread pool.
+
+    Every plot has its own figure and layout, and the input frames are not modified, so the same
+    karyotypes and full tables can be shared between the pairs.
+
+    Parameters:
+        - pairs (list): One dictionary per plot, with the keyword arguments of vertical_synteny_plot
+                        (ft_1, ft_2, karyotype_1, karyotype_2, output_path, ...) and an optional
+                        'orientation' key, 'vertical' (the default) or 'horizontal'.
+        - workers (int, optional): The number of threads. Defaults to 1 (no pool).
+        - keep_figures (bool, optional): Whether to return the figures. They hold their rendered
+                                         image, so by default they are released after saving. Defaults to False.
+
+    Returns:
+        - list: The figure (with keep_figures, None for the plots taken from their cache) or the output path of each plot, in the order of pairs.
+    """
+
+    # Render the plots, in a thread pool if requested
+    if workers > 1 and len(pairs) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(render_synteny_pair, pairs, [keep_figures] * len(pairs)))
 
+    return [render_synteny_pair(pair, keep_figures) for pair in pairs]
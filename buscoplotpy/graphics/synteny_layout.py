@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+# This class holds the layout of a single synteny plot.
+
+class SyntenyLayout:
+
+    def __init__(self, figsize: (float, float)):
+
+        """
+        Initialize the SyntenyLayout class, the plot coordinates of a synteny plot.
+
+        The plot area is ten units per inch of the figure, so the chromosomes keep the same
+        proportions whatever the figure size. Every plot builds its own layout and passes it
+        to the karyotype generators, so several plots can be drawn at the same time.
+
+        Parameters:
+            - figsize (tuple): The size of the figure in inches.
+        """
+
+        self.figsize = tuple(figsize)
+
+        # Set the x and y limits
+        self.x_lim = figsize[0] * 10
+        self.y_lim = figsize[1] * 10
+
+    def __str__(self):
+
+        return 'SyntenyLayout(x_lim={}, y_lim={})'.format(self.x_lim, self.y_lim)
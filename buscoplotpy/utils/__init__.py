@@ -15,6 +15,3 @@ class MyClass:
         self.version = version
 # Esempio: definire una variabile
 versione = "1.0"
-
-# Esempio: eseguire un'azione all'importazione del pacchetto
-print("Il pacchetto è stato importato!")
\ No newline at end of file
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+
+#Importing libraries
+import numpy as np
+import pandas as pd
+
+def join_busco_hits(ids_1: pd.Series, ids_2: pd.Series, max_fanout: int = None) -> (np.ndarray, np.ndarray):
+
+    """
+    Join the hits of two full tables on their BUSCO id, pairing every hit of a BUSCO in the first table with
+    every hit of the same BUSCO in the second one (one pair per BUSCO for the Complete ones, many for the
+    Duplicated ones).
+
+    The BUSCO ids are coded as integers with a hash table, the hits of each table are sorted by code, and
+    the pairs are expanded with arrays sized exactly from the hit counts. With max_fanout, only the first
+    max_fanout hits of a BUSCO in each table are paired, so a BUSCO gives at most max_fanout ** 2 pairs.
+
+    The pairs follow the first appearance of their BUSCO in the first table, as with an inner pd.merge.
+
+    Parameters:
+        - ids_1 (pd.Series): The BUSCO id of each hit of the first table.
+        - ids_2 (pd.Series): The BUSCO id of each hit of the second table.
+        - max_fanout (int, optional): The maximum number of hits of a BUSCO paired in each table. Defaults to None (no limit).
+
+    Returns:
+        - np.ndarray: The row of each pair in the first table (positional).
+        - np.ndarray: The row of each pair in the second table (positional).
+    """
+
+    # Code the BUSCO ids of both tables at once, in order of first appearance
+    codes, uniques = pd.factorize(np.concatenate([ids_1.to_numpy(dtype=object), ids_2.to_numpy(dtype=object)]))
+
+    codes_1, codes_2 = codes[:len(ids_1)], codes[len(ids_1):]
+
+    # Group the hits of each table by BUSCO
+    order_1 = np.argsort(codes_1, kind='stable')
+    order_2 = np.argsort(codes_2, kind='stable')
+
+    count_1 = np.bincount(codes_1, minlength=len(uniques))
+    count_2 = np.bincount(codes_2, minlength=len(uniques))
+
+    start_1 = np.concatenate([[0], np.cumsum(count_1)[:-1]])
+    start_2 = np.concatenate([[0], np.cumsum(count_2)[:-1]])
+
+    # Cap the hits paired per BUSCO
+    if max_fanout is not None:
+        count_1 = np.minimum(count_1, max_fanout)
+        count_2 = np.minimum(count_2, max_fanout)
+
+    # Expand the pairs of each BUSCO: a pair number p gives the hit p // count_2 of the first table and p % count_2 of the second
+    pairs = count_1 * count_2
+    code  = np.repeat(np.arange(len(uniques)), pairs)
+    local = np.arange(pairs.sum()) - np.repeat(np.cumsum(pairs) - pairs, pairs)
+
+    rows_1 = order_1[start_1[code] + local // count_2[code]]
+    rows_2 = order_2[start_2[code] + local % count_2[code]]
+
+    return rows_1, rows_2
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+
+#Importing libraries
+import os
+
+import numpy as np
+import pandas as pd
+
+from ..utils.load_metaeuk_coordinates import GFF_COLUMN_NAMES, load_metaeuk_coordinates
+
+# Above this file size (in bytes) the gff files are streamed instead of loaded
+STREAMING_THRESHOLD = 256 * 1024 * 1024
+
+# Number of gff lines parsed at once when streaming
+STREAMING_CHUNKSIZE = 1000000
+
+def build_interval_index(genes_dataframe: pd.DataFrame,
+                         sequences: list = None,
+                         targets: list = None
+) -> dict:
+
+    """
+    Sort the feature starts and ends once for every (sequence, type) pair.
+
+    Parameters:
+        - genes_dataframe (pd.DataFrame): The gff coordinates DataFrame (see load_metaeuk_coordinates).
+        - sequences (list, optional): The sequences to index. Defaults to all the sequences.
+        - targets (list, optional): The feature types to index. Defaults to all the types.
+
+    Returns:
+        - dict: A dictionary mapping (sequence, type) to a (sorted starts, sorted ends) tuple of numpy arrays.
+    """
+
+    # Keep only the requested sequences and feature types
+    df = genes_dataframe[['sequence', 'type', 'start', 'end']]
+
+    if sequences is not None:
+        df = df[df['sequence'].isin(sequences)]
+
+    if targets is not None:
+        df = df[df['type'].isin(targets)]
+
+    # Rows without coordinates never match a bin
+    df = df.dropna(subset=['start', 'end'])
+
+    # Sort the starts and the ends of each block only once
+    index = {}
+
+    for (sequence, target), block in df.groupby(['sequence', 'type'], sort=False, observed=True):
+        index[(sequence, target)] = (np.sort(block['start'].to_numpy(dtype=np.float64)),
+                                     np.sort(block['end'].to_numpy(dtype=np.float64)))
+
+    return index
+
+def count_bin_overlaps(starts: np.ndarray, ends: np.ndarray, bins: np.ndarray) -> np.ndarray:
+
+    """
+    Count the features overlapping each bin.
+
+    A feature [start, end] overlaps the bin [bins[i], bins[i+1]] when start <= bins[i+1] and end >= bins[i],
+    which is the same rule chromoplot has always used (GFF features always have start <= end).
+    Every feature ending before bins[i] also starts before bins[i+1], so the count is a difference
+    of two binary searches.
+
+    Parameters:
+        - starts (np.ndarray): The sorted feature starts.
+        - ends (np.ndarray): The sorted feature ends.
+        - bins (np.ndarray): The bin edges, in increasing order.
+
+    Returns:
+        - np.ndarray: The number of features overlapping each of the len(bins) - 1 bins.
+    """
+
+    started = np.searchsorted(starts, bins[1:], side='right')
+    ended   = np.searchsorted(ends, bins[:-1], side='left')
+
+    return started - ended
+
+def stream_feature_density(karyotype: pd.DataFrame,
+                           path: str,
+                           bin_number: int = 100,
+                           targets: list = ['gene', 'mRNA', 'CDS', 'exon'],
+                           chunksize: int = STREAMING_CHUNKSIZE
+) -> dict:
+
+    """
+    Compute the feature density of a gff file in a single pass, without loading the whole file.
+    The file is read in chunks (gzip files are decompressed on the fly) and the counts of each chunk
+    are added to the bin accumulators, so the memory is bounded by the chunk size and the number of bins.
+
+    Parameters:
+        - karyotype (pd.DataFrame): The karyotype DataFrame, with the "chr" and "end" columns.
+        - path (str): The path to the gff file, optionally gzip compressed.
+        - bin_number (int, optional): The number of bins for each chromosome. Defaults to 100.
+        - targets (list, optional): The feature types to count. Defaults to ['gene', 'mRNA', 'CDS', 'exon'].
+        - chunksize (int, optional): The number of lines parsed at once. Defaults to 1000000.
+
+    Returns:
+        - dict: The same dictionary as compute_feature_density.
+    """
+
+    # Lowercase the column names
+    karyotype.columns = karyotype.columns.str.lower()
+
+    assert 'chr' in karyotype.columns, 'The karyotype DataFrame must contain the "chr" column.'
+    assert 'end' in karyotype.columns, 'The karyotype DataFrame must contain the "end" column.'
+
+    # Initialize the bin accumulators
+    density = {}
+
+    for chr_name, size in zip(karyotype['chr'], karyotype['end']):
+        density[chr_name] = {'bins': np.linspace(0, size, bin_number + 1),
+                             'counts': {target: np.zeros(bin_number, dtype=np.int64) for target in targets}}
+
+    sequences = list(density.keys())
+
+    # Read the gff file chunk by chunk
+    reader = pd.read_csv(path, sep='\t', header=None, names=GFF_COLUMN_NAMES, comment='#',
+                         usecols=['sequence', 'type', 'start', 'end'], chunksize=chunksize, compression='infer')
+
+    with reader:
+        for chunk in reader:
+
+            # Sort and count the features of this chunk only
+            index = build_interval_index(chunk, sequences=sequences, targets=targets)
+
+            for (chr_name, target), (starts, ends) in index.items():
+                counts = density[chr_name]['counts'][target]
+                counts += count_bin_overlaps(starts, ends, density[chr_name]['bins'])
+
+    return density
+
+def compute_feature_density(karyotype: pd.DataFrame,
+                            genes_dataframe,
+                            bin_number: int = 100,
+                            targets: list = ['gene', 'mRNA', 'CDS', 'exon'],
+                            streaming_threshold: int = STREAMING_THRESHOLD
+) -> dict:
+
+    """
+    Compute the number of features of each type overlapping each bin of each chromosome.
+
+    Parameters:
+        - karyotype (pd.DataFrame): The karyotype DataFrame, with the "chr" and "end" columns.
+        - genes_dataframe (pd.DataFrame or str): The gff coordinates DataFrame (see load_metaeuk_coordinates),
+                                                 or the path to the gff file.
+        - bin_number (int, optional): The number of bins for each chromosome. Defaults to 100.
+        - targets (list, optional): The feature types to count. Defaults to ['gene', 'mRNA', 'CDS', 'exon'].
+        - streaming_threshold (int, optional): The file size (in bytes) above which a gff path is streamed
+                                               with stream_feature_density instead of loaded. Defaults to 256 MiB.
+
+    Returns:
+        - dict: A dictionary mapping each chromosome name to a dictionary with the "bins" edges
+                (bin_number + 1 values) and the "counts" of each target (bin_number values each).
+    """
+
+    # Stream the large gff files, load the small ones
+    if isinstance(genes_dataframe, (str, os.PathLike)):
+        if os.path.getsize(genes_dataframe) > streaming_threshold:
+            return stream_feature_density(karyotype, genes_dataframe, bin_number=bin_number, targets=targets)
+
+        genes_dataframe = load_metaeuk_coordinates(genes_dataframe)
+
+    # Lowercase the column names
+    karyotype.columns = karyotype.columns.str.lower()
+
+    assert 'chr' in karyotype.columns, 'The karyotype DataFrame must contain the "chr" column.'
+    assert 'end' in karyotype.columns, 'The karyotype DataFrame must contain the "end" column.'
+
+    # Sort the coordinates once for every (sequence, type) pair
+    index = build_interval_index(genes_dataframe, sequences=karyotype['chr'].to_list(), targets=targets)
+
+    empty = np.empty(0, dtype=np.float64)
+
+    density = {}
+
+    for chr_name, size in zip(karyotype['chr'], karyotype['end']):
+
+        # Define the bin edges of the chromosome
+        bins = np.linspace(0, size, bin_number + 1)
+
+        counts = {}
+
+        for target in targets:
+            starts, ends = index.get((chr_name, target), (empty, empty))
+            counts[target] = count_bin_overlaps(starts, ends, bins)
+
+        density[chr_name] = {'bins': bins, 'counts': counts}
+
+    return density
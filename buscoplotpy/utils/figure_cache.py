@@ -0,0 +1,431 @@
+# -*- coding: utf-8 -*-
+
+#Importing libraries
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from .. import __version__
+
+# Bump this when the layout of the cache changes
+FIGURE_CACHE_VERSION = 2
+
+# The name of the manifest file, one JSON line per stored or reused figure
+MANIFEST_NAME = 'manifest.jsonl'
+
+# The subdirectory of the stored figures, the only files removed by prune
+FIGURES_NAME = 'figures'
+
+# Serialize the manifest writes of the threads of a process (plot batches, render server)
+MANIFEST_LOCK = threading.Lock()
+
+class InputFile:
+
+    def __init__(self, path: str):
+
+        """
+        Initialize the InputFile class, a plot argument that is the path of an input file. It is
+        fingerprinted by the content of the file, where a plain string is fingerprinted by its repr.
+
+        Parameters:
+            - path (str): The path to the input file.
+        """
+
+        self.path = path
+
+    def __repr__(self):
+
+        return 'InputFile({!r})'.format(self.path)
+
+def fingerprint(value) -> str:
+
+    """
+    Compute the fingerprint of a plot argument.
+
+    DataFrames are hashed by content (values, index, column names and dtypes), InputFile paths
+    by the content of the file, arrays by their bytes and the other values (strings included) by their repr.
+
+    Parameters:
+        - value: The argument.
+
+    Returns:
+        - str: The hexadecimal fingerprint.
+    """
+
+    h = hashlib.sha1()
+
+    if isinstance(value, pd.DataFrame):
+        h.update(repr([(str(c), str(t)) for c, t in value.dtypes.items()]).encode())
+        h.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+    elif isinstance(value, pd.Series):
+        h.update('{}|{}'.format(value.name, value.dtype).encode())
+        h.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+    elif isinstance(value, np.ndarray):
+        h.update('{}|{}'.format(value.dtype, value.shape).encode())
+        h.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, InputFile):
+        h.update(b'file|')
+
+        with open(value.path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                h.update(block)
+    elif isinstance(value, dict):
+        h.update(repr(sorted((repr(k), fingerprint(v)) for k, v in value.items())).encode())
+    elif isinstance(value, (list, tuple)):
+        h.update(repr([fingerprint(v) for v in value]).encode())
+    else:
+        h.update(repr(value).encode())
+
+    return h.hexdigest()
+
+def temporary_path(path: str) -> str:
+
+    """
+    Get a temporary path next to a file, unique to the calling process and thread.
+
+    Parameters:
+        - path (str): The file path.
+
+    Returns:
+        - str: The temporary path, ending with '.tmp'.
+    """
+
+    return '{}.{}.{}.tmp'.format(path, os.getpid(), threading.get_ident())
+
+def copy_file_atomic(source: str, destination: str) -> None:
+
+    """
+    Copy a file through a temporary file, so that readers never see a partial file. The temporary name is
+    unique to the thread, so threads and processes copying to the same destination do not collide.
+
+    Parameters:
+        - source (str): The copied file.
+        - destination (str): The destination path.
+    """
+
+    tmp = temporary_path(destination)
+
+    shutil.copyfile(source, tmp)
+    os.replace(tmp, destination)
+
+class FigureCache:
+
+    def __init__(self, directory: str):
+
+        """
+        Initialize the FigureCache class, a content-addressed cache of rendered figures.
+
+        A figure is stored under the hash of the plot name, of all its arguments (see fingerprint)
+        and of the buscoplotpy version. When a plot is called again with the same inputs, the stored
+        files are copied to the output path instead of rendering the figure again.
+
+        The figures are stored in the 'figures' subdirectory, next to the manifest, so that a cache
+        directory shared with other files never has them removed by prune.
+
+        Parameters:
+            - directory (str): The cache directory. It is created if it does not exist.
+        """
+
+        self.directory = directory
+        self.figures   = os.path.join(directory, FIGURES_NAME)
+        self.manifest  = os.path.join(directory, MANIFEST_NAME)
+
+        # Number of figures reused and stored by this object
+        self.hits   = 0
+        self.misses = 0
+
+        os.makedirs(self.figures, exist_ok=True)
+
+        # An empty manifest marks the directory as a figure cache
+        with open(self.manifest, 'a'):
+            pass
+
+    def __str__(self):
+
+        return 'FigureCache({})'.format(self.directory)
+
+    def key(self, plot: str, arguments: dict) -> str:
+
+        """
+        Compute the cache key of a figure.
+
+        Parameters:
+            - plot (str): The name of the plot function.
+            - arguments (dict): The arguments that change the figure, including the input tables.
+
+        Returns:
+            - str: The hexadecimal cache key.
+        """
+
+        h = hashlib.sha1()
+        h.update('{}|{}|{}'.format(FIGURE_CACHE_VERSION, __version__, plot).encode())
+
+        for name in sorted(arguments):
+            h.update('|{}={}'.format(name, fingerprint(arguments[name])).encode())
+
+        return h.hexdigest()
+
+    def entries(self) -> dict:
+
+        """
+        Read the manifest.
+
+        Returns:
+            - dict: The last manifest record of each key, with the 'plot', the stored 'files',
+                    their total 'size' and the 'created' and 'used' times.
+        """
+
+        entries = {}
+
+        if not os.path.exists(self.manifest):
+            return entries
+
+        with open(self.manifest) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+
+                entries[record['key']] = dict(entries.get(record['key'], {}), **record)
+
+        return entries
+
+    def append(self, record: dict) -> None:
+
+        """
+        Append a record to the manifest. Single line appends are safe from concurrent processes,
+        and the threads of a process wait for the manifest rewrites of prune.
+
+        Parameters:
+            - record (dict): The manifest record.
+        """
+
+        with MANIFEST_LOCK:
+            with open(self.manifest, 'a') as f:
+                f.write(json.dumps(record) + '\n')
+
+    def stored_path(self, key: str, suffix: str) -> str:
+
+        """
+        Get the path of a stored file.
+
+        Parameters:
+            - key (str): The cache key.
+            - suffix (str): The end of the output path after its root (e.g. '.png' or '_001.png').
+
+        Returns:
+            - str: The path of the stored file in the figures subdirectory.
+        """
+
+        return os.path.join(self.figures, key + suffix)
+
+    def restore(self, key: str, output_path: str) -> list:
+
+        """
+        Copy the stored files of a figure to its output path.
+
+        Parameters:
+            - key (str): The cache key.
+            - output_path (str): The output path of the plot.
+
+        Returns:
+            - list: The restored paths, or None if the figure is not cached.
+        """
+
+        entry = self.entries().get(key)
+
+        if entry is None or 'files' not in entry or not all(os.path.exists(self.stored_path(key, s)) for s in entry['files']):
+            self.misses += 1
+            return None
+
+        root = os.path.splitext(output_path)[0]
+
+        paths = []
+
+        for suffix in entry['files']:
+            path = root + suffix
+
+            # Write to a temporary file first, so readers never see a partial figure
+            copy_file_atomic(self.stored_path(key, suffix), path)
+
+            paths.append(path)
+
+        self.append({'key': key, 'used': time.time()})
+        self.hits += 1
+
+        return paths
+
+    def store(self, key: str, plot: str, output_path: str, paths: list) -> None:
+
+        """
+        Store the files of a rendered figure.
+
+        Parameters:
+            - key (str): The cache key.
+            - plot (str): The name of the plot function.
+            - output_path (str): The output path of the plot.
+            - paths (list): The written files, the output path or its numbered pages.
+        """
+
+        root = os.path.splitext(output_path)[0]
+
+        suffixes = []
+
+        for path in paths:
+            suffix = path[len(root):]
+
+            copy_file_atomic(path, self.stored_path(key, suffix))
+
+            suffixes.append(suffix)
+
+        now = time.time()
+
+        self.append({'key': key, 'plot': plot, 'files': suffixes,
+                     'size': sum(os.path.getsize(p) for p in paths), 'created': now, 'used': now})
+
+    def prune(self, max_age: float = None, max_bytes: int = None) -> int:
+
+        """
+        Remove the figures not used for max_age seconds, then the least recently used ones until
+        the cache fits in max_bytes, together with the stored files missing from the manifest.
+        The manifest is then rewritten with one record per kept figure.
+
+        Only the files of the figures subdirectory are removed, and a directory without a manifest
+        (not a figure cache) is refused.
+
+        Parameters:
+            - max_age (float, optional): The maximum time since the last use, in seconds. Defaults to None (no limit).
+            - max_bytes (int, optional): The maximum size of the stored figures. Defaults to None (no limit).
+
+        Returns:
+            - int: The number of removed figures.
+        """
+
+        if not os.path.exists(self.manifest):
+            raise ValueError('{} is not a figure cache: it has no {}.'.format(self.directory, MANIFEST_NAME))
+
+        # Keep the other threads from appending to the manifest while it is rewritten
+        with MANIFEST_LOCK:
+            entries, kept = self.rewrite_manifest(max_age, max_bytes)
+
+        files = {key + suffix for key, entry in kept.items() for suffix in entry['files']}
+
+        for name in os.listdir(self.figures):
+            # Leave the files being written by other threads and processes
+            if name not in files and not name.endswith('.tmp'):
+                os.remove(os.path.join(self.figures, name))
+
+        return len(entries) - len(kept)
+
+    def rewrite_manifest(self, max_age: float = None, max_bytes: int = None) -> (dict, dict):
+
+        """
+        Rewrite the manifest of prune, with one record per kept figure.
+
+        Parameters:
+            - max_age (float, optional): The maximum time since the last use, in seconds. Defaults to None (no limit).
+            - max_bytes (int, optional): The maximum size of the stored figures. Defaults to None (no limit).
+
+        Returns:
+            - dict: The manifest records before the rewrite, by key.
+            - dict: The kept records, by key.
+        """
+
+        entries = self.entries()
+        now     = time.time()
+
+        # Drop the incomplete and the expired figures
+        kept = {}
+
+        for key, entry in entries.items():
+            complete = 'files' in entry and all(os.path.exists(self.stored_path(key, s)) for s in entry['files'])
+
+            if complete and (max_age is None or now - entry['used'] <= max_age):
+                kept[key] = entry
+
+        # Drop the least recently used figures over the size limit
+        if max_bytes is not None:
+            total = sum(entry['size'] for entry in kept.values())
+
+            for key, entry in sorted(kept.items(), key=lambda item: item[1]['used']):
+                if total <= max_bytes:
+                    break
+
+                total -= entry['size']
+                del kept[key]
+
+        # Rewrite the manifest through a temporary file
+        tmp = temporary_path(self.manifest)
+
+        with open(tmp, 'w') as f:
+            for entry in kept.values():
+                f.write(json.dumps(entry) + '\n')
+
+        os.replace(tmp, self.manifest)
+
+        return entries, kept
+
+def open_figure_cache(cache) -> FigureCache:
+
+    """
+    Get the figure cache of a plot.
+
+    Parameters:
+        - cache (str or FigureCache): The cache directory, or the cache itself.
+
+    Returns:
+        - FigureCache: The figure cache, or None if cache is None.
+    """
+
+    if cache is None or isinstance(cache, FigureCache):
+        return cache
+
+    return FigureCache(cache)
+
+def main(argv: list = None) -> None:
+
+    """
+    Prune or list a figure cache from the command line:
+
+        python -m buscoplotpy.utils.figure_cache prune CACHE_DIR [--max-age-days N] [--max-mb N]
+        python -m buscoplotpy.utils.figure_cache list CACHE_DIR
+
+    Parameters:
+        - argv (list, optional): The command line arguments. Defaults to sys.argv[1:].
+    """
+
+    parser = argparse.ArgumentParser(prog='python -m buscoplotpy.utils.figure_cache', description='Manage a buscoplotpy figure cache.')
+    parser.add_argument('command', choices=['prune', 'list'])
+    parser.add_argument('directory', help='The figure cache directory.')
+    parser.add_argument('--max-age-days', type=float, default=None, help='Remove the figures not used for this many days.')
+    parser.add_argument('--max-mb', type=float, default=None, help='Remove the least recently used figures over this size.')
+
+    args = parser.parse_args(argv)
+
+    # Do not turn another directory into a figure cache
+    if not os.path.exists(os.path.join(args.directory, MANIFEST_NAME)):
+        parser.error('{} is not a figure cache: it has no {}'.format(args.directory, MANIFEST_NAME))
+
+    cache = FigureCache(args.directory)
+
+    if args.command == 'list':
+        for key, entry in cache.entries().items():
+            print('{}  {:<20} {:>10}  {}'.format(key, entry.get('plot', ''), entry.get('size', ''),
+                                                 time.strftime('%Y-%m-%d %H:%M', time.localtime(entry.get('used', 0)))))
+        return
+
+    removed = cache.prune(max_age=None if args.max_age_days is None else args.max_age_days * 86400,
+                          max_bytes=None if args.max_mb is None else int(args.max_mb * (1 << 20)))
+
+    print('Removed {} figures from {}'.format(removed, args.directory))
+
+if __name__ == '__main__':
+    main()
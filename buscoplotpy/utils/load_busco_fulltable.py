@@ -1,12 +1,94 @@
 # -*- coding: utf-8 -*-
 
 #Importing libraries
+import numpy as np
 import pandas as pd
 
+from ..utils.profiling import open_profiler
+from ..utils.table_cache import TableCache
+
+# The dtypes of the full table columns
+FULLTABLE_DTYPES = {
+    'status': 'category',
+    'sequence': 'category',
+    'gene_start': 'Int64',
+    'gene_end': 'Int64',
+    'strand': 'category',
+    'score': 'float32',
+    'length': 'float32',
+}
+
+def parse_busco_fulltable(path: str, descriptions: bool = True) -> pd.DataFrame:
+
+    """
+    Parse the full table generated by BUSCO, without the group, organism and genome version columns.
+    
+    Parameters:
+        path (str): The path to the full table.
+        descriptions (bool): Whether to keep the 'ortho_db_url' and 'description' columns.
+        
+    Returns:
+        pd.DataFrame: The parsed full table with busco gene information.
+    """
+
+    # Read the busco table from the file
+    busco_table = pd.read_csv(path, skiprows=2, sep='\t', dtype={'Sequence': str, 'Strand': str})
+
+    # Populate the columns of the full table with data from the busco table
+    full_table = pd.DataFrame({
+        'busco_id': busco_table['# Busco id'],
+        # Extract the sequence name from the 'sequence' column
+        'sequence': busco_table['Sequence'].str.split(':', n=1).str[0],
+        'status': busco_table['Status'],
+        'gene_start': busco_table['Gene Start'],
+        'gene_end': busco_table['Gene End'],
+        'strand': busco_table['Strand'],
+        'score': busco_table['Score'],
+        'length': busco_table['Length'],
+    }, columns=['busco_id', 'status', 'sequence', 'gene_start', 'gene_end', 'strand', 'score', 'length'])
+
+    # Set the explicit dtypes
+    full_table = full_table.astype(FULLTABLE_DTYPES)
+
+    if descriptions:
+        # Assign the 'OrthoDB url' and 'Description' columns to the full table, otherwise assign None
+        full_table['ortho_db_url'] = busco_table['OrthoDB url'] if 'OrthoDB url' in busco_table.columns else None
+        full_table['description'] = busco_table['Description'] if 'Description' in busco_table.columns else None
+
+    return full_table
+
+def load_busco_descriptions(path: str) -> pd.DataFrame:
+
+    """
+    Load only the OrthoDB url and the description of each BUSCO of a full table.
+    Use it to get the columns dropped by load_busco_fulltable(descriptions=False) when they are needed.
+    
+    Parameters:
+        path (str): The path to the full table.
+        
+    Returns:
+        pd.DataFrame: The 'ortho_db_url' and 'description' of each BUSCO, indexed by 'busco_id'.
+    """
+
+    # Read only the needed columns
+    busco_table = pd.read_csv(path, skiprows=2, sep='\t',
+                              usecols=lambda c: c in ['# Busco id', 'OrthoDB url', 'Description'])
+
+    descriptions = pd.DataFrame({
+        'busco_id': busco_table['# Busco id'],
+        'ortho_db_url': busco_table['OrthoDB url'] if 'OrthoDB url' in busco_table.columns else None,
+        'description': busco_table['Description'] if 'Description' in busco_table.columns else None,
+    })
+
+    return descriptions.drop_duplicates('busco_id').set_index('busco_id')
+
 def load_busco_fulltable(path: str, 
                          group: str='', 
                          organism: str='', 
-                         genome_version: str=''
+                         genome_version: str='',
+                         descriptions: bool=True,
+                         cache=None,
+                         profile=None
 ) -> pd.DataFrame:
 
     """
@@ -17,44 +99,51 @@ def load_busco_fulltable(path: str,
         organism (str): The name of the organism.
         genome_version (str): The version of the genome.
         path (str): The path to the full table.
+        descriptions (bool, optional): Whether to load the 'ortho_db_url' and 'description' columns.
+                                       They can be loaded later with load_busco_descriptions(). Defaults to True.
+        cache (TableCache or str, optional): A TableCache, or the directory of one, where the parsed
+                                             table is stored. Warm loads skip the parsing. Defaults to None.
+        profile (Profiler, callable or str, optional): Record the time and memory of the loading stages
+                                                       (see profiling.open_profiler). Defaults to None.
         
     Returns:
         pd.DataFrame: The loaded full table with busco gene information.
     """
-    
-    # Initialize the empty full table
-    full_table = pd.DataFrame()
 
-    # Read the busco table from the file
-    busco_table = pd.read_csv(path, skiprows=2, sep='\t')
+    if isinstance(cache, str):
+        cache = TableCache(cache)
 
-    # Populate the columns of the full table with data from the busco table
-    full_table['busco_id'] = busco_table['# Busco id']
-    full_table['status'] = busco_table['Status']
-    full_table['sequence'] = busco_table['Sequence']
-    full_table['gene_start'] = busco_table['Gene Start']
-    full_table['gene_end'] = busco_table['Gene End']
-    full_table['strand'] = busco_table['Strand']
-    full_table['score'] = busco_table['Score']
-    full_table['length'] = busco_table['Length']
-    full_table['group'] = group
-    full_table['organism'] = organism
-    full_table['genome_version'] = genome_version
-
-    # Try to assign the 'OrthoDB url' column to the full table, otherwise assign None
-    try:
-        full_table['ortho_db_url'] = busco_table['OrthoDB url']
-    except:
-        full_table['ortho_db_url'] = None
-    
-    # Try to assign the 'Description' column to the full table, otherwise assign None
-    try:
-        full_table['description'] = busco_table['Description']
-    except:
-        full_table['description'] = None
+    profiler = open_profiler(profile)
+
+    with profiler.function('load_busco_fulltable', path=str(path)) as total:
+
+        # Get the parsed table from the cache, or parse and cache it
+        namespace = 'load_busco_fulltable|descriptions={}'.format(descriptions)
+
+        with profiler.stage('cache_get') as stage:
+            full_table = cache.get(path, namespace) if cache is not None else None
+            stage['hit'] = full_table is not None
+
+        if full_table is None:
+            with profiler.stage('parse') as stage:
+                full_table = parse_busco_fulltable(path, descriptions=descriptions)
+                stage['rows'] = len(full_table)
+
+            if cache is not None:
+                with profiler.stage('cache_put'):
+                    cache.put(path, full_table, namespace)
+
+        # Add the organism information after the 'length' column
+        position = full_table.columns.get_loc('length') + 1
+
+        # The organism information is the same on every row, so it is stored as a single category
+        codes = np.zeros(len(full_table), dtype=np.int8)
+
+        full_table.insert(position, 'group', pd.Categorical.from_codes(codes, categories=[group]))
+        full_table.insert(position + 1, 'organism', pd.Categorical.from_codes(codes, categories=[organism]))
+        full_table.insert(position + 2, 'genome_version', pd.Categorical.from_codes(codes, categories=[genome_version]))
 
-    # Extract the sequence name from the 'sequence' column
-    full_table.loc[:, 'sequence'] = full_table['sequence'].map(lambda x: x.split(':')[0] if pd.notna(x) else None)
+        total['rows'] = len(full_table)
 
     # Return the loaded full table
-    return full_table
\ No newline at end of file
+    return full_table
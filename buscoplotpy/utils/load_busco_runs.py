@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+
+#Importing libraries
+import glob
+import os
+
+import pandas as pd
+
+from concurrent.futures import ProcessPoolExecutor
+from pandas.api.types import union_categoricals
+
+from ..utils.load_busco_fulltable import load_busco_fulltable
+from ..utils.load_json_summary import load_json_summary
+from ..utils.profiling import open_profiler
+from ..utils.run_layout import DEFAULT_LAYOUT, infer_run_metadata
+
+def load_run_file(kind: str, path: str, info: dict, descriptions: bool = True, cache=None, profile=None) -> pd.DataFrame:
+
+    """
+    Load a single BUSCO output file, tagged with its group, organism and genome version.
+
+    Parameters:
+        - kind (str): 'fulltable' or 'summary'.
+        - path (str): The path to the file.
+        - info (dict): The 'group', 'organism' and 'genome_version' of the file.
+        - descriptions (bool, optional): Whether to load the full table descriptions. Defaults to True.
+        - cache (str, optional): The full table cache directory. Defaults to None.
+        - profile (Profiler, callable or str, optional): Record the time and memory of the loading (see profiling.open_profiler). Defaults to None.
+
+    Returns:
+        - pd.DataFrame: The loaded table.
+    """
+
+    if kind == 'fulltable':
+        return load_busco_fulltable(path, group=info['group'], organism=info['organism'], genome_version=info['genome_version'],
+                                    descriptions=descriptions, cache=cache, profile=profile)
+
+    summary = load_json_summary(path, profile=profile)
+
+    # Tag the summary as organism_busco_barplot expects it
+    summary['group']    = info['group']
+    summary['organism'] = info['organism']
+    summary['version']  = info['genome_version']
+
+    return summary
+
+def concat_tables(tables: list) -> pd.DataFrame:
+
+    """
+    Concatenate the tables at once, keeping the categorical columns categorical.
+
+    Parameters:
+        - tables (list): The tables to concatenate, all with the same columns.
+
+    Returns:
+        - pd.DataFrame: The concatenated table.
+    """
+
+    if len(tables) == 0:
+        return pd.DataFrame()
+
+    # Union the categories first, otherwise pandas falls back to object columns
+    categoricals = {}
+
+    for column, dtype in tables[0].dtypes.items():
+        if isinstance(dtype, pd.CategoricalDtype) and all(isinstance(t[column].dtype, pd.CategoricalDtype) for t in tables):
+            categoricals[column] = union_categoricals([t[column] for t in tables])
+
+    table = pd.concat([t.drop(columns=list(categoricals)) for t in tables], axis=0, ignore_index=True)
+
+    for column, values in categoricals.items():
+        table[column] = pd.Series(values, index=table.index)
+
+    return table[tables[0].columns]
+
+def load_busco_runs(root: str,
+                    pattern: str = '**/full_table.tsv',
+                    summary_pattern: str = '**/short_summary*.json',
+                    workers: int = 1,
+                    layout: tuple = DEFAULT_LAYOUT,
+                    metadata: dict = None,
+                    descriptions: bool = True,
+                    cache: str = None,
+                    profile=None
+) -> (pd.DataFrame, pd.DataFrame):
+
+    """
+    Load all the BUSCO full tables and json summaries found below a directory.
+
+    Parameters:
+        - root (str): The root directory of the BUSCO runs.
+        - pattern (str, optional): The glob pattern of the full tables, relative to root. Defaults to '**/full_table.tsv'.
+        - summary_pattern (str, optional): The glob pattern of the json summaries, relative to root. Defaults to '**/short_summary*.json'.
+        - workers (int, optional): The number of worker processes. Defaults to 1 (no pool).
+        - layout (tuple, optional): The names of the leading directories below root. Defaults to ('group', 'organism', 'genome_version').
+        - metadata (dict, optional): Explicit group, organism and genome version per directory (see infer_run_metadata). Defaults to None.
+        - descriptions (bool, optional): Whether to load the full table descriptions. Defaults to True.
+        - cache (str, optional): The full table cache directory (see load_busco_fulltable). Defaults to None.
+        - profile (Profiler, callable or str, optional): Record the time and memory of the loading stages, and of each
+                                                         file without workers (see profiling.open_profiler). Defaults to None.
+
+    Returns:
+        - pd.DataFrame: All the full tables.
+        - pd.DataFrame: All the json summaries, with the 'group', 'organism' and 'version' columns.
+    """
+
+    profiler = open_profiler(profile)
+
+    with profiler.function('load_busco_runs', root=str(root), workers=workers) as total:
+
+        # Discover the BUSCO output files
+        with profiler.stage('discover') as stage:
+            jobs = []
+
+            for kind, file_pattern in [('fulltable', pattern), ('summary', summary_pattern)]:
+                for path in sorted(glob.glob(os.path.join(root, file_pattern), recursive=True)):
+                    jobs.append((kind, path, infer_run_metadata(path, root, layout, metadata), descriptions, cache))
+
+            stage['files'] = len(jobs)
+
+        # Parse the files, in a process pool if requested
+        with profiler.stage('load', files=len(jobs)):
+            if workers > 1 and len(jobs) > 1:
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    tables = list(executor.map(load_run_file, *zip(*jobs), chunksize=max(1, len(jobs) // (workers * 4))))
+            else:
+                tables = [load_run_file(*job, profile=profiler) for job in jobs]
+
+        # Concatenate each kind of table only once
+        with profiler.stage('concat') as stage:
+            fulltables = concat_tables([t for job, t in zip(jobs, tables) if job[0] == 'fulltable'])
+            summaries  = concat_tables([t for job, t in zip(jobs, tables) if job[0] == 'summary'])
+
+            stage['rows'] = len(fulltables) + len(summaries)
+
+        total['rows'] = len(fulltables) + len(summaries)
+
+    return fulltables, summaries
@@ -2,31 +2,38 @@
 
 import pandas as pd
 
-def load_metaeuk_coordinates(path: str) -> pd.DataFrame:
+from ..utils.profiling import open_profiler
+
+# The columns of a gff file
+GFF_COLUMN_NAMES = [
+    'sequence',
+    'source',
+    'type',
+    'start',
+    'end',
+    'score',
+    'strand',
+    'phase',
+    'attributes'
+]
+
+def load_metaeuk_coordinates(path: str, profile=None) -> pd.DataFrame:
 
     """
     Load the metaeuk gff coordinates file into a pandas DataFrame.
     
     Parameters:
         path (str): The path to the metaeuk coordinates file.
+        profile (Profiler, callable or str, optional): Record the time and memory of the loading
+                                                       (see profiling.open_profiler). Defaults to None.
         
     Returns:
         pd.DataFrame: The loaded metaeuk coordinates with all informations.
     """
-    
-    gff_column_names =[
-        'sequence',
-        'source',
-        'type',
-        'start',
-        'end',
-        'score',
-        'strand',
-        'phase',
-        'attributes'
-    ]
 
     # Read the metaeuk coordinates from the file
-    metaeuk_coordinates = pd.read_csv(path, sep='\t', header=None, names=gff_column_names)
+    with open_profiler(profile).function('load_metaeuk_coordinates', path=str(path)) as total:
+        metaeuk_coordinates = pd.read_csv(path, sep='\t', header=None, names=GFF_COLUMN_NAMES)
+        total['rows'] = len(metaeuk_coordinates)
 
-    return metaeuk_coordinates
\ No newline at end of file
+    return metaeuk_coordinates
@@ -0,0 +1,341 @@
+# -*- coding: utf-8 -*-
+
+#Importing libraries
+import io
+import mmap
+import os
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+from ..utils.load_metaeuk_coordinates import GFF_COLUMN_NAMES
+
+# Bump this when the layout of the index changes
+INDEX_FORMAT_VERSION = 1
+
+class MetaeukIndex:
+
+    def __init__(self, sequences: np.ndarray, types: np.ndarray, block_sequence: np.ndarray,
+                 block_offset: np.ndarray, block_length: np.ndarray, counts: np.ndarray,
+                 source_size: int, source_mtime_ns: int):
+
+        """
+        Initialize the MetaeukIndex class, the byte offsets of the sequences of a gff file.
+
+        A block is a run of consecutive lines on the same sequence. MetaEuk writes the gene, mRNA, exon
+        and CDS lines of a sequence interleaved, so the blocks are per sequence and the feature counts
+        are kept per (sequence, type).
+
+        Parameters:
+            - sequences (np.ndarray): The sequence names.
+            - types (np.ndarray): The feature type names.
+            - block_sequence (np.ndarray): The index in sequences of the sequence of each block.
+            - block_offset (np.ndarray): The byte offset of each block.
+            - block_length (np.ndarray): The byte length of each block.
+            - counts (np.ndarray): The (sequences, types) matrix of the feature counts.
+            - source_size (int): The size of the indexed file.
+            - source_mtime_ns (int): The modification time of the indexed file.
+        """
+
+        # Names
+        self.sequences = np.asarray(sequences, dtype=str)
+        self.types     = np.asarray(types, dtype=str)
+
+        # Blocks
+        self.block_sequence = np.asarray(block_sequence, dtype=np.int64)
+        self.block_offset   = np.asarray(block_offset, dtype=np.int64)
+        self.block_length   = np.asarray(block_length, dtype=np.int64)
+
+        # Feature counts
+        self.counts = np.asarray(counts, dtype=np.int64)
+
+        # Source file
+        self.source_size     = int(source_size)
+        self.source_mtime_ns = int(source_mtime_ns)
+
+    def __str__(self):
+
+        return 'MetaeukIndex({} sequences, {} types, {} blocks)'.format(len(self.sequences), len(self.types), len(self.block_offset))
+
+    def is_current(self, path: str) -> bool:
+
+        """
+        Check that the index still matches the gff file.
+
+        Parameters:
+            - path (str): The path to the gff file.
+
+        Returns:
+            - bool: Whether the file has the indexed size and modification time.
+        """
+
+        stat = os.stat(path)
+
+        return stat.st_size == self.source_size and stat.st_mtime_ns == self.source_mtime_ns
+
+    def count(self, sequence: str, target: str) -> int:
+
+        """
+        Get the number of features of a type on a sequence.
+
+        Parameters:
+            - sequence (str): The sequence name.
+            - target (str): The feature type.
+
+        Returns:
+            - int: The number of features.
+        """
+
+        s = np.flatnonzero(self.sequences == sequence)
+        t = np.flatnonzero(self.types == target)
+
+        if len(s) == 0 or len(t) == 0:
+            return 0
+
+        return int(self.counts[s[0], t[0]])
+
+    def byte_ranges(self, sequences: list = None) -> list:
+
+        """
+        Get the byte ranges holding the given sequences, with adjacent blocks merged.
+
+        Parameters:
+            - sequences (list, optional): The sequence names. Defaults to all the sequences.
+
+        Returns:
+            - list: The (offset, length) tuples, in file order.
+        """
+
+        if sequences is None:
+            selected = np.ones(len(self.block_offset), dtype=bool)
+        else:
+            codes    = np.flatnonzero(np.isin(self.sequences, list(sequences)))
+            selected = np.isin(self.block_sequence, codes)
+
+        ranges = []
+
+        for offset, length in zip(self.block_offset[selected], self.block_length[selected]):
+            if ranges and ranges[-1][0] + ranges[-1][1] == offset:
+                ranges[-1] = (ranges[-1][0], ranges[-1][1] + length)
+            else:
+                ranges.append((int(offset), int(length)))
+
+        return ranges
+
+    def save(self, path: str) -> None:
+
+        """
+        Save the index as a .npz file.
+
+        Parameters:
+            - path (str): The path to the index file.
+        """
+
+        with open(path, 'wb') as f:
+            np.savez(f,
+                     version=INDEX_FORMAT_VERSION,
+                     sequences=self.sequences,
+                     types=self.types,
+                     block_sequence=self.block_sequence,
+                     block_offset=self.block_offset,
+                     block_length=self.block_length,
+                     counts=self.counts,
+                     source=np.array([self.source_size, self.source_mtime_ns], dtype=np.int64)
+            )
+
+    @classmethod
+    def load(cls, path: str):
+
+        """
+        Load an index saved with MetaeukIndex.save.
+
+        Parameters:
+            - path (str): The path to the index file.
+
+        Returns:
+            - MetaeukIndex: The index, or None if it was written by another index format version.
+        """
+
+        with np.load(path, allow_pickle=False) as data:
+
+            if int(data['version']) != INDEX_FORMAT_VERSION:
+                return None
+
+            return cls(sequences=data['sequences'],
+                       types=data['types'],
+                       block_sequence=data['block_sequence'],
+                       block_offset=data['block_offset'],
+                       block_length=data['block_length'],
+                       counts=data['counts'],
+                       source_size=data['source'][0],
+                       source_mtime_ns=data['source'][1]
+                   )
+
+def default_index_path(path: str) -> str:
+
+    """
+    Get the default index path of a gff file.
+
+    Parameters:
+        - path (str): The path to the gff file.
+
+    Returns:
+        - str: The path to the index file, next to the gff file.
+    """
+
+    return path + '.idx.npz'
+
+def build_metaeuk_index(path: str, index_path: str = None) -> MetaeukIndex:
+
+    """
+    Scan a metaeuk gff file once and record the byte offsets of the blocks of each sequence.
+
+    Parameters:
+        - path (str): The path to the metaeuk gff file (not compressed).
+        - index_path (str, optional): Where to save the index. Defaults to the gff path + '.idx.npz'.
+                                      Pass '' to skip saving.
+
+    Returns:
+        - MetaeukIndex: The index of the file.
+    """
+
+    stat = os.stat(path)
+
+    sequences, types = {}, {}
+    counts = {}
+
+    block_sequence, block_offset, block_length = [], [], []
+
+    offset = 0
+
+    with open(path, 'rb') as f:
+        for line in f:
+
+            # Split the sequence and the type of the feature
+            fields = line.split(b'\t', 3)
+
+            if not line.startswith(b'#') and len(fields) > 3:
+                s = sequences.setdefault(fields[0], len(sequences))
+                t = types.setdefault(fields[2], len(types))
+
+                counts[(s, t)] = counts.get((s, t), 0) + 1
+
+                # Extend the current block, or start a new one
+                if block_sequence and block_sequence[-1] == s and block_offset[-1] + block_length[-1] == offset:
+                    block_length[-1] += len(line)
+                else:
+                    block_sequence.append(s)
+                    block_offset.append(offset)
+                    block_length.append(len(line))
+
+            offset += len(line)
+
+    # Store the feature counts as a matrix
+    count_matrix = np.zeros((len(sequences), len(types)), dtype=np.int64)
+
+    for (s, t), n in counts.items():
+        count_matrix[s, t] = n
+
+    index = MetaeukIndex(sequences=[s.decode() for s in sequences],
+                         types=[t.decode() for t in types],
+                         block_sequence=block_sequence,
+                         block_offset=block_offset,
+                         block_length=block_length,
+                         counts=count_matrix,
+                         source_size=stat.st_size,
+                         source_mtime_ns=stat.st_mtime_ns
+            )
+
+    if index_path is None:
+        index_path = default_index_path(path)
+
+    if index_path:
+        index.save(index_path)
+
+    return index
+
+def get_metaeuk_index(path: str, index_path: str = None) -> MetaeukIndex:
+
+    """
+    Load the index of a metaeuk gff file, building it when it is missing or stale.
+    When the index cannot be saved (e.g. next to a gff of a read-only directory), the built index is only kept in memory.
+
+    Parameters:
+        - path (str): The path to the metaeuk gff file.
+        - index_path (str, optional): The path to the index file. Defaults to the gff path + '.idx.npz'.
+
+    Returns:
+        - MetaeukIndex: The index of the file.
+    """
+
+    if index_path is None:
+        index_path = default_index_path(path)
+
+    if os.path.exists(index_path):
+        # An unreadable index (e.g. partly written) is rebuilt as a stale one
+        try:
+            index = MetaeukIndex.load(index_path)
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+            index = None
+
+        if index is not None and index.is_current(path):
+            return index
+
+    index = build_metaeuk_index(path, index_path='')
+
+    # Save the index for the next reads, unless its directory is not writable
+    try:
+        index.save(index_path)
+    except OSError:
+        pass
+
+    return index
+
+def read_metaeuk_coordinates(path: str,
+                             sequences: list = None,
+                             types: list = None,
+                             index: MetaeukIndex = None,
+                             columns: list = ['sequence', 'type', 'start', 'end', 'strand']
+) -> pd.DataFrame:
+
+    """
+    Read only the given sequences and feature types of a metaeuk gff file, through its index.
+    Only the bytes of the requested sequences are read, from a memory map of the file.
+
+    Parameters:
+        - path (str): The path to the metaeuk gff file (not compressed).
+        - sequences (list, optional): The sequences to read. Defaults to all the sequences.
+        - types (list, optional): The feature types to keep. Defaults to all the types.
+        - index (MetaeukIndex, optional): The index of the file. Defaults to the one of get_metaeuk_index.
+        - columns (list, optional): The gff columns to load. Defaults to ['sequence', 'type', 'start', 'end', 'strand'].
+
+    Returns:
+        - pd.DataFrame: The coordinates, with int64 'start' and 'end' and categorical names.
+    """
+
+    if index is None:
+        index = get_metaeuk_index(path)
+
+    ranges = index.byte_ranges(sequences)
+
+    dtypes = {'sequence': 'category', 'source': 'category', 'type': 'category', 'start': np.int64, 'end': np.int64,
+              'score': str, 'strand': 'category', 'phase': 'category', 'attributes': str}
+
+    usecols = list(dict.fromkeys(list(columns) + ['type']))
+
+    if not ranges:
+        return pd.DataFrame({c: pd.Series(dtype=dtypes[c]) for c in columns})
+
+    # Read only the bytes of the requested sequences
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        data = b''.join(mm[offset:offset + length] for offset, length in ranges)
+
+    coordinates = pd.read_csv(io.BytesIO(data), sep='\t', header=None, names=GFF_COLUMN_NAMES,
+                              usecols=usecols, dtype={c: dtypes[c] for c in usecols})
+
+    # Keep the requested feature types
+    if types is not None:
+        coordinates = coordinates[coordinates['type'].isin(types)].reset_index(drop=True)
+
+    return coordinates[list(columns)]
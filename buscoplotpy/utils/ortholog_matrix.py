@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+# This class holds the positions of the BUSCOs shared by many genomes.
+
+#Importing libraries
+import numpy as np
+import pandas as pd
+
+class OrthologMatrix:
+
+    def __init__(self, fulltables: list):
+
+        """
+        Initialize the OrthologMatrix class, a BUSCO id x genome matrix of the Complete BUSCO positions.
+
+        The BUSCO ids of all the full tables are hashed once into a single index, and each genome gets a
+        column of integer sequence codes (-1 where the BUSCO is not Complete) and a column of gene starts.
+        The links between any two genomes are then slices of the matrix, without merging the full tables.
+
+        Parameters:
+            - fulltables (list): The full table of each genome, as loaded by load_busco_fulltable.
+        """
+
+        # Keep the Complete BUSCOs of each genome
+        tables = [ft.loc[ft['status'] == 'Complete', ['busco_id', 'sequence', 'gene_start']].drop_duplicates('busco_id') for ft in fulltables]
+
+        # Hash the BUSCO ids of all the genomes into one index
+        self.busco_ids = pd.Index(pd.unique(np.concatenate([t['busco_id'].to_numpy(dtype=object) for t in tables])))
+
+        n_genomes = len(tables)
+
+        # Sequence codes (-1 for absent BUSCOs) and gene starts, one column per genome
+        self.sequence_codes = np.full((len(self.busco_ids), n_genomes), -1, dtype=np.int32)
+        self.positions      = np.zeros((len(self.busco_ids), n_genomes), dtype=np.int64)
+
+        # The sequence names of each genome, indexed by code
+        self.sequences = []
+
+        for g, t in enumerate(tables):
+            rows = self.busco_ids.get_indexer(t['busco_id'])
+
+            codes, names = pd.factorize(t['sequence'])
+
+            self.sequence_codes[rows, g] = codes
+            self.positions[rows, g]      = t['gene_start'].to_numpy(dtype=np.int64)
+
+            self.sequences.append(pd.Index(names))
+
+    def __len__(self):
+
+        return len(self.busco_ids)
+
+    def __str__(self):
+
+        return 'OrthologMatrix({} BUSCOs, {} genomes)'.format(len(self), len(self.sequences))
+
+    def pair(self, i: int, j: int, sequences_i=None, sequences_j=None) -> pd.DataFrame:
+
+        """
+        Get the BUSCOs shared by two genomes.
+
+        Parameters:
+            - i (int): The index of the first genome.
+            - j (int): The index of the second genome.
+            - sequences_i (iterable, optional): The sequences of the first genome to keep. Defaults to all of them.
+            - sequences_j (iterable, optional): The sequences of the second genome to keep. Defaults to all of them.
+
+        Returns:
+            - pd.DataFrame: One row per shared BUSCO, with its 'busco_id' and the 'sequence' (categorical) and
+                            'gene_start' in the first genome (suffix '_x') and in the second one (suffix '_y').
+        """
+
+        codes_i, codes_j = self.sequence_codes[:, i], self.sequence_codes[:, j]
+
+        # Keep the BUSCOs present in both genomes, on the requested sequences
+        shared = (codes_i >= 0) & (codes_j >= 0)
+
+        for codes, g, sequences in [(codes_i, i, sequences_i), (codes_j, j, sequences_j)]:
+            if sequences is not None:
+                # The appended False is looked up by the absent BUSCOs (code -1)
+                kept = np.append(self.sequences[g].isin(list(sequences)), False)
+                shared &= kept[codes]
+
+        rows = np.flatnonzero(shared)
+
+        return pd.DataFrame({'busco_id': self.busco_ids[rows],
+                             'sequence_x': pd.Categorical.from_codes(codes_i[rows], categories=self.sequences[i]),
+                             'gene_start_x': self.positions[rows, i],
+                             'sequence_y': pd.Categorical.from_codes(codes_j[rows], categories=self.sequences[j]),
+                             'gene_start_y': self.positions[rows, j]})
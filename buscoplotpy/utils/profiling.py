@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+
+#Importing libraries
+import json
+import os
+import sys
+import threading
+import time
+
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+def memory_usage() -> (int, int):
+
+    """
+    Get the resident memory of this process.
+
+    Returns:
+        - int: The current resident set size in bytes, or None where it is not available.
+        - int: The peak resident set size in bytes, or None where it is not available.
+    """
+
+    rss, peak = None, None
+
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    rss = int(line.split()[1]) * 1024
+                elif line.startswith('VmHWM:'):
+                    peak = int(line.split()[1]) * 1024
+    except OSError:
+        pass
+
+    if peak is None and resource is not None:
+        # Linux reports kilobytes, macOS bytes
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+
+    return rss, peak
+
+def figure_counts(fig) -> dict:
+
+    """
+    Count the artists of a figure and the vertices of their paths.
+
+    Parameters:
+        - fig (Figure): The figure.
+
+    Returns:
+        - dict: The number of 'artists' and of path 'vertices'.
+    """
+
+    artists, vertices = 0, 0
+
+    for artist in fig.findobj():
+        artists += 1
+
+        if hasattr(artist, 'get_paths'):
+            vertices += sum(len(path.vertices) for path in artist.get_paths())
+        elif hasattr(artist, 'get_path'):
+            vertices += len(artist.get_path().vertices)
+
+    return {'artists': artists, 'vertices': vertices}
+
+class Profiler:
+
+    def __init__(self, sink=None, callback=None):
+
+        """
+        Initialize the Profiler class, which records the stages of the plot and loader functions.
+
+        Each stage emits a record with the 'function', the 'stage' name, its wall clock 'seconds', the change of
+        the resident memory ('rss_delta') and of its peak ('peak_rss_delta'), and the counts set by the stage
+        (e.g. 'rows', 'artists', 'vertices'). The records are kept in the records list, passed to the callback
+        and appended to the JSON-lines sink. A profiler can be shared by threads (plot batches, render server):
+        each thread has its own stack of profiled functions, and the records are emitted one at a time.
+
+        Parameters:
+            - sink (str or file, optional): A JSON-lines file path, or an open text file. Defaults to None.
+            - callback (callable, optional): A function called with each record. Defaults to None.
+        """
+
+        self.sink     = sink
+        self.callback = callback
+        self.records  = []
+
+        # The functions being profiled by each thread, innermost last
+        self.local = threading.local()
+
+        # Serialize the records of the threads
+        self.lock = threading.Lock()
+
+    def __str__(self):
+
+        return 'Profiler({} records)'.format(len(self.records))
+
+    @property
+    def functions(self) -> list:
+
+        """
+        Get the functions being profiled by the calling thread.
+
+        Returns:
+            - list: The function names, innermost last.
+        """
+
+        if not hasattr(self.local, 'functions'):
+            self.local.functions = []
+
+        return self.local.functions
+
+    def emit(self, record: dict) -> None:
+
+        """
+        Keep a record and send it to the callback and to the sink.
+
+        Parameters:
+            - record (dict): The stage record.
+        """
+
+        with self.lock:
+            self.records.append(record)
+
+            if self.callback is not None:
+                self.callback(record)
+
+            if self.sink is None:
+                return
+
+            line = json.dumps(record, default=str) + '\n'
+
+            if isinstance(self.sink, (str, os.PathLike)):
+                with open(self.sink, 'a') as f:
+                    f.write(line)
+            else:
+                self.sink.write(line)
+
+    @contextmanager
+    def function(self, name: str, **counts):
+
+        """
+        Profile a whole plot or loader call. Its stages are recorded with its name.
+
+        Parameters:
+            - name (str): The function name.
+            - counts: The counts known at the start of the call.
+
+        Yields:
+            - dict: The counts of the call, to be completed by the caller.
+        """
+
+        self.functions.append(name)
+
+        try:
+            with self.stage('total', **counts) as record:
+                yield record
+        finally:
+            self.functions.pop()
+
+    @contextmanager
+    def stage(self, name: str, **counts):
+
+        """
+        Profile a stage of the current function.
+
+        Parameters:
+            - name (str): The stage name (e.g. 'read', 'draw', 'savefig').
+            - counts: The counts known at the start of the stage.
+
+        Yields:
+            - dict: The counts of the stage, to be completed by the caller.
+        """
+
+        record = dict(counts)
+
+        rss, peak = memory_usage()
+        start     = time.perf_counter()
+
+        try:
+            yield record
+        finally:
+            seconds = time.perf_counter() - start
+            end_rss, end_peak = memory_usage()
+
+            self.emit(dict({'function': self.functions[-1] if self.functions else None, 'stage': name,
+                            'seconds': seconds,
+                            'rss_delta': None if rss is None or end_rss is None else end_rss - rss,
+                            'peak_rss_delta': None if peak is None or end_peak is None else end_peak - peak},
+                           **record))
+
+    def count_figure(self, record: dict, fig) -> None:
+
+        """
+        Add the artist and vertex counts of a figure to a record.
+
+        Parameters:
+            - record (dict): The stage record.
+            - fig (Figure): The drawn figure.
+        """
+
+        record.update(figure_counts(fig))
+
+    def summary(self) -> dict:
+
+        """
+        Sum the recorded seconds of each function stage.
+
+        Returns:
+            - dict: The total seconds by (function, stage).
+        """
+
+        totals = {}
+
+        for record in self.records:
+            key = (record['function'], record['stage'])
+            totals[key] = totals.get(key, 0) + record['seconds']
+
+        return totals
+
+class NullProfiler(Profiler):
+
+    """
+    The profiler of the calls without profile: the stages cost a dictionary and nothing is recorded.
+    """
+
+    @contextmanager
+    def function(self, name: str, **counts):
+
+        yield {}
+
+    @contextmanager
+    def stage(self, name: str, **counts):
+
+        yield {}
+
+    def count_figure(self, record: dict, fig) -> None:
+
+        pass
+
+# The shared profiler of the calls without profile
+NULL_PROFILER = NullProfiler()
+
+def open_profiler(profile) -> Profiler:
+
+    """
+    Get the profiler of a plot or loader call.
+
+    Parameters:
+        - profile (Profiler, callable, str or None): A Profiler, a function called with each stage record,
+                                                    or the path of a JSON-lines file the records are appended to.
+
+    Returns:
+        - Profiler: The profiler, or NULL_PROFILER if profile is None.
+    """
+
+    if profile is None:
+        return NULL_PROFILER
+
+    if isinstance(profile, Profiler):
+        return profile
+
+    if callable(profile):
+        return Profiler(callback=profile)
+
+    return Profiler(sink=profile)
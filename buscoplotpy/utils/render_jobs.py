@@ -0,0 +1,391 @@
+# -*- coding: utf-8 -*-
+
+#Importing libraries
+import json
+import os
+import time
+import traceback
+
+import numpy as np
+import pandas as pd
+
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+from ..graphics.chromoplot import chromoplot
+from ..graphics.karyoplot import karyoplot
+from ..graphics.organism_busco_barplot import organism_busco_barplot
+from ..graphics.synteny import horizontal_synteny_plot, vertical_synteny_plot
+from ..utils.figure_cache import FigureCache
+from ..utils.load_busco_runs import concat_tables, load_run_file
+from ..utils.load_metaeuk_coordinates import load_metaeuk_coordinates
+
+# The plot of each job type: the plot function, its output path argument and the input kind of its table arguments
+PLOTS = {
+    'karyoplot': (karyoplot, 'output_file', {'karyotype': 'karyotype', 'fulltable': 'fulltable'}),
+    'chromoplot': (chromoplot, 'output_path', {'karyotype': 'karyotype', 'genes_dataframe': 'gff'}),
+    'vertical_synteny': (vertical_synteny_plot, 'output_path', {'ft_1': 'fulltable', 'ft_2': 'fulltable',
+                                                                'karyotype_1': 'karyotype', 'karyotype_2': 'karyotype'}),
+    'horizontal_synteny': (horizontal_synteny_plot, 'output_path', {'ft_1': 'fulltable', 'ft_2': 'fulltable',
+                                                                    'karyotype_1': 'karyotype', 'karyotype_2': 'karyotype'}),
+    'barplot': (organism_busco_barplot, None, {'df': 'summary'}),
+}
+
+# The metadata that can be given with each input kind
+INPUT_METADATA = {
+    'karyotype': ('organism', 'color'),
+    'fulltable': ('group', 'organism', 'genome_version'),
+    'summary': ('group', 'organism', 'genome_version'),
+    'gff': (),
+}
+
+# The loaded tables of the running batch, shared by all the jobs of a process
+SHARED_INPUTS = {}
+
+def load_job_spec(path: str) -> dict:
+
+    """
+    Load a batch job specification from a JSON or YAML file.
+
+    A specification lists the plots to make:
+
+        workers: 4                      # optional, the number of worker processes
+        cache: /tmp/busco_cache         # optional, the full table cache directory
+        figure_cache: plots/.cache      # optional, skip the figures whose inputs did not change
+        output_dir: plots               # optional, the directory of the relative outputs
+        report: plots/report.json       # optional, where to write the batch report
+        jobs:
+          - name: bathycoccus karyoplot # optional
+            plot: karyoplot             # karyoplot, chromoplot, vertical_synteny, horizontal_synteny or barplot
+            output: bathycoccus.png
+            inputs:
+              karyotype: {path: karyotype.tsv, organism: Bathycoccus prasinos}
+              fulltable: full_table.tsv
+            options: {dpi: 200, chrs_limit: 500}
+
+    An input is a path or a dictionary with the 'path' and the metadata of the file (see INPUT_METADATA).
+    The 'df' input of a barplot is a list of json summaries, and a barplot is written to its 'out_path'
+    and 'filename' options instead of the job output.
+
+    Parameters:
+        - path (str): The path to the .json, .yaml or .yml file.
+
+    Returns:
+        - dict: The job specification.
+    """
+
+    with open(path) as f:
+        if os.path.splitext(path)[1].lower() in ['.yaml', '.yml']:
+            if yaml is None:
+                raise ImportError('Reading YAML job specifications requires PyYAML (pip install pyyaml).')
+
+            return yaml.safe_load(f)
+
+        return json.load(f)
+
+def input_metadata(kind: str, spec) -> dict:
+
+    """
+    Get the metadata of an input of a job.
+
+    Parameters:
+        - kind (str): The input kind ('karyotype', 'fulltable', 'summary' or 'gff').
+        - spec (str or dict): The path of the file, or a dictionary with its 'path' and metadata.
+
+    Returns:
+        - dict: The metadata of the input, as strings.
+    """
+
+    if isinstance(spec, str):
+        return {}
+
+    unknown = set(spec) - {'path'} - set(INPUT_METADATA[kind])
+
+    if unknown:
+        raise ValueError('Unknown {} input metadata: {}'.format(kind, ', '.join(sorted(unknown))))
+
+    return {key: str(value) for key, value in spec.items() if key != 'path'}
+
+def input_key(kind: str, spec) -> tuple:
+
+    """
+    Get the key of an input file, the same for every job that uses it whatever its metadata.
+
+    Parameters:
+        - kind (str): The input kind ('karyotype', 'fulltable', 'summary' or 'gff').
+        - spec (str or dict): The path of the file, or a dictionary with its 'path' and metadata.
+
+    Returns:
+        - tuple: The kind and the absolute path of the file.
+    """
+
+    # Check the metadata now, so that a wrong job fails before the inputs are loaded
+    input_metadata(kind, spec)
+
+    path = spec if isinstance(spec, str) else spec['path']
+
+    return (kind, os.path.abspath(path))
+
+def load_input(key: tuple, cache: str = None) -> pd.DataFrame:
+
+    """
+    Load an input file of the batch, without the metadata of the jobs (see tag_input).
+
+    Parameters:
+        - key (tuple): The key of the input (see input_key).
+        - cache (str, optional): The full table cache directory. Defaults to None.
+
+    Returns:
+        - pd.DataFrame: The loaded table.
+    """
+
+    kind, path = key
+
+    if kind == 'karyotype':
+        return pd.read_csv(path, sep='\t')
+
+    if kind == 'gff':
+        return load_metaeuk_coordinates(path)
+
+    return load_run_file(kind, path, {'group': '', 'organism': '', 'genome_version': ''}, cache=cache)
+
+def tag_input(kind: str, table: pd.DataFrame, metadata: dict) -> pd.DataFrame:
+
+    """
+    Add the metadata of a job to a loaded input, on a shallow copy so that the shared table is unchanged.
+
+    Parameters:
+        - kind (str): The input kind.
+        - table (pd.DataFrame): The loaded table (see load_input).
+        - metadata (dict): The metadata of the input in the job (see input_metadata).
+
+    Returns:
+        - pd.DataFrame: The shallow copy of the table, with the metadata columns.
+    """
+
+    # A shallow copy, some plots also rename their columns
+    table = table.copy(deep=False)
+
+    for column, value in metadata.items():
+        if kind == 'fulltable':
+            # The same value on every row, stored as a single category as load_busco_fulltable does
+            table[column] = pd.Categorical.from_codes(np.zeros(len(table), dtype=np.int8), categories=[value])
+        elif kind == 'summary':
+            # The genome version of a summary is its 'version', as organism_busco_barplot expects it
+            table['version' if column == 'genome_version' else column] = value
+        else:
+            # Add the columns the plots read from the karyotype
+            table[column] = value
+
+    return table
+
+def job_input_keys(keys: dict) -> list:
+
+    """
+    List the input keys of a job.
+
+    Parameters:
+        - keys (dict): The input key (or the list of input keys) of each table argument.
+
+    Returns:
+        - list: All the input keys.
+    """
+
+    return [k for key in keys.values() for k in (key if isinstance(key, list) else [key])]
+
+def set_shared_inputs(inputs: dict) -> None:
+
+    """
+    Set the loaded tables of the running batch. This is the initializer of the worker processes.
+
+    Parameters:
+        - inputs (dict): The loaded tables, by input key.
+    """
+
+    SHARED_INPUTS.clear()
+    SHARED_INPUTS.update(inputs)
+
+def run_render_job(job: dict, keys: dict, output: str, figure_cache: str = None, inputs: dict = None) -> dict:
+
+    """
+    Run a single plot job on the shared tables.
+
+    Parameters:
+        - job (dict): The job specification.
+        - keys (dict): The input key (or the list of input keys) of each table argument.
+        - output (str): The output path of the plot.
+        - figure_cache (str, optional): The figure cache directory (see figure_cache). Defaults to None.
+        - inputs (dict, optional): The loaded tables, by input key. Defaults to the shared inputs of the process.
+
+    Returns:
+        - dict: The 'status' ('ok', 'cached' or 'failed'), the rendering 'seconds' and the 'error' of the job.
+    """
+
+    start = time.perf_counter()
+
+    if inputs is None:
+        inputs = SHARED_INPUTS
+
+    try:
+        plot, output_argument, _ = PLOTS[job['plot']]
+
+        arguments = dict(job.get('options', {}))
+
+        # Take the tables from the shared inputs, tagged with the metadata of this job
+        for argument, key in keys.items():
+            spec_input = job['inputs'][argument]
+
+            if isinstance(key, list):
+                arguments[argument] = concat_tables([tag_input(k[0], inputs[k], input_metadata(k[0], s)) for k, s in zip(key, spec_input)])
+            else:
+                arguments[argument] = tag_input(key[0], inputs[key], input_metadata(key[0], spec_input))
+
+        if output_argument is not None and output:
+            os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+            arguments[output_argument] = output
+
+        # Let the plot reuse its cached figure
+        cache = None
+
+        if figure_cache:
+            cache = arguments['cache'] = FigureCache(figure_cache)
+
+        plot(**arguments)
+
+        status = 'cached' if cache is not None and cache.hits > 0 else 'ok'
+
+        return {'status': status, 'seconds': time.perf_counter() - start, 'error': None}
+
+    except Exception:
+        return {'status': 'failed', 'seconds': time.perf_counter() - start, 'error': traceback.format_exc()}
+
+def run_render_jobs(spec, workers: int = None, loader=None) -> dict:
+
+    """
+    Run a batch of plot jobs.
+
+    Every distinct input file is loaded exactly once, in the main process, and the loaded tables are
+    shared by all the jobs that use them. The jobs then run in a process pool: each worker receives
+    the tables once, when it starts. A failing input or job is reported and the batch goes on.
+
+    Parameters:
+        - spec (dict or str): The job specification, or the path to its JSON/YAML file (see load_job_spec).
+        - workers (int, optional): The number of worker processes. Defaults to the 'workers' of the
+                                   specification, or 1 (no pool).
+        - loader (callable, optional): The function that loads an input from its key and the full table
+                                       cache directory. Defaults to load_input.
+
+    Returns:
+        - dict: The batch report, with the 'inputs' (kind, path, status, seconds, error) and the
+                'jobs' (name, plot, output, status, seconds, error), in the order of the specification.
+    """
+
+    if isinstance(spec, (str, os.PathLike)):
+        spec = load_job_spec(spec)
+
+    if workers is None:
+        workers = spec.get('workers', 1)
+
+    if loader is None:
+        loader = load_input
+
+    jobs       = spec.get('jobs', [])
+    output_dir = spec.get('output_dir', '')
+
+    # Resolve the inputs of every job
+    job_keys, job_errors = [], []
+
+    for job in jobs:
+        keys, error = {}, None
+
+        try:
+            if job.get('plot') not in PLOTS:
+                raise ValueError('Unknown plot: {}'.format(job.get('plot')))
+
+            kinds = PLOTS[job['plot']][2]
+
+            for argument, spec_input in job.get('inputs', {}).items():
+                if argument not in kinds:
+                    raise ValueError('Unknown {} input: {}'.format(job['plot'], argument))
+
+                if isinstance(spec_input, list):
+                    keys[argument] = [input_key(kinds[argument], s) for s in spec_input]
+                else:
+                    keys[argument] = input_key(kinds[argument], spec_input)
+
+        except Exception:
+            error = traceback.format_exc()
+
+        job_keys.append(keys)
+        job_errors.append(error)
+
+    # Load each distinct input once
+    inputs, input_reports = {}, {}
+
+    for keys in job_keys:
+        for key in job_input_keys(keys):
+            if key in input_reports:
+                continue
+
+            start = time.perf_counter()
+
+            try:
+                inputs[key] = loader(key, cache=spec.get('cache'))
+                input_reports[key] = {'status': 'ok', 'seconds': time.perf_counter() - start, 'error': None}
+            except Exception:
+                input_reports[key] = {'status': 'failed', 'seconds': time.perf_counter() - start, 'error': traceback.format_exc()}
+
+    # Skip the jobs whose inputs could not be loaded
+    runnable = []
+
+    for index, keys in enumerate(job_keys):
+        missing = [key for key in job_input_keys(keys) if key not in inputs]
+
+        if job_errors[index] is None and missing:
+            job_errors[index] = 'Input not loaded: {}'.format(', '.join(k[1] for k in missing))
+
+        if job_errors[index] is None:
+            runnable.append(index)
+
+    outputs = [os.path.join(output_dir, job['output']) if job.get('output') else '' for job in jobs]
+
+    # Run the jobs, in a process pool if requested
+    results = {}
+
+    if workers > 1 and len(runnable) > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=set_shared_inputs, initargs=(inputs,)) as executor:
+            futures = {i: executor.submit(run_render_job, jobs[i], job_keys[i], outputs[i], spec.get('figure_cache')) for i in runnable}
+
+            for i, future in futures.items():
+                try:
+                    results[i] = future.result()
+                except Exception:
+                    results[i] = {'status': 'failed', 'seconds': None, 'error': traceback.format_exc()}
+    else:
+        for i in runnable:
+            results[i] = run_render_job(jobs[i], job_keys[i], outputs[i], spec.get('figure_cache'), inputs)
+
+    # Write the report
+    job_reports = []
+
+    for index, job in enumerate(jobs):
+        result = results.get(index, {'status': 'failed', 'seconds': None, 'error': job_errors[index]})
+
+        job_reports.append(dict({'name': job.get('name', '{} {}'.format(job.get('plot'), index + 1)),
+                                 'plot': job.get('plot'),
+                                 'output': outputs[index]}, **result))
+
+    report = {'inputs': [dict({'kind': key[0], 'path': key[1]}, **r) for key, r in input_reports.items()],
+              'jobs': job_reports}
+
+    if spec.get('report'):
+        os.makedirs(os.path.dirname(spec['report']) or '.', exist_ok=True)
+
+        with open(spec['report'], 'w') as f:
+            json.dump(report, f, indent=2)
+
+    return report
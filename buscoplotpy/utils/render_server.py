@@ -0,0 +1,688 @@
+# -*- coding: utf-8 -*-
+# The buscoplotpy render server: a long-lived process that keeps matplotlib and the loaded tables
+# warm and runs the render jobs sent by the command line interface.
+#
+# Only the standard library is imported at module level, so that the client side (request_render)
+# adds nothing to the start-up time of the command line interface.
+
+#Importing libraries
+import hmac
+import http.client
+import json
+import os
+import secrets
+import signal
+import socket
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .. import __version__
+
+# The environment variables that point the clients to a running server
+SOCKET_ENV = 'BUSCOPLOTPY_SOCKET'
+SERVER_ENV = 'BUSCOPLOTPY_SERVER'
+TOKEN_ENV  = 'BUSCOPLOTPY_TOKEN_FILE'
+
+# The header of the secret that the clients of a localhost port send
+TOKEN_HEADER = 'X-Buscoplotpy-Token'
+
+# The seconds a client waits for the server to answer the status request, and for the reply of a render
+STATUS_TIMEOUT = 5
+RENDER_TIMEOUT = 600
+
+# The options of a job that are paths
+PATH_OPTIONS = ('out_path', 'genes_dataframe', 'profile')
+
+class ServerBusy(Exception):
+
+    """
+    Raised when the request queue of the server is full.
+    """
+
+def default_socket_path() -> str:
+
+    """
+    Get the path of the server socket.
+
+    Returns:
+        - str: The $BUSCOPLOTPY_SOCKET path, or buscoplotpy-UID.sock in $XDG_RUNTIME_DIR or in the temporary directory.
+    """
+
+    if os.environ.get(SOCKET_ENV):
+        return os.environ[SOCKET_ENV]
+
+    directory = os.environ.get('XDG_RUNTIME_DIR') or tempfile.gettempdir()
+
+    return os.path.join(directory, 'buscoplotpy-{}.sock'.format(getattr(os, 'getuid', lambda: 0)()))
+
+def default_token_path() -> str:
+
+    """
+    Get the path of the file holding the secret of a server listening on a localhost port.
+
+    Returns:
+        - str: The $BUSCOPLOTPY_TOKEN_FILE path, or buscoplotpy-UID.token in $XDG_RUNTIME_DIR or in the temporary directory.
+    """
+
+    if os.environ.get(TOKEN_ENV):
+        return os.environ[TOKEN_ENV]
+
+    directory = os.environ.get('XDG_RUNTIME_DIR') or tempfile.gettempdir()
+
+    return os.path.join(directory, 'buscoplotpy-{}.token'.format(getattr(os, 'getuid', lambda: 0)()))
+
+def write_token(path: str) -> str:
+
+    """
+    Write a new random secret to a file only readable by its owner.
+
+    Parameters:
+        - path (str): The path of the token file. A previous file is replaced.
+
+    Returns:
+        - str: The secret.
+    """
+
+    token = secrets.token_hex(32)
+
+    if os.path.lexists(path):
+        os.remove(path)
+
+    # Create the file with its final mode, so the secret is never readable by the other users
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+
+    with os.fdopen(fd, 'w') as f:
+        f.write(token)
+
+    return token
+
+def read_token(path: str = None) -> str:
+
+    """
+    Read the secret of the server listening on a localhost port.
+
+    Parameters:
+        - path (str, optional): The path of the token file. Defaults to default_token_path().
+
+    Returns:
+        - str: The secret, or None if the file cannot be read.
+    """
+
+    try:
+        with open(path or default_token_path()) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+def file_stamp(path: str) -> tuple:
+
+    """
+    Get the modification time and the size of a file, to notice when it changes.
+
+    Parameters:
+        - path (str): The path of the file.
+
+    Returns:
+        - tuple: The modification time in nanoseconds and the size, or None if the file does not exist.
+    """
+
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+
+    return (stat.st_mtime_ns, stat.st_size)
+
+class TableLRU:
+
+    def __init__(self, max_tables: int = 32):
+
+        """
+        Initialize the TableLRU class, an in-memory cache of the recently loaded input tables.
+
+        A table is reloaded when its file changes, and the least recently used table is dropped
+        when more than max_tables are loaded. Concurrent requests for the same table load it once.
+
+        Parameters:
+            - max_tables (int, optional): The maximum number of loaded tables. Defaults to 32.
+        """
+
+        self.max_tables = max_tables
+
+        # The loaded tables, by input key, with the stamp of their file
+        self.tables  = OrderedDict()
+        self.loading = {}
+        self.lock    = threading.Lock()
+
+        # Number of tables reused and loaded
+        self.hits   = 0
+        self.misses = 0
+
+    def __len__(self):
+
+        return len(self.tables)
+
+    def lookup(self, key: tuple, stamp: tuple):
+
+        """
+        Get a loaded table if its file did not change. Must be called with the lock held.
+
+        Parameters:
+            - key (tuple): The input key (see render_jobs.input_key).
+            - stamp (tuple): The current stamp of the file (see file_stamp).
+
+        Returns:
+            - pd.DataFrame: The table, or None if it is not loaded.
+        """
+
+        entry = self.tables.get(key)
+
+        if entry is None or entry[0] != stamp:
+            return None
+
+        self.tables.move_to_end(key)
+        self.hits += 1
+
+        return entry[1]
+
+    def get(self, key: tuple, cache: str = None):
+
+        """
+        Get an input table, loading it if needed. This is the loader of render_jobs.run_render_jobs.
+
+        The returned table is shared by the requests: the render jobs only take shallow copies of it.
+
+        Parameters:
+            - key (tuple): The input key (see render_jobs.input_key).
+            - cache (str, optional): The full table cache directory. Defaults to None.
+
+        Returns:
+            - pd.DataFrame: The table.
+        """
+
+        from ..utils.render_jobs import load_input
+
+        stamp = file_stamp(key[1])
+
+        with self.lock:
+            table = self.lookup(key, stamp)
+
+            if table is not None:
+                return table
+
+            key_lock = self.loading.setdefault(key, threading.Lock())
+
+        # Load each table once, while the other tables stay available
+        with key_lock:
+            with self.lock:
+                table = self.lookup(key, stamp)
+
+                if table is not None:
+                    return table
+
+            table = load_input(key, cache=cache)
+
+            with self.lock:
+                self.tables[key] = (stamp, table)
+                self.tables.move_to_end(key)
+                self.misses += 1
+
+                # Drop the least recently used tables
+                while len(self.tables) > self.max_tables:
+                    self.tables.popitem(last=False)
+
+                self.loading.pop(key, None)
+
+        return table
+
+class RenderServer:
+
+    def __init__(self, workers: int = 2, max_queue: int = 64, max_tables: int = 32):
+
+        """
+        Initialize the RenderServer class, which runs the render requests in a bounded thread pool.
+
+        Each request is a job specification (see render_jobs.load_job_spec) and runs on one worker.
+        Up to max_queue requests wait for a free worker, the next ones are refused.
+
+        Parameters:
+            - workers (int, optional): The number of requests rendered at the same time. Defaults to 2.
+            - max_queue (int, optional): The maximum number of waiting requests. Defaults to 64.
+            - max_tables (int, optional): The maximum number of loaded tables (see TableLRU). Defaults to 32.
+        """
+
+        self.workers   = workers
+        self.max_queue = max_queue
+        self.tables    = TableLRU(max_tables)
+        self.executor  = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='buscoplotpy-render')
+
+        # Requests waiting or running, and requests done
+        self.pending  = 0
+        self.served   = 0
+        self.lock     = threading.Lock()
+        self.started  = time.time()
+
+    def warm_up(self) -> None:
+
+        """
+        Import the plot modules, so that the first request does not pay for them.
+        """
+
+        from ..utils import render_jobs
+
+    def render(self, spec: dict) -> dict:
+
+        """
+        Run a render request and wait for its report.
+
+        Parameters:
+            - spec (dict): The job specification, with absolute paths (see absolute_spec).
+
+        Returns:
+            - dict: The batch report (see render_jobs.run_render_jobs).
+        """
+
+        from ..utils.render_jobs import run_render_jobs
+
+        with self.lock:
+            if self.pending >= self.workers + self.max_queue:
+                raise ServerBusy('{} requests pending'.format(self.pending))
+
+            self.pending += 1
+
+        try:
+            # A request never opens a window
+            for job in spec.get('jobs', []):
+                job.setdefault('options', {})['plt_show'] = False
+
+            future = self.executor.submit(run_render_jobs, spec, 1, self.tables.get)
+
+            return future.result()
+        finally:
+            with self.lock:
+                self.pending -= 1
+                self.served  += 1
+
+    def status(self) -> dict:
+
+        """
+        Get the state of the server.
+
+        Returns:
+            - dict: The version, the pool size, the pending and served requests and the loaded tables.
+        """
+
+        with self.lock:
+            return {'version': __version__, 'pid': os.getpid(), 'uptime': time.time() - self.started,
+                    'workers': self.workers, 'max_queue': self.max_queue,
+                    'pending': self.pending, 'served': self.served,
+                    'tables': len(self.tables), 'table_hits': self.tables.hits, 'table_misses': self.tables.misses}
+
+    def close(self) -> None:
+
+        """
+        Stop the worker pool, after the running requests.
+        """
+
+        self.executor.shutdown(wait=True)
+
+class RenderRequestHandler(BaseHTTPRequestHandler):
+
+    """
+    The HTTP handler of the render server:
+
+        GET  /status  the state of the server (see RenderServer.status)
+        POST /render  run a job specification and reply with its report
+    """
+
+    server_version = 'buscoplotpy/' + __version__
+
+    def reply(self, status: int, payload: dict) -> None:
+
+        """
+        Send a JSON reply.
+
+        Parameters:
+            - status (int): The HTTP status.
+            - payload (dict): The body of the reply.
+        """
+
+        body = json.dumps(payload).encode()
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def authorized(self) -> bool:
+
+        """
+        Check the secret of the request, on a localhost port. A Unix socket is only open to its owner.
+
+        Returns:
+            - bool: Whether the request may be served. A refused request gets a 403 reply.
+        """
+
+        token = getattr(self.server, 'token', None)
+
+        if token is None or hmac.compare_digest(self.headers.get(TOKEN_HEADER, ''), token):
+            return True
+
+        self.reply(403, {'error': 'Missing or wrong {} header'.format(TOKEN_HEADER)})
+
+        return False
+
+    def do_GET(self):
+
+        if not self.authorized():
+            return
+
+        if self.path != '/status':
+            self.reply(404, {'error': 'Unknown path: {}'.format(self.path)})
+            return
+
+        self.reply(200, self.server.renderer.status())
+
+    def do_POST(self):
+
+        if not self.authorized():
+            return
+
+        if self.path != '/render':
+            self.reply(404, {'error': 'Unknown path: {}'.format(self.path)})
+            return
+
+        try:
+            spec = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+        except ValueError as e:
+            self.reply(400, {'error': 'Invalid job specification: {}'.format(e)})
+            return
+
+        try:
+            self.reply(200, self.server.renderer.render(spec))
+        except ServerBusy as e:
+            self.reply(503, {'error': str(e)})
+        except Exception as e:
+            self.reply(500, {'error': '{}: {}'.format(type(e).__name__, e)})
+
+    def log_message(self, format, *args):
+
+        # Unix socket clients have no address
+        sys.stderr.write('[{}] {}\n'.format(time.strftime('%H:%M:%S'), format % args))
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+
+    """
+    An HTTP server on a Unix socket.
+    """
+
+    daemon_threads = True
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+
+    def __init__(self, socket_path: str, timeout: float = None):
+
+        """
+        Initialize the UnixHTTPConnection class, an HTTP connection over a Unix socket.
+
+        Parameters:
+            - socket_path (str): The path of the socket.
+            - timeout (float, optional): The connection timeout in seconds. Defaults to None (no timeout).
+        """
+
+        super().__init__('localhost', timeout=timeout)
+
+        self.socket_path = socket_path
+
+    def connect(self):
+
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+def serve(socket_path: str = None, port: int = None, workers: int = 2, max_queue: int = 64, max_tables: int = 32) -> None:
+
+    """
+    Run the render server until it is interrupted (Ctrl-C or SIGTERM).
+
+    The requests read and write any path of the user running the server, so only this user may send them: the
+    Unix socket is created with the 0600 mode, and on a localhost port each request must carry the random secret
+    written to the 0600 token file (see default_token_path) in its X-Buscoplotpy-Token header.
+
+    Parameters:
+        - socket_path (str, optional): The path of the Unix socket. Defaults to default_socket_path().
+        - port (int, optional): Listen on this localhost port instead of a Unix socket. Defaults to None.
+        - workers (int, optional): The number of requests rendered at the same time. Defaults to 2.
+        - max_queue (int, optional): The maximum number of waiting requests. Defaults to 64.
+        - max_tables (int, optional): The maximum number of loaded tables. Defaults to 32.
+    """
+
+    renderer = RenderServer(workers=workers, max_queue=max_queue, max_tables=max_tables)
+    renderer.warm_up()
+
+    token_path = None
+
+    if port is not None:
+        # Only local clients, with the secret of the token file
+        server  = ThreadingHTTPServer(('127.0.0.1', port), RenderRequestHandler)
+        address = 'http://127.0.0.1:{}'.format(server.server_address[1])
+
+        token_path   = default_token_path()
+        server.token = write_token(token_path)
+    else:
+        socket_path = socket_path or default_socket_path()
+
+        # Replace the socket of a server that is not running anymore
+        if os.path.exists(socket_path):
+            if server_status(UnixHTTPConnection(socket_path, timeout=1)) is not None:
+                raise RuntimeError('A buscoplotpy server is already listening on {}'.format(socket_path))
+
+            os.remove(socket_path)
+
+        # Create the socket without access for the other users, there is no window before the chmod
+        umask = os.umask(0o177)
+
+        try:
+            server = UnixHTTPServer(socket_path, RenderRequestHandler)
+        finally:
+            os.umask(umask)
+
+        address = socket_path
+
+        os.chmod(socket_path, 0o600)
+
+    server.renderer = renderer
+
+    # Stop on SIGTERM as on Ctrl-C
+    def interrupt(signum, frame):
+        raise KeyboardInterrupt()
+
+    signal.signal(signal.SIGTERM, interrupt)
+
+    print('buscoplotpy {} serving on {} ({} workers)'.format(__version__, address, workers), file=sys.stderr)
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        renderer.close()
+
+        if port is None and os.path.exists(socket_path):
+            os.remove(socket_path)
+
+        if token_path is not None and read_token(token_path) == server.token:
+            os.remove(token_path)
+
+def server_connection(timeout: float = STATUS_TIMEOUT) -> http.client.HTTPConnection:
+
+    """
+    Get a connection to the running render server, if any.
+
+    Parameters:
+        - timeout (float, optional): The seconds to wait for the server, on each read. Defaults to STATUS_TIMEOUT.
+
+    Returns:
+        - http.client.HTTPConnection: A connection to $BUSCOPLOTPY_SERVER (host:port), or to the default
+                                      Unix socket, or None if no server is running.
+    """
+
+    if os.environ.get(SERVER_ENV):
+        address = os.environ[SERVER_ENV].split('://')[-1].rstrip('/')
+        host, _, port = address.rpartition(':')
+
+        return http.client.HTTPConnection(host or '127.0.0.1', int(port), timeout=timeout)
+
+    socket_path = default_socket_path()
+
+    if hasattr(socket, 'AF_UNIX') and os.path.exists(socket_path):
+        return UnixHTTPConnection(socket_path, timeout=timeout)
+
+    return None
+
+def request_headers() -> dict:
+
+    """
+    Get the headers of a request to the render server.
+
+    Returns:
+        - dict: The X-Buscoplotpy-Token header for a server on a localhost port, when its token file is readable.
+    """
+
+    token = read_token() if os.environ.get(SERVER_ENV) else None
+
+    return {TOKEN_HEADER: token} if token else {}
+
+def server_status(connection: http.client.HTTPConnection = None) -> dict:
+
+    """
+    Get the state of the running render server.
+
+    Parameters:
+        - connection (http.client.HTTPConnection, optional): The connection. Defaults to server_connection().
+
+    Returns:
+        - dict: The state of the server (see RenderServer.status), or None if no server is running.
+    """
+
+    connection = connection or server_connection()
+
+    if connection is None:
+        return None
+
+    try:
+        connection.request('GET', '/status', headers=request_headers())
+        response = connection.getresponse()
+
+        return json.loads(response.read()) if response.status == 200 else None
+    except (OSError, ValueError, http.client.HTTPException):
+        return None
+    finally:
+        connection.close()
+
+def absolute_spec(spec: dict) -> dict:
+
+    """
+    Make the paths of a job specification absolute, since the server does not share the working
+    directory of the client.
+
+    Parameters:
+        - spec (dict): The job specification (see render_jobs.load_job_spec).
+
+    Returns:
+        - dict: A copy of the specification with absolute paths.
+    """
+
+    def absolute_input(value):
+
+        if isinstance(value, list):
+            return [absolute_input(v) for v in value]
+
+        if isinstance(value, dict):
+            return dict(value, path=os.path.abspath(value['path']))
+
+        return os.path.abspath(value)
+
+    spec = dict(spec)
+
+    for name in ['cache', 'figure_cache', 'report']:
+        if spec.get(name):
+            spec[name] = os.path.abspath(spec[name])
+
+    output_dir = os.path.abspath(spec.get('output_dir') or '')
+    spec['output_dir'] = output_dir
+
+    jobs = []
+
+    for job in spec.get('jobs', []):
+        job     = dict(job)
+        options = dict(job.get('options', {}))
+
+        job['inputs'] = {name: absolute_input(value) for name, value in job.get('inputs', {}).items()}
+
+        for name in PATH_OPTIONS:
+            if isinstance(options.get(name), str):
+                path = os.path.abspath(options[name])
+
+                # Keep the trailing separator of a directory prefix
+                if options[name] == '' or options[name].endswith(os.sep):
+                    path = os.path.join(path, '')
+
+                options[name] = path
+
+        job['options'] = options
+        jobs.append(job)
+
+    spec['jobs'] = jobs
+
+    return spec
+
+def request_render(spec: dict, timeout: float = RENDER_TIMEOUT) -> dict:
+
+    """
+    Run a job specification on the running render server.
+
+    The server must first answer a status request within STATUS_TIMEOUT seconds, so that a hung server
+    is noticed quickly, then the report of the render is waited for at most timeout seconds of silence.
+
+    Parameters:
+        - spec (dict): The job specification (see render_jobs.load_job_spec).
+        - timeout (float, optional): The seconds to wait for the reply of the render. Defaults to RENDER_TIMEOUT.
+
+    Returns:
+        - dict: The batch report (see render_jobs.run_render_jobs), or None if no server is running, if it
+                is busy, refuses the request or does not answer in time, in which case the caller renders the
+                jobs itself.
+    """
+
+    if server_status() is None:
+        return None
+
+    connection = server_connection(timeout=timeout)
+
+    if connection is None:
+        return None
+
+    try:
+        connection.request('POST', '/render', body=json.dumps(absolute_spec(spec)),
+                           headers=dict(request_headers(), **{'Content-Type': 'application/json'}))
+        response = connection.getresponse()
+        body     = response.read()
+    except (OSError, http.client.HTTPException):
+        return None
+    finally:
+        connection.close()
+
+    if response.status != 200:
+        return None
+
+    return json.loads(body)
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+# The layout of the BUSCO run directories. Only the standard library is imported here, so that the
+# command line interface can name the runs without importing pandas.
+
+#Importing libraries
+import os
+
+# The directories between the root and the BUSCO output, as in root/group/organism/genome_version/busco_out
+DEFAULT_LAYOUT = ('group', 'organism', 'genome_version')
+
+def infer_run_metadata(path: str, root: str, layout: tuple = DEFAULT_LAYOUT, metadata: dict = None) -> dict:
+
+    """
+    Infer the group, organism and genome version of a BUSCO output file.
+
+    Parameters:
+        - path (str): The path to the BUSCO output file.
+        - root (str): The root directory of the BUSCO runs.
+        - layout (tuple, optional): The names of the leading directories below root. Defaults to ('group', 'organism', 'genome_version').
+        - metadata (dict, optional): A dictionary mapping a directory (relative to root) to a dictionary of
+                                     'group', 'organism' and 'genome_version' values. It overrides the layout
+                                     for the files below that directory. Defaults to None.
+
+    Returns:
+        - dict: The 'group', 'organism' and 'genome_version' of the file ('' when unknown).
+    """
+
+    parts = os.path.relpath(path, root).split(os.sep)[:-1]
+
+    # Read the leading directories
+    info = {'group': '', 'organism': '', 'genome_version': ''}
+    info.update({key: value for key, value in zip(layout, parts) if key in info})
+
+    # The explicit metadata of the deepest matching directory wins
+    if metadata:
+        for depth in range(len(parts) + 1):
+            key = '/'.join(parts[:depth])
+
+            if key in metadata:
+                info.update(metadata[key])
+
+    return info
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+
+#Importing libraries
+from bisect import bisect_left
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+def chain_collinear(rank_x: np.ndarray, rank_y: np.ndarray, max_gap: int) -> np.ndarray:
+
+    """
+    Chain points into increasing runs: a point extends the chain whose last point is below and left of it
+    by at most max_gap on both axes, choosing the closest chain on the y axis.
+
+    The points are visited by increasing x and the chain tails are kept sorted by y. The tails more than
+    max_gap behind on x can no longer be extended and are evicted in x order, so at most max_gap tails stay
+    open: each point costs a binary search and a list update of O(max_gap), O(n log n + n * max_gap) with
+    the sort.
+
+    Parameters:
+        - rank_x (np.ndarray): The x coordinate of each point (integer ranks, distinct).
+        - rank_y (np.ndarray): The y coordinate of each point (integer ranks, distinct).
+        - max_gap (int): The maximum step between two consecutive points of a chain, on each axis.
+
+    Returns:
+        - np.ndarray: The chain id of each point.
+    """
+
+    chain = np.empty(len(rank_x), dtype=np.int64)
+
+    # The last point of each open chain, sorted by y, and the (x, y) of the tails in the order they were added
+    tails_y, tails = [], []
+    added  = deque()
+    chains = 0
+
+    for i in np.argsort(rank_x, kind='stable'):
+        x, y = int(rank_x[i]), int(rank_y[i])
+
+        # Evict the tails that are too far behind on x (the ones already extended are gone)
+        while added and x - added[0][0] > max_gap:
+            tail_x, tail_y = added.popleft()
+            k = bisect_left(tails_y, tail_y)
+
+            if k < len(tails_y) and tails_y[k] == tail_y and tails[k][1] == tail_x:
+                del tails_y[k], tails[k]
+
+        # Extend the chain of the closest tail below y
+        k = bisect_left(tails_y, y) - 1
+
+        if k >= 0 and y - tails_y[k] <= max_gap:
+            chain_id = tails[k][0]
+            del tails_y[k], tails[k]
+        else:
+            chain_id = chains
+            chains  += 1
+
+        chain[i] = chain_id
+
+        # The point is the new tail of its chain
+        j = bisect_left(tails_y, y)
+        tails_y.insert(j, y)
+        tails.insert(j, (chain_id, x))
+        added.append((x, y))
+
+    return chain
+
+def detect_synteny_blocks(pairs: pd.DataFrame, max_gap: int = 5, min_size: int = 3) -> (np.ndarray, pd.DataFrame):
+
+    """
+    Group the shared BUSCOs of two genomes into synteny blocks: runs of BUSCOs on the same pair of sequences
+    whose order is kept (or reversed) in both genomes.
+
+    The BUSCOs are ranked by position on each sequence, so max_gap counts BUSCOs and not bases. Forward blocks
+    are chained first; the BUSCOs left out of them are then chained in reverse order.
+
+    Parameters:
+        - pairs (pd.DataFrame): One row per shared BUSCO, with the 'sequence_x', 'gene_start_x', 'gene_end_x',
+                                'sequence_y', 'gene_start_y' and 'gene_end_y' columns (as merged by generate_links).
+        - max_gap (int, optional): The maximum rank step between two consecutive BUSCOs of a block. Defaults to 5.
+        - min_size (int, optional): The minimum number of BUSCOs of a block. Defaults to 3.
+
+    Returns:
+        - np.ndarray: The block of each row of pairs, or -1 for the BUSCOs outside the blocks.
+        - pd.DataFrame: The 'sequence_x', 'start_x', 'end_x', 'sequence_y', 'start_y', 'end_y', 'size' and
+                        'orientation' (1 or -1) of each block.
+    """
+
+    n = len(pairs)
+    block = np.full(n, -1, dtype=np.int64)
+
+    columns = ['sequence_x', 'start_x', 'end_x', 'sequence_y', 'start_y', 'end_y', 'size', 'orientation']
+
+    if n == 0:
+        return block, pd.DataFrame(columns=columns)
+
+    # Rank the BUSCOs along each sequence
+    rank_x = pairs.groupby('sequence_x', observed=True)['gene_start_x'].rank(method='first').to_numpy(dtype=np.int64)
+    rank_y = pairs.groupby('sequence_y', observed=True)['gene_start_y'].rank(method='first').to_numpy(dtype=np.int64)
+
+    # Offset each pair of sequences, so that chains never cross from one pair to another
+    group  = pairs.groupby(['sequence_x', 'sequence_y'], observed=True, sort=False).ngroup().to_numpy(dtype=np.int64)
+    stride = 2 * (max(rank_x.max(), rank_y.max()) + max_gap + 1)
+
+    x = group * stride + rank_x
+
+    blocks = []
+
+    for orientation in [1, -1]:
+        todo = np.flatnonzero(block < 0)
+
+        if len(todo) == 0:
+            break
+
+        # Reversed blocks are increasing chains of the mirrored y ranks
+        y = group[todo] * stride + (rank_y[todo] if orientation == 1 else stride // 2 - rank_y[todo])
+
+        chain = chain_collinear(x[todo], y, max_gap)
+
+        # Keep the chains long enough to be blocks, numbered after the blocks found so far
+        _, inverse, sizes = np.unique(chain, return_inverse=True, return_counts=True)
+        kept = sizes[inverse] >= min_size
+
+        _, numbered = np.unique(inverse[kept], return_inverse=True)
+        block[todo[kept]] = sum(len(b) for b in blocks) + numbered
+
+        members = pairs.iloc[todo[kept]].assign(block=block[todo[kept]])
+
+        blocks.append(members.groupby('block').agg(sequence_x=('sequence_x', 'first'),
+                                                  start_x=('gene_start_x', 'min'),
+                                                  end_x=('gene_end_x', 'max'),
+                                                  sequence_y=('sequence_y', 'first'),
+                                                  start_y=('gene_start_y', 'min'),
+                                                  end_y=('gene_end_y', 'max'),
+                                                  size=('gene_start_x', 'size')).assign(orientation=orientation))
+
+    return block, pd.concat(blocks)[columns].reset_index(drop=True)
@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+
+#Importing libraries
+import hashlib
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+# Bump this when the layout of the cached tables changes
+CACHE_FORMAT_VERSION = 2
+
+# Default size limit of the cache directory (1 GiB)
+CACHE_MAX_BYTES = 1 << 30
+
+class TableCache:
+
+    def __init__(self, directory: str, max_bytes: int = CACHE_MAX_BYTES, content_hash: bool = False):
+
+        """
+        Initialize the TableCache class, an on-disk cache of parsed tables.
+
+        The tables are stored in Feather format when pyarrow is installed, and as .npz files otherwise.
+        When the cache grows over max_bytes, the least recently used tables are removed.
+
+        Parameters:
+            - directory (str): The cache directory. It is created if it does not exist.
+            - max_bytes (int, optional): The maximum size of the cache directory. Defaults to 1 GiB.
+            - content_hash (bool, optional): Whether to key the tables on the file content instead of
+                                             its modification time and size. Defaults to False.
+        """
+
+        self.directory    = directory
+        self.max_bytes    = max_bytes
+        self.content_hash = content_hash
+        self.extension    = '.feather' if pyarrow is not None else '.npz'
+
+        os.makedirs(self.directory, exist_ok=True)
+
+    def __str__(self):
+
+        return 'TableCache({}, {})'.format(self.directory, self.max_bytes)
+
+    def key(self, path: str, namespace: str = '') -> str:
+
+        """
+        Compute the cache key of a file.
+
+        Parameters:
+            - path (str): The path to the source file.
+            - namespace (str, optional): The name of the loader and of its options.
+
+        Returns:
+            - str: The hexadecimal cache key.
+        """
+
+        h = hashlib.sha1()
+        h.update('{}|{}|{}'.format(CACHE_FORMAT_VERSION, namespace, os.path.abspath(path)).encode())
+
+        if self.content_hash:
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    h.update(block)
+        else:
+            stat = os.stat(path)
+            h.update('|{}|{}'.format(stat.st_mtime_ns, stat.st_size).encode())
+
+        return h.hexdigest()
+
+    def get(self, path: str, namespace: str = '') -> pd.DataFrame:
+
+        """
+        Get the cached table of a file.
+
+        Parameters:
+            - path (str): The path to the source file.
+            - namespace (str, optional): The name of the loader and of its options.
+
+        Returns:
+            - pd.DataFrame: The cached table, or None if the file is not cached.
+        """
+
+        entry = os.path.join(self.directory, self.key(path, namespace) + self.extension)
+
+        try:
+            if self.extension == '.feather':
+                table = pd.read_feather(entry)
+            else:
+                table = read_npz_table(entry)
+        except (OSError, ValueError, KeyError):
+            return None
+
+        # Mark the entry as recently used
+        os.utime(entry)
+
+        return table
+
+    def put(self, path: str, table: pd.DataFrame, namespace: str = '') -> None:
+
+        """
+        Store the table of a file in the cache, then evict the least recently used tables.
+
+        Parameters:
+            - path (str): The path to the source file.
+            - table (pd.DataFrame): The parsed table.
+            - namespace (str, optional): The name of the loader and of its options.
+        """
+
+        entry = os.path.join(self.directory, self.key(path, namespace) + self.extension)
+
+        # Write to a unique temporary file first, so readers never see a partial entry and
+        # threads and processes storing the same table do not collide
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        os.close(fd)
+
+        try:
+            if self.extension == '.feather':
+                table.reset_index(drop=True).to_feather(tmp)
+            else:
+                write_npz_table(tmp, table)
+
+            os.replace(tmp, entry)
+        except BaseException:
+            os.remove(tmp)
+            raise
+
+        self.evict()
+
+    def evict(self) -> None:
+
+        """
+        Remove the least recently used tables until the cache fits in max_bytes.
+        """
+
+        entries = []
+
+        for name in os.listdir(self.directory):
+            if name.endswith(('.feather', '.npz')):
+                stat = os.stat(os.path.join(self.directory, name))
+                entries.append((stat.st_mtime, stat.st_size, name))
+
+        total = sum(size for _, size, _ in entries)
+
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+
+            total -= size
+
+    def clear(self) -> None:
+
+        """
+        Remove all the cached tables.
+        """
+
+        for name in os.listdir(self.directory):
+            if name.endswith(('.feather', '.npz')):
+                os.remove(os.path.join(self.directory, name))
+
+def write_npz_table(path: str, table: pd.DataFrame) -> None:
+
+    """
+    Write a table as a .npz file, without pickling.
+
+    Parameters:
+        - path (str): The path to the .npz file.
+        - table (pd.DataFrame): The table to write.
+    """
+
+    arrays = {'__columns__': np.array(table.columns, dtype=str),
+              '__dtypes__': np.array([str(t) for t in table.dtypes], dtype=str)}
+
+    for i, column in enumerate(table.columns):
+        values = table[column]
+
+        if isinstance(values.dtype, pd.api.extensions.ExtensionDtype) and pd.api.types.is_numeric_dtype(values):
+            # Store the nullable numbers together with their missing values mask
+            arrays['c{}'.format(i)] = values.to_numpy(dtype=values.dtype.numpy_dtype, na_value=0)
+            arrays['m{}'.format(i)] = values.isna().to_numpy()
+        elif pd.api.types.is_numeric_dtype(values) or pd.api.types.is_bool_dtype(values):
+            arrays['c{}'.format(i)] = values.to_numpy()
+        else:
+            # Store the strings together with their missing values mask
+            arrays['c{}'.format(i)] = values.astype(object).fillna('').to_numpy(dtype=str)
+            arrays['m{}'.format(i)] = values.isna().to_numpy()
+
+    with open(path, 'wb') as f:
+        np.savez(f, **arrays)
+
+def read_npz_table(path: str) -> pd.DataFrame:
+
+    """
+    Read a table written by write_npz_table.
+
+    Parameters:
+        - path (str): The path to the .npz file.
+
+    Returns:
+        - pd.DataFrame: The table.
+    """
+
+    with np.load(path, allow_pickle=False) as data:
+
+        table = {}
+
+        for i, (column, dtype) in enumerate(zip(data['__columns__'], data['__dtypes__'])):
+            values = data['c{}'.format(i)]
+
+            if 'm{}'.format(i) in data.files and values.dtype.kind != 'U':
+                # Restore the nullable numbers
+                values = pd.Series(values).astype(str(dtype)).mask(data['m{}'.format(i)])
+
+            elif 'm{}'.format(i) in data.files:
+                values = pd.Series(values, dtype=object).mask(data['m{}'.format(i)], None)
+
+                # Restore the categorical and string columns
+                if dtype in ('category', 'str', 'string'):
+                    values = values.astype(str(dtype))
+
+            table[str(column)] = values
+
+    return pd.DataFrame(table)
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+
+#Importing libraries
+import os
+import subprocess
+import sys
+import time
+
+# The repository root, so that the subprocesses import this tree of buscoplotpy
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The wall time allowed to an import or a --help on top of the bare interpreter start, in seconds
+STARTUP_OVERHEAD = 0.05
+
+# The number of runs of each command, the fastest one is kept to be robust to a busy machine
+REPEAT = 5
+
+# The heavy libraries that must only be imported when a plot is rendered
+HEAVY_MODULES = ['pandas', 'matplotlib', 'scipy']
+
+def run_python(*args: str) -> float:
+
+    """
+    Run the interpreter in a subprocess from the repository root, REPEAT times.
+
+    Parameters:
+        - args (str): The arguments of the interpreter.
+
+    Returns:
+        - float: The fastest wall time of the runs, in seconds.
+    """
+
+    seconds = []
+
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *args], cwd=ROOT, check=True, stdout=subprocess.DEVNULL)
+        seconds.append(time.perf_counter() - start)
+
+    return min(seconds)
+
+def startup_overhead(*args: str) -> float:
+
+    """
+    Measure the start-up time of a command on top of the bare interpreter start (as in benchmarks/run_benchmarks.py).
+
+    Parameters:
+        - args (str): The arguments of the interpreter.
+
+    Returns:
+        - float: The overhead, in seconds.
+    """
+
+    return run_python(*args) - run_python('-c', 'pass')
+
+def test_import_time():
+
+    overhead = startup_overhead('-c', 'import buscoplotpy')
+
+    assert overhead < STARTUP_OVERHEAD, 'import buscoplotpy took {:.0f} ms over the interpreter'.format(overhead * 1000)
+
+def test_help_time():
+
+    overhead = startup_overhead('-m', 'buscoplotpy', '--help')
+
+    assert overhead < STARTUP_OVERHEAD, 'buscoplotpy --help took {:.0f} ms over the interpreter'.format(overhead * 1000)
+
+def test_cli_imports_no_heavy_module():
+
+    # A fresh interpreter, so that the modules imported by the other tests do not count
+    code = ('import sys, buscoplotpy.cli\n'
+            'loaded = [m for m in {!r} if m in sys.modules]\n'
+            'assert not loaded, loaded\n').format(HEAVY_MODULES)
+
+    subprocess.run([sys.executable, '-c', code], cwd=ROOT, check=True)
+
+def test_plot_jobs_import_no_heavy_module(tmp_path):
+
+    # The job of each command is built before it is sent to the render server, without the plot libraries
+    summary = tmp_path / 'group' / 'organism' / 'v1' / 'short_summary.json'
+    summary.parent.mkdir(parents=True)
+    summary.write_text('{}')
+
+    for path in ['karyotype.tsv', 'full_table.tsv']:
+        (tmp_path / path).write_text('')
+
+    commands = [['karyoplot', '--karyotype', 'karyotype.tsv', '--fulltable', 'full_table.tsv', '-o', 'k.png'],
+                ['barplot', str(summary), '--root', str(tmp_path), '-o', 'barplot']]
+
+    code = ('import sys\n'
+            'from buscoplotpy.cli import build_parser, plot_job\n'
+            'for argv in {!r}:\n'
+            '    plot_job(build_parser().parse_args(argv))\n'
+            'loaded = [m for m in {!r} if m in sys.modules]\n'
+            'assert not loaded, loaded\n').format(commands, HEAVY_MODULES)
+
+    subprocess.run([sys.executable, '-c', code], cwd=tmp_path, check=True, env=dict(os.environ, PYTHONPATH=ROOT))